@@ -0,0 +1,58 @@
+"""Benchmark of the Heston QE kernels.
+
+Compares the column-wise kernel ``_jitable_heston``, which takes the inverse
+normal of *u* computed beforehand by scipy, with the fused per-path kernel
+``_heston_qe_paths`` used by :class:`pyoptmc.Heston`. Run with
+
+    python benchmarks/heston_qe.py [batch_size] [days]
+"""
+import sys
+import time
+import numpy as np
+from scipy.stats import norm
+from pyoptmc import Heston
+from pyoptmc.model.market_process import _get_kvkr, _jitable_heston
+
+
+def _best_of(func, repeat=5):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = func()
+        best = min(best, time.perf_counter() - start)
+    return best, res
+
+
+def main(batch_size=20000, days=252):
+    hst = Heston(0.03, 0, -0.5, 0.0625, 1.0, 0.4, 0.0625, 252)
+    rng = np.random.default_rng(0)
+    u = rng.uniform(0, 1, (batch_size, days))
+    z = rng.normal(0, 1, (batch_size, days))
+    t = days / hst.day_counter
+    dt = t / days
+    kv, kr = _get_kvkr(hst.kappa, hst.theta, hst.volvol, dt, hst.rho, 0.5, 0.5)
+    kv, kr = np.array(kv), np.array(kr)
+
+    def column_wise():
+        return _jitable_heston(kv, kr, hst.mu, hst.theta, hst.default_v0, dt,
+                               u, norm.ppf(u), z, batch_size, days)
+
+    def fused():
+        return hst.generate_path_given_uz(t=t, u=u, z=z, batch_size=batch_size)
+
+    # compile
+    column_wise()
+    fused()
+    t_old, (v_old, x_old) = _best_of(column_wise)
+    t_new, (v_new, x_new) = _best_of(fused)
+
+    print("paths x days        : %d x %d" % (batch_size, days))
+    print("column-wise kernel  : %.4f s" % t_old)
+    print("fused kernel        : %.4f s" % t_new)
+    print("speed-up            : %.1fx" % (t_old / t_new))
+    print("max |dX|            : %.2e" % np.abs(x_old - x_new).max())
+    print("max |dV|            : %.2e" % np.abs(v_old - v_new).max())
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
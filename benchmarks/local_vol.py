@@ -0,0 +1,47 @@
+"""Benchmark of the local volatility process against Black-Scholes.
+
+Times the generation of daily paths of one year under
+:class:`pyoptmc.LocalVol` with a smile surface and under
+:class:`pyoptmc.BlackScholes`, both observed daily. Run with
+
+    python benchmarks/local_vol.py [batch_size] [days]
+"""
+import sys
+import time
+import numpy as np
+from pyoptmc import BlackScholes, LocalVol, DownIn, Payoff, plain_vanilla
+
+
+def _best_of(func, repeat=5):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(batch_size=20000, days=252):
+    option = DownIn(
+        spot=100, barrier=80, rebate=0, ob_days=list(range(1, days + 1)),
+        payoff=Payoff(plain_vanilla, strike=100, option_type="put")
+    )
+    bs = BlackScholes(0.03, 0, 0.2)
+    lv = LocalVol(0.03, 0, lambda t, s: 0.2 + 0.1 * np.log(s / 100) ** 2)
+    bs_coordinator = bs.coordinator(option, bs)
+    lv_coordinator = lv.coordinator(option, lv)
+    eps = np.random.default_rng(0).normal(0, 1, (batch_size, days))
+
+    # compile
+    lv_coordinator.paths_given_eps(eps[:10])
+    t_bs = _best_of(lambda: bs_coordinator.paths_given_eps(eps))
+    t_lv = _best_of(lambda: lv_coordinator.paths_given_eps(eps))
+
+    print("paths x days        : %d x %d" % (batch_size, days))
+    print("Black-Scholes       : %.4f s" % t_bs)
+    print("local volatility    : %.4f s" % t_lv)
+    print("ratio               : %.1fx" % (t_lv / t_bs))
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -24,6 +24,7 @@ setup(
     url='',
     package_dir={'': 'src'},
     packages=find_packages(where='src'),
+    package_data={'pyoptmc.dateutil': ['data/*.txt']},
     python_requires='>=3.8',
     install_requires=install_requires,
 )
@@ -21,5 +21,5 @@ from pyoptmc.engine import *
 from pyoptmc.model import *
 from pyoptmc.tools import *
 from pyoptmc.structures import *
-from pyoptmc.dateutil import Calendar
+from pyoptmc.dateutil import Calendar, HolidaySet
 from pyoptmc.products.products import PhoenixProd
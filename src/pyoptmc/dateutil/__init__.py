@@ -1 +1,2 @@
-from pyoptmc.dateutil.date import *
\ No newline at end of file
+from pyoptmc.dateutil.date import *
+from pyoptmc.dateutil.holidays import *
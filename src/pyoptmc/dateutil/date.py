@@ -1,55 +1,52 @@
-# Todo: test Calendar.add_holidays and Calendar.add_holiday_rule
-
 import datetime
-from pyoptmc.dateutil._china_holidays import _is_china_holidays
+import numpy as np
+from pyoptmc.dateutil.holidays import HolidaySet
 
 __all__ = ['Calendar', 'CHINA_HOLIDAYS']
 
-CHINA_HOLIDAYS = _is_china_holidays
-
-_DAYS_IN_MONTH = [-1, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-_DAYS_BEFORE_MONTH = [-1]
-dbm = 0
-for dim in _DAYS_IN_MONTH[1:]:
-    _DAYS_BEFORE_MONTH.append(dbm)
-    dbm += dim
-del dbm, dim
+CHINA_HOLIDAYS = HolidaySet.bundled('china')
 
+# ordinal of 1970-01-01, the epoch of numpy.datetime64
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
 
-def _is_leap(year):
-    """Return 1 if *year* is leap year else 0."""
-    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
 
+def _to_days(dates):
+    """Return days since the epoch of *dates*, a date or an array_like of
+    dates, as an integer or an integer array."""
+    if isinstance(dates, datetime.date):
+        return dates.toordinal() - _EPOCH
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
 
-def _next_month_same_day(date: datetime.date) -> datetime.date:
-    """Return the date of same day next month. If next month does not have
-    same day, return the last day of next month.
 
-    For example:
-    datetime.date(2021, 1, 31) -> datetime.date(2021, 2, 28)
-    datetime.date(2021, 4, 30) -> datetime.date(2021, 5, 30)"""
-    if date.month == 12:
-        month = 1
-        year = date.year + 1
-    else:
-        month = date.month + 1
-        year = date.year
-    _last_day = _DAYS_IN_MONTH[month] + (_is_leap(year) and month == 2)
-    return datetime.date(year, month, min(date.day, _last_day))
+def _to_date(day):
+    """Return the date of *day* days since the epoch."""
+    return datetime.date.fromordinal(int(day) + _EPOCH)
 
 
 class Calendar:
     def __init__(self, holiday_rule=CHINA_HOLIDAYS, other_holidays=None):
+        # the index of trading days is built lazily by whole years, and
+        # rebuilt whenever holidays are added
+        self._first_day = None
+        self._is_trading = None
+        self._count = None
+        self._trading_days = None
         # holiday rule taken as is
         self._holiday_rule = holiday_rule
-        if other_holidays is None:
+        self._other_holidays = [] if other_holidays is None \
+            else other_holidays
+        if isinstance(holiday_rule, HolidaySet):
+            # holidays as data, so trading days are found in one pass
+            self.holidays = holiday_rule.union(self._other_holidays)
+            self.holiday_rule = self.holidays
+        elif other_holidays is None:
+            self.holidays = None
             self.holiday_rule = holiday_rule
-            self._other_holidays = []
         else:
             def _holiday_rule(date):
                 return holiday_rule(date) or date in other_holidays
+            self.holidays = None
             self.holiday_rule = _holiday_rule
-            self._other_holidays = other_holidays
 
     def add_holidays(self, holidays):
         """Add holidays to holiday rules. *holidays* should be iterable"""
@@ -69,18 +66,62 @@ class Calendar:
         if not callable(holiday_rule):
             raise TypeError("holiday_rule must be callable")
 
+        previous_rule = self._holiday_rule
+
         def _holiday_rule(date):
-            return self._holiday_rule(date) or holiday_rule(date)
+            return previous_rule(date) or holiday_rule(date)
         Calendar.__init__(self, _holiday_rule, self._other_holidays)
 
+    def _cover(self, first, last):
+        """Make sure the index of trading days covers days *first* to *last*
+        since the epoch, extending it by whole years."""
+        if self._first_day is not None and self._first_day <= first and \
+                last < self._first_day + len(self._is_trading):
+            return
+        if self._first_day is not None:
+            first = min(first, self._first_day)
+            last = max(last, self._first_day + len(self._is_trading) - 1)
+        start = datetime.date(_to_date(first).year, 1, 1)
+        end = datetime.date(_to_date(last).year + 1, 1, 1)
+        if self.holidays is not None:
+            self.holidays.check_years(start.year, end.year - 1)
+        first_day = _to_days(start)
+        days = np.arange(first_day, _to_days(end))
+        if self.holidays is not None:
+            is_trading = np.is_busday(
+                days.astype('datetime64[D]'),
+                busdaycal=self.holidays.busdaycalendar
+            )
+        else:
+            # 1970-01-01 is a Thursday
+            is_trading = (days + 3) % 7 < 5
+            for i in np.flatnonzero(is_trading):
+                is_trading[i] = not self.holiday_rule(_to_date(days[i]))
+        self._first_day = first_day
+        self._is_trading = is_trading
+        # number of trading days before each day, and after the last one
+        self._count = np.concatenate([[0], np.cumsum(is_trading)])
+        self._trading_days = days[is_trading]
+
+    def _count_before(self, days):
+        """Return the number of trading days in the index before *days*."""
+        return self._count[days - self._first_day]
+
     def is_trading(self, date: datetime.date):
         """Return if *date* trades.
 
         Parameters
         ----------
-        date : datetime.date
+        date : datetime.date or array_like
+            A date, or an array of dates, in which case an array of bool is
+            returned.
         """
-        return date.weekday() < 5 and not self.holiday_rule(date)
+        days = _to_days(date)
+        if np.size(days) == 0:
+            return np.zeros(0, dtype=bool)
+        self._cover(np.min(days), np.max(days))
+        res = self._is_trading[days - self._first_day]
+        return bool(res) if np.ndim(res) == 0 else res
 
     def trading_days_between(
             self,
@@ -111,13 +152,14 @@ class Calendar:
             raise ValueError("start date must be prior to end date")
         if start == end:
             return [] if endpoints else [start]
-        d_list = [start] if self.is_trading(start) and endpoints else []
-        date = start
-        while date < end + datetime.timedelta(days=-1 * (not endpoints)):
-            date += datetime.timedelta(days=1)
-            if self.is_trading(date):
-                d_list.append(date)
-        return d_list
+        first, last = _to_days(start), _to_days(end)
+        if not endpoints:
+            first, last = first + 1, last - 1
+        self._cover(first, last)
+        days = self._trading_days[
+            self._count_before(first):self._count_before(last + 1)
+        ]
+        return [_to_date(d) for d in days]
 
     def offset(self, date: datetime.date, n: int) -> datetime.date:
         """Return date of trading day *n* days after *date*. *n* can be
@@ -125,7 +167,9 @@ class Calendar:
 
         Parameters
         ----------
-        date : datetime.date
+        date : datetime.date or array_like
+            A date, or an array of dates, in which case an array of
+            *numpy.datetime64* is returned.
         n : int
 
         Returns
@@ -134,14 +178,31 @@ class Calendar:
             The *n*-th trading date after *date*.
 
         """
-        if not isinstance(n, int):
+        if not isinstance(n, (int, np.integer)) or isinstance(n, bool):
             raise TypeError("n must be an integer")
-        count = 0
-        d = n > 0
-        while count < abs(n):
-            date += datetime.timedelta(days=d)
-            count += self.is_trading(date)
-        return date
+        if n == 0:
+            return date
+        days = _to_days(date)
+        if np.size(days) == 0:
+            return np.zeros(0, dtype='datetime64[D]')
+        self._cover(np.min(days), np.max(days))
+        while True:
+            if n > 0:
+                # the n-th trading day after the last one up to *date*
+                pos = self._count_before(days + 1) + n - 1
+            else:
+                pos = self._count_before(days) + n
+            if np.all(pos >= 0) and np.all(pos < len(self._trading_days)):
+                break
+            # extend the index by a year on the side running out
+            lo, hi = self._first_day, self._first_day + len(self._is_trading)
+            self._cover(lo - 1 if np.any(pos < 0) else lo,
+                        hi if np.any(pos >= len(self._trading_days))
+                        else hi - 1)
+        res = self._trading_days[pos]
+        if isinstance(date, datetime.date):
+            return _to_date(res)
+        return res.astype('datetime64[D]')
 
     def periodic(
             self,
@@ -155,16 +216,31 @@ class Calendar:
         the output list may be shorter than *count*. To force the length of
         output to *count*, set *force* to *True*
 
+        Dates are generated at once with *numpy.datetime64* arithmetic, and
+        rolled to trading days on the index of the calendar. *start* may be
+        an array of dates, in which case a schedule is generated for each of
+        them in the same pass.
+
+        Monthly dates fall on the day of *start*, or on the last day of
+        months shorter than that, before they are rolled.
+
         Parameters
         ----------
-        start : datetime.date
-            The first date of the array of periodic trading dates.
+        start : datetime.date or array_like
+            The first date of the array of periodic trading dates, or an
+            array of first dates.
         period : str
             String like 'Xm', 'Xw', and 'Xd', where X
         count : int
         if_close : bool
         force : bool
 
+        Returns
+        -------
+        list
+            A list of trading dates, or a list of such lists if *start* is
+            an array.
+
         Examples
         --------
         ..ipython:: python
@@ -182,55 +258,59 @@ class Calendar:
             raise ValueError("period must be a positive integer")
         if if_close not in ("next", "prev"):
             raise ValueError(r'if_close must be one of "next" or "prev"')
-        if not self.is_trading(start):
-            raise ValueError("given start date is not trading")
         if unit not in ['W', 'w', 'M', 'm', 'D', 'd']:
             raise ValueError("Unit not understood")
+        starts = np.atleast_1d(np.asarray(start, dtype='datetime64[D]'))
+        if not np.all(self.is_trading(starts)):
+            raise ValueError("given start date is not trading")
 
-        if unit in ['W', 'w']:
-            def _next_period(_date):
-                return _date + datetime.timedelta(days=7*n)
-        elif unit in ['M', 'm']:
-            def _next_period(_date):
-                _day = _date.day
-                for _ in range(n):
-                    _date = _next_month_same_day(_date)
-                try:
-                    _date = datetime.date(_date.year, _date.month, _day)
-                except ValueError:
-                    pass
-                return _date
-        else:
-            def _next_period(_date):
-                return _date + datetime.timedelta(days=n)
-
-        res = [start]
-        date = start
-        i = 1
-        while i < count:
-            date = _next_period(date)
-            # set date.day to start.day if period is given in month
-            if unit in ['M', 'm']:
-                try:
-                    date = datetime.date(date.year, date.month, start.day)
-                except ValueError:
-                    pass
-
-            if not self.is_trading(date):
-                if if_close == "next":
-                    o = self.offset(date, 1)
+        rows = [None] * len(starts)
+        todo = np.arange(len(starts))
+        # number of periods generated after each start
+        periods = max(count - 1, 0)
+        while len(todo):
+            days = self._periodic_days(starts[todo], n, unit.upper(),
+                                       periods, if_close)
+            # rolled dates are ascending, so duplicates are adjacent
+            keep = np.ones(days.shape, dtype=bool)
+            keep[:, 1:] = days[:, 1:] != days[:, :-1]
+            short = []
+            for i, row, k in zip(todo, days, keep):
+                row = row[k]
+                if force and len(row) < count:
+                    short.append(i)
                 else:
-                    o = self.offset(date, -1)
-            else:
-                o = date
-
-            if o not in res:
-                res.append(o)
-
-            i = len(res) if force else i + 1
-
+                    rows[i] = row[:count] if force else row
+            todo = np.array(short, dtype=int)
+            periods *= 2
+        res = [[_to_date(d) for d in row] for row in rows]
+        if isinstance(start, datetime.date):
+            return res[0]
         return res
 
+    def _periodic_days(self, starts, n, unit, periods, if_close):
+        """Return the dates of *periods* periods of *n* units after each of
+        *starts*, rolled to trading days, in an array of shape
+        *(len(starts), periods + 1)* whose first column is *starts*."""
+        steps = n * np.arange(periods + 1)
+        if unit == 'M':
+            # the day of the start in each month, or the last day of the
+            # month if it is shorter
+            months = starts.astype('datetime64[M]')
+            day = (starts - months.astype('datetime64[D]')).astype(np.int64)
+            months = months[:, None] + steps
+            first = months.astype('datetime64[D]')
+            length = ((months + 1).astype('datetime64[D]') - first).astype(
+                np.int64)
+            dates = first + np.minimum(day[:, None], length - 1)
+        else:
+            dates = starts[:, None] + steps * (7 if unit == 'W' else 1)
+        closed = ~self.is_trading(dates.ravel())
+        dates = dates.ravel()
+        dates[closed] = self.offset(dates[closed],
+                                    1 if if_close == "next" else -1)
+        return dates.reshape(len(starts), -1).astype(np.int64)
+
     def to_scalar(self, date_arr, start) -> list:
         """Convert dates into integers given a start date.
 
@@ -246,7 +326,9 @@ class Calendar:
         list
             A list of integers.
         """
-        return [self.num_trading_days_between(start, end) for end in date_arr]
+        return np.atleast_1d(
+            self.num_trading_days_between(start, date_arr)
+        ).tolist()
 
     def num_trading_days_between(
             self,
@@ -256,8 +338,16 @@ class Calendar:
     ) -> int:
         """Return number of trading days between two dates. If these dates
         are identical, return 0. *count_end* controls whether to count the
-        end date."""
-        if start == end:
-            return 0
-        trading_dates = self.trading_days_between(start, end, True)
-        return len(trading_dates) - count_end
+        end date.
+
+        *end* may be an array of dates, in which case an array of integers
+        is returned."""
+        first, last = _to_days(start), _to_days(end)
+        if np.any(last < first):
+            raise ValueError("start date must be prior to end date")
+        self._cover(first, np.max(last, initial=first))
+        # trading days from *start* to *end*, both included, less one
+        res = self._count_before(last + 1) - self._count_before(first) \
+            - count_end
+        res = np.where(last == first, 0, res)
+        return int(res) if np.ndim(res) == 0 else res
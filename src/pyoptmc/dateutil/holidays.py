@@ -0,0 +1,139 @@
+"""
+This module implements sets of holidays loaded from data files, so that
+holidays of each year are data rather than code.
+
+A holiday file has one date, or an inclusive range ``start/end`` of dates,
+per line in ISO format. Blank lines and lines starting with ``#`` are
+ignored. A line ``years: first/last`` tells the inclusive range of years
+whose holidays are all listed; outside of it holidays are unknown, so
+calendars refuse to count trading days there. Holiday files of exchanges
+are bundled in the ``data`` directory of this package.
+"""
+import os
+import datetime
+import numpy as np
+
+
+__all__ = ['HolidaySet']
+
+_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def _parse_line(line):
+    """Return the dates of a line of a holiday file."""
+    start, _, end = line.partition('/')
+    start = np.datetime64(start.strip(), 'D')
+    end = np.datetime64(end.strip(), 'D') if end else start
+    if end < start:
+        raise ValueError("Range %s ends before it starts" % line)
+    return np.arange(start, end + 1)
+
+
+def _parse_years(line):
+    """Return the range of years of a ``years: first/last`` line."""
+    first, _, last = line.partition(':')[2].partition('/')
+    first, last = int(first), int(last)
+    if last < first:
+        raise ValueError("Range %s ends before it starts" % line)
+    return first, last
+
+
+class HolidaySet:
+    def __init__(self, holidays=(), years=None):
+        """A set of holidays, which is also a holiday rule of
+        :class:`~pyoptmc.dateutil.date.Calendar`.
+
+        Parameters
+        ----------
+        holidays : array_like
+            Holidays, as datetime.date objects or anything convertible to
+            *numpy.datetime64*.
+        years : tuple
+            The inclusive range *(first, last)* of years whose holidays are
+            all in *holidays*. If None, holidays of any year are.
+        """
+        days = np.asarray(list(holidays), dtype='datetime64[D]')
+        self.holidays = np.unique(days)
+        self.years = None if years is None else tuple(years)
+
+    @classmethod
+    def from_file(cls, file):
+        """Load a holiday set from a holiday file.
+
+        Parameters
+        ----------
+        file : str
+            Path to the file."""
+        days = []
+        years = None
+        with open(file) as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('years:'):
+                    years = _parse_years(line)
+                elif line and not line.startswith('#'):
+                    days.append(_parse_line(line))
+        if not days:
+            return cls(years=years)
+        return cls(np.concatenate(days), years)
+
+    @classmethod
+    def bundled(cls, name):
+        """Load a holiday set bundled with the package, e.g., 'china'."""
+        file = os.path.join(_DATA_DIR, name + '.txt')
+        if not os.path.exists(file):
+            names = sorted(f[:-4] for f in os.listdir(_DATA_DIR)
+                           if f.endswith('.txt'))
+            raise ValueError(
+                "No bundled holidays named %s; available are %s"
+                % (name, ", ".join(names))
+            )
+        return cls.from_file(file)
+
+    def __len__(self):
+        return len(self.holidays)
+
+    def __contains__(self, date):
+        day = np.datetime64(date, 'D')
+        i = np.searchsorted(self.holidays, day)
+        return i < len(self.holidays) and self.holidays[i] == day
+
+    def __call__(self, date):
+        """Return if *date* is a holiday. Raise ValueError if holidays of
+        its year are unknown."""
+        self.check_years(date.year, date.year)
+        return date in self
+
+    def __repr__(self):
+        if not len(self):
+            return "HolidaySet()"
+        return "HolidaySet(%d holidays from %s to %s)" % (
+            len(self), self.holidays[0], self.holidays[-1]
+        )
+
+    def check_years(self, first, last):
+        """Raise ValueError unless holidays of years *first* to *last* are
+        all known."""
+        if self.years is None:
+            return
+        if first < self.years[0] or last > self.years[1]:
+            raise ValueError(
+                "Holidays are known from %d to %d, not in %d" % (
+                    self.years[0], self.years[1],
+                    first if first < self.years[0] else last
+                )
+            )
+
+    def union(self, holidays):
+        """Return a holiday set with *holidays* added."""
+        return HolidaySet(np.concatenate([
+            self.holidays, np.asarray(list(holidays), dtype='datetime64[D]')
+        ]), self.years)
+
+    @property
+    def busdaycalendar(self):
+        """A *numpy.busdaycalendar* of trading days from Monday to Friday
+        but holidays, for *numpy.busday_count*, *numpy.busday_offset* and
+        *numpy.is_busday*."""
+        # built on demand, since it cannot be pickled
+        return np.busdaycalendar(weekmask='1111100', holidays=self.holidays)
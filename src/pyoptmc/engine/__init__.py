@@ -1 +1,5 @@
-from pyoptmc.engine.monte_carlo import *
\ No newline at end of file
+from pyoptmc.engine.monte_carlo import *
+from pyoptmc.engine.lsm import *
+from pyoptmc.engine.mlmc import *
+from pyoptmc.engine.path_cache import *
+from pyoptmc.engine.path_store import *
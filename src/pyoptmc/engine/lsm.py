@@ -0,0 +1,215 @@
+"""
+This module implements least-squares Monte Carlo (Longstaff and Schwartz,
+2001) for structures with early exercise features.
+
+Valuation has two phases. In the regression phase, paths are simulated batch
+by batch, and only what the backward induction needs is kept: the states on
+exercise days, the exercise values and the present values of cash flows
+between exercise days. Continuation values are then regressed on polynomials
+of the state, one least-squares problem per exercise day, with the bases of
+all exercise days evaluated at once. In the pricing phase, independent
+batches of paths are exercised according to the regression coefficients,
+which gives a low-biased estimate of the value.
+"""
+import numpy as np
+from multiprocessing import cpu_count
+from pyoptmc.engine.monte_carlo import MonteCarlo, joblib_caller
+from pyoptmc.structures.early_exercise import EarlyExerciseStructure
+
+
+__all__ = ['LeastSquaresMC']
+
+
+def _exercise_data(option, coordinator, seed, batch_size):
+    """Simulate a batch and return the states on exercise days, the present
+    values of exercise and the present values of cash flows paid in each
+    segment between exercise days."""
+    eps = coordinator.generate_eps(seed, batch_size)
+    log_paths = coordinator.paths_given_eps(eps)
+    df = coordinator.df
+    positions = option.exercise_positions
+
+    states = log_paths[:, positions]
+    exercise_pv = option.exercise_values(log_paths) * df[positions]
+    flows_pv = option.cash_flows(log_paths) * df
+    # cash flows up to and including an exercise day belong to its segment,
+    # those after the last exercise day to the last segment
+    cumulative = np.cumsum(flows_pv, axis=1)
+    cumulative = np.concatenate([np.zeros((len(cumulative), 1)), cumulative],
+                                axis=1)
+    bounds = np.concatenate([[0], positions + 1, [flows_pv.shape[1]]])
+    segments = np.diff(cumulative[:, bounds], axis=1)
+    return states, exercise_pv, segments
+
+
+def _bases(states, degree):
+    """Stacked Vandermonde matrices of prices relative to the spot, of shape
+    *(batch, exercise days, degree + 1)*."""
+    return np.exp(states)[:, :, None] ** np.arange(degree + 1)
+
+
+def _regress(states, exercise_pv, segments, holder_exercises, degree):
+    """Backward induction on the regression paths. Return the coefficients
+    of the continuation value on each exercise day."""
+    n_ex = states.shape[1]
+    bases = _bases(states, degree)
+    coefficients = np.zeros((n_ex, degree + 1))
+    value = segments[:, -1].copy()
+    for j in range(n_ex - 1, -1, -1):
+        # holders only consider paths on which exercise pays something
+        mask = exercise_pv[:, j] > 0 if holder_exercises \
+            else np.ones(len(value), dtype=bool)
+        if np.count_nonzero(mask) > degree:
+            coefficients[j] = np.linalg.lstsq(
+                bases[mask, j], value[mask], rcond=None
+            )[0]
+        continuation = bases[:, j] @ coefficients[j]
+        exercise = _decide(exercise_pv[:, j], continuation, holder_exercises)
+        value[exercise] = exercise_pv[exercise, j]
+        value += segments[:, j]
+    return coefficients
+
+
+def _decide(exercise_pv, continuation, holder_exercises):
+    if holder_exercises:
+        return (exercise_pv > continuation) & (exercise_pv > 0)
+    return exercise_pv < continuation
+
+
+def _price(states, exercise_pv, segments, coefficients, holder_exercises,
+           degree):
+    """Exercise the pricing paths on the first day where the regression
+    says so, and return the mean present value."""
+    continuation = np.einsum('nek,ek->ne', _bases(states, degree),
+                             coefficients)
+    exercise = _decide(exercise_pv, continuation, holder_exercises)
+    exercised = exercise.any(axis=1)
+    first = np.argmax(exercise, axis=1)
+    # cash flows of segments up to the exercise day are paid
+    paid = np.cumsum(segments, axis=1)
+    rows = np.arange(len(states))
+    value = np.where(
+        exercised,
+        paid[rows, first] + exercise_pv[rows, first],
+        paid[:, -1]
+    )
+    return value.mean()
+
+
+class LeastSquaresMC(MonteCarlo):
+    def __init__(self, batch_size: int, num_iter: int, caller=None,
+                 regression_iter=None, degree=3):
+        """A least-squares Monte Carlo engine for valuing structures with
+        early exercise features.
+
+        Parameters
+        ----------
+        batch_size : int
+            An integer telling the engine how many paths should be generated in each
+            iteration.
+        num_iter : int
+            Number of pricing iterations.
+        caller : callable
+            See :attr:`MonteCarlo.caller`.
+        regression_iter : int
+            Number of iterations whose paths are used in the regression. If
+            None, the same as *num_iter*.
+        degree : int
+            Degree of the polynomials in the price of the underlying asset,
+            on which continuation values are regressed."""
+        super().__init__(batch_size, num_iter, caller)
+        self.regression_iter = num_iter if regression_iter is None \
+            else regression_iter
+        self.degree = degree
+        self.coefficients = None
+
+    def regress(self, option: EarlyExerciseStructure, process, seed):
+        """Run the regression phase and return the coefficients of the
+        continuation value on each exercise day, of shape
+        *(exercise days, degree + 1)*.
+
+        Parameters
+        ----------
+        option : EarlyExerciseStructure
+            The structure to value.
+        process : BlackScholes or Heston
+            Market process.
+        seed : SeedSequence
+            Seed of the regression paths."""
+        coordinator = process.coordinator(option, process)
+        data = [
+            _exercise_data(option, coordinator, s, self.batch_size)
+            for s in seed.spawn(self.regression_iter)
+        ]
+        states, exercise_pv, segments = (
+            np.concatenate(arrays) for arrays in zip(*data)
+        )
+        return _regress(states, exercise_pv, segments,
+                        option.holder_exercises, self.degree)
+
+    def calc(self, option: EarlyExerciseStructure, process,
+             request_greeks=False, entropy=None, caller=None, caller_args=None,
+             retire_knocked_out=False):
+        """Value *option* under *process*.
+
+        The regression coefficients are computed once from paths
+        independent of the pricing paths, stored in :attr:`coefficients`,
+        and shared by all pricing batches.
+
+        Parameters
+        ----------
+        option : EarlyExerciseStructure
+            The structure to value.
+        process : BlackScholes or Heston
+            Market process.
+        request_greeks : bool
+            Greeks are not available; must be False.
+        entropy : int
+            Entropy of the seed sequence. If None, fresh entropy is used.
+        caller : callable
+            Overrides :attr:`caller` for this call.
+        caller_args : dict
+            Reserved for arguments of *caller*.
+        retire_knocked_out : bool
+            Not available; must be False."""
+        if not isinstance(option, EarlyExerciseStructure):
+            raise TypeError(
+                "LeastSquaresMC values EarlyExerciseStructure objects, got %s"
+                % option.__class__.__name__
+            )
+        if request_greeks or retire_knocked_out:
+            raise ValueError(
+                "Greeks and retiring knocked-out paths are not available "
+                "in least-squares Monte Carlo"
+            )
+        ss = np.random.SeedSequence(entropy)
+        self._most_recent_entropy = ss.entropy
+        regression_seed, pricing_seed = ss.spawn(2)
+
+        coefficients = self.regress(option, process, regression_seed)
+        self.coefficients = coefficients
+
+        coordinator = process.coordinator(option, process)
+        holder_exercises = option.holder_exercises
+        degree = self.degree
+        batch_size = self.batch_size
+
+        def _calc(seed):
+            data = _exercise_data(option, coordinator, seed, batch_size)
+            return _price(*data, coefficients, holder_exercises, degree)
+
+        if caller is None:
+            caller = self._caller
+        if caller is None:
+            caller = joblib_caller
+
+        if not callable(caller):
+            raise TypeError("caller must be callable or None")
+
+        res = caller(
+            _calc, pricing_seed.spawn(self.num_iter),
+            n_jobs=cpu_count(),
+            show_progress=True,
+            progress_desc="Least-squares Monte Carlo",
+        )
+        return np.mean(res, axis=0)
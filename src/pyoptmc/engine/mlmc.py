@@ -0,0 +1,220 @@
+"""
+This module implements a multilevel Monte Carlo estimator (Giles, 2008) over
+refinements of the simulation grid.
+
+Level *l* of *L* levels observes paths on every *2^(L-1-l)*-th simulation
+day and on the last one, so the finest level observes all simulation days.
+Levels are coupled: the coarse paths of a level are its fine paths taken on
+the coarse days, i.e., both share the same Brownian increments. Paths of a
+level are filled forward onto all simulation days, so that the structure
+values them with its own :meth:`pv_log_paths`, as if it were only observed
+on the days of the level.
+
+The estimator is the value on the coarsest level plus the expected
+differences between consecutive levels, which have small variances and need
+few paths on the expensive fine levels. Batches are allocated to levels from
+the variances of batch means and the measured cost of batches.
+"""
+import time
+import numpy as np
+from multiprocessing import cpu_count
+from pyoptmc.engine.monte_carlo import MonteCarlo, joblib_caller
+
+
+__all__ = ['MultilevelMC']
+
+
+def _level_days(n_points, stride):
+    """Indices into ``sim_t_array[1:]`` observed with *stride*, always
+    including the last one."""
+    idx = np.arange(stride - 1, n_points, stride)
+    if len(idx) == 0 or idx[-1] != n_points - 1:
+        idx = np.append(idx, n_points - 1)
+    return idx
+
+
+class _Level:
+    """Simulation of a level given the drifts and diffusions of the log price
+    on all simulation days."""
+
+    def __init__(self, drift, diffusion, fine_idx, coarse_idx):
+        n_points = len(drift)
+        bounds = np.append(0, fine_idx + 1)
+        # drifts add up, and so do variances, over the days of a step
+        self.drift = np.add.reduceat(drift, bounds[:-1])
+        self.diffusion = np.sqrt(np.add.reduceat(diffusion ** 2, bounds[:-1]))
+        self.fill_fine = self._fill_map(fine_idx, n_points)
+        self.coarse = None
+        if coarse_idx is not None:
+            # positions of the coarse days among the fine ones
+            self.coarse = np.searchsorted(fine_idx, coarse_idx)
+            self.fill_coarse = self._fill_map(coarse_idx, n_points)
+
+    @staticmethod
+    def _fill_map(idx, n_points):
+        """Map each simulation day to the last observed day, shifted by 1
+        such that 0 refers to the spot."""
+        return np.searchsorted(idx, np.arange(n_points), side='right')
+
+    @staticmethod
+    def _fill(paths, fill_map):
+        padded = np.concatenate([np.zeros((len(paths), 1)), paths], axis=1)
+        return padded[:, fill_map]
+
+    def sample(self, option, df, rng, batch_size):
+        eps = rng.normal(0, 1, (batch_size, len(self.drift)))
+        paths = (self.drift + eps * self.diffusion).cumsum(axis=1)
+        pv = option.pv_log_paths(self._fill(paths, self.fill_fine), df)
+        if self.coarse is None:
+            return pv
+        return pv - option.pv_log_paths(
+            self._fill(paths[:, self.coarse], self.fill_coarse), df
+        )
+
+
+class MultilevelMC(MonteCarlo):
+    def __init__(self, batch_size: int, num_iter: int, caller=None,
+                 levels=4, max_iter=10000):
+        """A multilevel Monte Carlo engine for structures observed on fine
+        grids, e.g., daily-monitored barriers, under a Black-Scholes process.
+
+        Parameters
+        ----------
+        batch_size : int
+            An integer telling the engine how many paths should be generated in each
+            iteration.
+        num_iter : int
+            Number of iterations run on each level to estimate variances and
+            costs, at least 2.
+        caller : callable
+            See :attr:`MonteCarlo.caller`.
+        levels : int
+            Number of levels. The coarsest level observes every
+            *2^(levels-1)*-th simulation day.
+        max_iter : int
+            Maximum number of iterations on a level."""
+        if num_iter < 2:
+            raise ValueError("At least 2 iterations per level are required.")
+        super().__init__(batch_size, num_iter, caller)
+        self.levels = levels
+        self.max_iter = max_iter
+
+    def calc(self, option, process, request_greeks=False, entropy=None,
+             caller=None, caller_args=None, retire_knocked_out=False,
+             target_error=None):
+        """Value *option* under *process*.
+
+        Parameters
+        ----------
+        option : StructureMC
+            The structure to value.
+        process : BlackScholes or BlackScholesTS
+            Market process.
+        request_greeks : bool
+            Greeks are not available; must be False.
+        entropy : int
+            Entropy of the seed sequence. If None, fresh entropy is used.
+        caller : callable
+            Overrides :attr:`caller` for this call.
+        caller_args : dict
+            Reserved for arguments of *caller*.
+        retire_knocked_out : bool
+            Not available; must be False.
+        target_error : scalar
+            The target standard error of the estimate. Iterations are added
+            to levels, in proportion to the square root of the ratio of
+            their variance to their cost, until it is reached. If None, only
+            *num_iter* iterations are run on each level.
+
+        Note
+        ----
+        The finest level observes all simulation days of *option*, on which
+        the process is simulated exactly, so the estimator has no
+        discretization bias and its whole squared error budget is spent on
+        variance.
+
+        Returns
+        -------
+        dict
+            *PV*, the standard error *Error* of the estimate, and
+            *Iterations*, the number of iterations run on each level from
+            the coarsest one."""
+        if request_greeks or retire_knocked_out:
+            raise ValueError(
+                "Greeks and retiring knocked-out paths are not available "
+                "in multilevel Monte Carlo"
+            )
+        option.check_process(process)
+        coordinator = process.coordinator(option, process)
+        try:
+            drift, diffusion = coordinator.drift, coordinator.diffusion
+        except AttributeError:
+            raise TypeError(
+                "Multilevel Monte Carlo requires a Black-Scholes process"
+            ) from None
+        df = coordinator.df
+        n_points = len(df)
+
+        strides = [2 ** (self.levels - 1 - l) for l in range(self.levels)]
+        idx = [_level_days(n_points, s) for s in strides]
+        levels = [
+            _Level(drift, diffusion, idx[l], idx[l - 1] if l else None)
+            for l in range(self.levels)
+        ]
+
+        ss = np.random.SeedSequence(entropy)
+        self._most_recent_entropy = ss.entropy
+        level_seeds = ss.spawn(self.levels)
+
+        if caller is None:
+            caller = self._caller
+        if caller is None:
+            caller = joblib_caller
+
+        if not callable(caller):
+            raise TypeError("caller must be callable or None")
+
+        batch_size = self.batch_size
+        samples = [[] for _ in levels]
+        costs = [[] for _ in levels]
+
+        def _run(l, n):
+            level = levels[l]
+
+            def _calc(seed):
+                start = time.perf_counter()
+                val = level.sample(option, df, np.random.default_rng(seed),
+                                   batch_size)
+                return val, time.perf_counter() - start
+
+            res = caller(
+                _calc, level_seeds[l].spawn(n),
+                n_jobs=cpu_count(),
+                show_progress=True,
+                progress_desc="Multilevel Monte Carlo, level %d" % l,
+            )
+            samples[l].extend(r[0] for r in res)
+            costs[l].extend(r[1] for r in res)
+
+        for l in range(self.levels):
+            _run(l, self.num_iter)
+
+        while target_error is not None:
+            var = np.array([np.var(s, ddof=1) for s in samples])
+            cost = np.array([np.mean(c) for c in costs])
+            # Giles' allocation minimizing cost for the target variance
+            target = np.ceil(
+                np.sqrt(var / cost) * np.sum(np.sqrt(var * cost)) /
+                target_error ** 2
+            ).astype(int)
+            target = np.minimum(target, self.max_iter)
+            extra = target - np.array([len(s) for s in samples])
+            if not np.any(extra > 0):
+                break
+            for l in np.flatnonzero(extra > 0):
+                _run(l, int(extra[l]))
+
+        pv = sum(np.mean(s) for s in samples)
+        error = np.sqrt(sum(np.var(s, ddof=1) / len(s) for s in samples))
+        return dict(PV=pv, Error=error,
+                    Iterations=tuple(len(s) for s in samples))
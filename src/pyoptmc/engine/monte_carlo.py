@@ -1,5 +1,6 @@
 import numpy as np
 from tqdm import tqdm
+from scipy.optimize import minimize_scalar
 from pyoptmc.structures.base import StructureMC
 from pyoptmc.model.market_process import BlackScholes
 from joblib import Parallel, delayed
@@ -9,21 +10,167 @@ from multiprocessing import cpu_count
 
 __all__ = ['MonteCarlo']
 
+_greek_keys = ('PV', 'Delta', 'Gamma', 'Rho', 'Vega', 'Theta')
+
+
+def _run_retiring_caller(
+        batch_size: int,
+        option: StructureMC,
+        process: BlackScholes,
+):
+    """Simulate paths block by block between knock-out observation points,
+    dropping paths as soon as they are knocked out."""
+    schedule = option.knock_out_schedule()
+    if schedule is None:
+        raise ValueError(
+            "%s does not provide a knock-out schedule, so knocked-out paths "
+            "cannot be retired" % option.__class__.__name__
+        )
+    positions, log_barriers = schedule
+    _coordinator = process.coordinator(option, process)
+    df = _coordinator.df
+    n_points = len(df)
+
+    def _calc(seed):
+        rng = np.random.default_rng(seed)
+        state = _coordinator.initial_state(batch_size)
+        paths = np.empty((batch_size, n_points))
+        pv_sum = 0.0
+        start = 0
+        for pos, barrier in zip(positions, log_barriers):
+            stop = pos + 1
+            paths[:, start:stop], state = _coordinator.evolve(
+                rng, state, start, stop
+            )
+            start = stop
+            ko = paths[:, pos] >= barrier
+            if not ko.any():
+                continue
+            # The rest of a knocked-out path is irrelevant to its value,
+            # so it is padded with the level at which it is knocked out
+            retired = paths[ko]
+            retired[:, stop:] = retired[:, pos:stop]
+            pv_sum += option.pv_log_paths(retired, df) * len(retired)
+
+            alive = np.logical_not(ko)
+            survivors = np.empty((np.count_nonzero(alive), n_points))
+            survivors[:, :stop] = paths[alive, :stop]
+            paths, state = survivors, state[alive]
+            if len(paths) == 0:
+                return pv_sum / batch_size
+
+        if start < n_points:
+            paths[:, start:], state = _coordinator.evolve(
+                rng, state, start, n_points
+            )
+        pv_sum += option.pv_log_paths(paths, df) * len(paths)
+        return pv_sum / batch_size
+
+    _calc.__doc__ = (
+        "Run 1 time of Monte Carlo simulation given a random seed, retiring "
+        "knocked-out paths.\n"
+        "Parameters:\n"
+        f"batch_size={batch_size}, option={option}, process={process}"
+    )
+    return _calc
+
+
+def _pilot_importance_drift(
+        batch_size: int,
+        option: StructureMC,
+        process: BlackScholes,
+        seed,
+        rounds: int = 2,
+        bounds=(-5.0, 5.0),
+):
+    """Choose the drift of importance sampling which minimizes the second
+    moment of weighted present values, estimated from pilot batches. Each
+    round samples paths under the drift found by the previous one."""
+    _coordinator = process.coordinator(option, process)
+    df = _coordinator.df
+    drift = 0.0
+    for s in seed.spawn(rounds):
+        eps, weights = _coordinator.importance_sample(
+            _coordinator.generate_eps(s, batch_size), drift
+        )
+        pv = option.pv_paths(_coordinator.paths_given_eps(eps), df)
+        # E[(pv * w_theta)^2] under the drift theta is estimated from paths
+        # sampled under the current drift
+        moment = pv * pv * weights
+
+        def _second_moment(theta):
+            return np.mean(moment * _coordinator.likelihood_ratio(eps, theta))
+
+        drift = minimize_scalar(_second_moment, bounds=bounds,
+                                method='bounded').x
+    return drift
+
 
 def _run_one_time_caller(
         batch_size: int,
         option: StructureMC,
         process: BlackScholes,
         request_greeks: bool = False,
+        retire_knocked_out: bool = False,
+        importance_drift=None,
+        strata=None,
 ):
+    if retire_knocked_out:
+        if request_greeks:
+            raise ValueError(
+                "Greeks are not available when knocked-out paths are retired"
+            )
+        if importance_drift is not None or strata is not None:
+            raise ValueError(
+                "Importance and stratified sampling are not available when "
+                "knocked-out paths are retired"
+            )
+        return _run_retiring_caller(batch_size, option, process)
+
+    if strata is not None and not 1 <= strata <= batch_size:
+        raise ValueError(
+            "The number of strata should be between 1 and the batch size, "
+            "got %s" % strata
+        )
+
     _coordinator = process.coordinator(option, process)
     df = _coordinator.df
 
+    # strata are equiprobable, so the mean of a stratum is weighted by the
+    # inverse of its number of paths; equal numbers need no weights
+    strata_weights = None
+    if strata is not None and batch_size % strata:
+        counts = np.bincount(np.arange(batch_size) % strata)
+        strata_weights = (batch_size / strata / counts)[
+            np.arange(batch_size) % strata
+        ]
+
+    def _sample(seed):
+        """Draw normals for a batch, and return them with the function
+        valuing paths simulated from them."""
+        eps = _coordinator.generate_eps(seed, batch_size)
+        weights = strata_weights
+        if strata is not None:
+            eps = _coordinator.stratify(eps, strata)
+        if importance_drift is not None:
+            eps, is_weights = _coordinator.importance_sample(
+                eps, importance_drift
+            )
+            weights = is_weights if weights is None else weights * is_weights
+        if weights is None:
+            return eps, option.pv_log_paths
+
+        def _pv(log_paths, _df):
+            # paths may be valued by several structures at once
+            pv = option.pv_paths(log_paths, _df)
+            return np.einsum('i,i...->...', weights, pv) / len(weights)
+        return eps, _pv
+
     if not request_greeks:
         def _calc(seed):
-            eps = _coordinator.generate_eps(seed, batch_size)
+            eps, pv_log_paths = _sample(seed)
             path = _coordinator.paths_given_eps(eps)
-            return option.pv_log_paths(path, df)
+            return pv_log_paths(path, df)
         return _calc
 
     fd_steps = dict(ds=0.01, dr=0.01, dv=0.005)
@@ -31,41 +178,48 @@ def _run_one_time_caller(
     ds_sq = ds * ds
 
     def _calc(seed):
-        eps = _coordinator.generate_eps(seed, batch_size)
+        eps, pv_log_paths = _sample(seed)
         base_path = _coordinator.paths_given_eps(eps)
         shifted_path = _coordinator.shift(
             paths=base_path, ds=ds, dr=dr, dv=dv, eps=eps
         )
 
         # base PV
-        pv = option.pv_log_paths(base_path, df)
+        pv = pv_log_paths(base_path, df)
 
         # S: delta, gamma
-        pv_s_plus = option.pv_log_paths(shifted_path['S plus'], df)
-        pv_s_minus = option.pv_log_paths(shifted_path['S minus'], df)
+        pv_s_plus = pv_log_paths(shifted_path['S plus'], df)
+        pv_s_minus = pv_log_paths(shifted_path['S minus'], df)
         delta = (pv_s_plus - pv_s_minus) / (2 * ds) / option.spot
         gamma = (pv_s_plus + pv_s_minus - 2 * pv) / (
             ds_sq * option.spot * option.spot
         )
 
         # R: rho
-        pv_r_plus = option.pv_log_paths(
+        pv_r_plus = pv_log_paths(
             shifted_path['R plus'], shifted_path['DF plus']
         )
         rho = (pv_r_plus - pv) / 10.0
 
         # V: vega
-        pv_v_plus = option.pv_log_paths(shifted_path['V plus'], df)
-        pv_v_minus = option.pv_log_paths(shifted_path['V minus'], df)
+        pv_v_plus = pv_log_paths(shifted_path['V plus'], df)
+        pv_v_minus = pv_log_paths(shifted_path['V minus'], df)
         vega = pv_v_plus - pv_v_minus
 
         # Theta
-        pv_next_day = option.pv_log_paths(
+        pv_next_day = pv_log_paths(
             shifted_path['Paths next day'], shifted_path['DF next day']
         )
         theta = pv_next_day - pv
 
-        return pv, delta, gamma, rho, vega, theta
+        # sensitivities to model parameters, e.g., those of Heston
+        model_vegas = tuple(
+            pv_log_paths(shifted_path[name + ' plus'], df) -
+            pv_log_paths(shifted_path[name + ' minus'], df)
+            for name in _coordinator.model_greeks
+        )
+
+        return (pv, delta, gamma, rho, vega, theta) + model_vegas
 
     _calc.__doc__ = (
         "Run 1 time of Monte Carlo simulation given a random seed.\n"
@@ -131,6 +285,11 @@ class MonteCarlo:
         lambda self, v: None, lambda self: None,
         "The most recently used entropy."
     )
+    most_recent_importance_drift = property(
+        lambda self: self._most_recent_importance_drift,
+        lambda self, v: None, lambda self: None,
+        "The most recently used drift of importance sampling."
+    )
 
     @property
     def caller(self):
@@ -165,16 +324,126 @@ class MonteCarlo:
         self.batch_size = batch_size
         self.num_iter = num_iter
         self._most_recent_entropy = None
+        self._most_recent_importance_drift = None
         self._caller = caller
 
     def calc(self, option: StructureMC, process: BlackScholes,
-             request_greeks=False, entropy=None, caller=None, caller_args=None):
+             request_greeks=False, entropy=None, caller=None, caller_args=None,
+             retire_knocked_out=False, importance_drift=None, strata=None,
+             path_cache=None):
+        """Value *option* under *process*.
+
+        Parameters
+        ----------
+        option : StructureMC
+            The structure to value.
+        process : BlackScholes or Heston
+            Market process.
+        request_greeks : bool
+            Whether to calculate Greeks along with the present value. Under
+            models with more parameters, e.g., Heston, the sensitivity to
+            each parameter is reported as *Vega <name>*: the change in PV
+            for a 0.01 change in the parameter.
+        entropy : int
+            Entropy of the seed sequence. If None, fresh entropy is used.
+        caller : callable
+            Overrides :attr:`caller` for this call.
+        caller_args : dict
+            Reserved for arguments of *caller*.
+        retire_knocked_out : bool
+            If True, paths are simulated block by block between knock-out
+            observation points and knocked-out paths are dropped after each
+            of them, so only surviving paths are simulated forward. This pays
+            off for autocallables that are likely to be called early. Only
+            the present value is available in this mode, and *option* must
+            provide a :meth:`knock_out_schedule`. Default is False.
+        importance_drift : scalar or str
+            If given, paths are sampled with this annual drift added to the
+            Brownian motion driving the process, and the present value of
+            each path is weighted by its likelihood ratio. A drift towards
+            the rare paths which dominate the value, e.g., towards a distant
+            knock-in barrier, reduces the variance. If "pilot", the drift is
+            chosen to minimize the variance on two pilot batches, and stored
+            in :attr:`most_recent_importance_drift`. Requires a process
+            supporting importance sampling, e.g., Black-Scholes, and
+            *option* to provide :meth:`pv_paths`. Default is None.
+        strata : int
+            If given, the terminal value of the Brownian motion driving each
+            batch is stratified into this number of equiprobable strata,
+            and the rest of each path is filled by a Brownian bridge. This
+            reduces the variance of structures whose value depends mostly
+            on the terminal price, e.g., snowballs surviving to maturity.
+            The batch size should be a multiple of *strata*; otherwise
+            *option* must provide :meth:`pv_paths`. Requires a process
+            supporting stratified sampling, e.g., Black-Scholes. Default is
+            None.
+        path_cache : PathCache
+            If given, the log paths of all batches are looked up in
+            *path_cache*, or simulated and stored there, and valued in this
+            process. Repeated valuations with the same *entropy*, process
+            and simulation days then reuse the paths. Only the present value
+            is available in this mode. Default is None."""
+        res_mean = np.mean(self.calc_batches(
+            option, process, request_greeks, entropy, caller, caller_args,
+            retire_knocked_out, importance_drift, strata, path_cache
+        ), axis=0)
+
+        if not request_greeks:
+            return res_mean
+
+        keys = _greek_keys + tuple(
+            'Vega ' + name for name in process.coordinator.model_greeks
+        )
+        return dict(zip(keys, res_mean))
+
+    def calc_batches(self, option: StructureMC, process: BlackScholes,
+                     request_greeks=False, entropy=None, caller=None,
+                     caller_args=None, retire_knocked_out=False,
+                     importance_drift=None, strata=None, path_cache=None):
+        """Run the simulation of :meth:`calc`, with the same parameters, and
+        return the result of each batch instead of their mean.
+
+        Batches are independent, so the standard error of the mean of the
+        results is their standard deviation divided by the square root of
+        *num_iter*.
+
+        Returns
+        -------
+        ndarray
+            An array of shape *(num_iter,)*, or *(num_iter, k)* if *option*
+            values to *k* numbers, e.g., a
+            :class:`~pyoptmc.structures.bundle.StructureBundle`, or Greeks
+            are requested, in the order of *PV, Delta, Gamma, Rho, Vega,
+            Theta* and the sensitivities to model parameters."""
+        option.check_process(process, shifted=request_greeks)
         ss = np.random.SeedSequence(entropy)
         self._most_recent_entropy = ss.entropy
         subs = ss.spawn(self.num_iter)
 
+        if path_cache is not None:
+            if request_greeks or retire_knocked_out or \
+                    importance_drift is not None or strata is not None:
+                raise ValueError(
+                    "Only the present value of plain simulation is available "
+                    "with a path cache"
+                )
+            return self._calc_cached(option, process, ss.entropy, subs,
+                                     caller, path_cache)
+
+        if isinstance(importance_drift, str):
+            if importance_drift != 'pilot':
+                raise ValueError(
+                    "importance_drift should be a scalar, 'pilot' or None, "
+                    "got %s" % importance_drift
+                )
+            importance_drift = _pilot_importance_drift(
+                self.batch_size, option, process, ss.spawn(1)[0]
+            )
+        self._most_recent_importance_drift = importance_drift
+
         _calc = _run_one_time_caller(
-            self.batch_size, option, process, request_greeks
+            self.batch_size, option, process, request_greeks,
+            retire_knocked_out, importance_drift, strata
         )
 
         if caller_args is None:
@@ -194,21 +463,125 @@ class MonteCarlo:
             show_progress=True,
             progress_desc="Monte Carlo Greeks",
         )
-        res_mean = np.mean(res, axis=0)
+        return np.asarray(res)
 
-        if not request_greeks:
-            return res_mean
+    def calc_scenarios(self, option: StructureMC, process: BlackScholes,
+                       spots, vol_shifts=(0.0,), entropy=None, caller=None):
+        """Value *option* under scenarios of the spot price and of the
+        volatility of *process*, all on the same random numbers.
+
+        Each batch draws its random numbers once. A path set is projected
+        from them for each volatility shift, with the diffusion scaled
+        accordingly, and a spot scenario moves its log paths by the log
+        ratio of the spot to that of *option*, which is equivalent to
+        moving the barriers the other way. Scenario values are thus free of
+        noise relative to each other, and far cheaper than valuing each
+        scenario on its own.
 
-        _pv, _delta, _gamma, _rho, _vega, _theta = res_mean
-        return dict(PV=_pv, Delta=_delta, Gamma=_gamma,
-                    Rho=_rho, Vega=_vega, Theta=_theta)
+        Parameters
+        ----------
+        option : StructureMC
+            The structure to value.
+        process : BlackScholes or Heston
+            Market process. It must support volatility scenarios.
+        spots : array_like
+            Spot prices of the scenarios.
+        vol_shifts : array_like
+            Parallel shifts of the annual volatility of *process*.
+        entropy : int
+            Entropy of the seed sequence. If None, fresh entropy is used.
+            Seeds are those of :meth:`calc`, so the scenario of the spot of
+            *option* and a zero shift reproduces :meth:`calc`.
+        caller : callable
+            Overrides :attr:`caller` for this call.
+
+        Returns
+        -------
+        ndarray
+            An array of shape *(len(spots), len(vol_shifts))*, followed by
+            the shape of the value of *option*."""
+        log_shifts = np.log(np.asarray(spots, dtype=float) / option.spot)
+        vol_shifts = np.asarray(vol_shifts, dtype=float)
+        if log_shifts.ndim != 1 or vol_shifts.ndim != 1:
+            raise ValueError("spots and vol_shifts should be 1-D.")
+        option.check_process(
+            process, shifted=bool(np.any(log_shifts) or np.any(vol_shifts))
+        )
+        ss = np.random.SeedSequence(entropy)
+        self._most_recent_entropy = ss.entropy
+        subs = ss.spawn(self.num_iter)
+        coordinator = process.coordinator(option, process)
+        df = coordinator.df
+        batch_size = self.batch_size
+
+        def _calc(seed):
+            eps = coordinator.generate_eps(seed, batch_size)
+            res = []
+            for dv in vol_shifts:
+                paths = coordinator.paths_given_vol_shift(eps, dv)
+                res.append([option.pv_log_paths(paths + x, df)
+                            for x in log_shifts])
+            # scenarios of spots come first
+            return np.swapaxes(np.asarray(res), 0, 1)
+
+        if caller is None:
+            caller = self._caller
+        if caller is None:
+            caller = joblib_caller
+        if not callable(caller):
+            raise TypeError("caller must be callable or None")
+
+        res = caller(
+            _calc, subs,
+            n_jobs=cpu_count(),
+            show_progress=True,
+            progress_desc="Monte Carlo scenarios",
+        )
+        return np.mean(res, axis=0)
+
+    def _calc_cached(self, option, process, entropy, subs, caller,
+                     path_cache):
+        """Value *option* on the paths cached for *entropy*, simulating and
+        caching them first if necessary."""
+        coordinator = process.coordinator(option, process)
+        key = path_cache.key(option, process, entropy, self.batch_size,
+                             self.num_iter)
+        paths = path_cache.get(key)
+        if paths is None:
+            batch_size = self.batch_size
+
+            def _simulate(seed):
+                eps = coordinator.generate_eps(seed, batch_size)
+                return coordinator.paths_given_eps(eps)
+
+            if caller is None:
+                caller = self._caller
+            if caller is None:
+                caller = joblib_caller
+            if not callable(caller):
+                raise TypeError("caller must be callable or None")
+
+            paths = np.stack(caller(
+                _simulate, subs,
+                n_jobs=cpu_count(),
+                show_progress=True,
+                progress_desc="Monte Carlo paths",
+            ))
+            path_cache.put(key, paths)
+        df = coordinator.df
+        return np.asarray([option.pv_log_paths(p, df) for p in paths])
 
     def single_iter_caller(
             self, option: StructureMC, process: BlackScholes,
-            request_greeks=False
+            request_greeks=False, retire_knocked_out=False,
+            importance_drift=None, strata=None
     ):
+        option.check_process(process, shifted=request_greeks)
         return _run_one_time_caller(
             batch_size=self.batch_size, option=option,
             process=process,
-            request_greeks=request_greeks
+            request_greeks=request_greeks,
+            retire_knocked_out=retire_knocked_out,
+            importance_drift=importance_drift,
+            strata=strata
         )
@@ -0,0 +1,124 @@
+"""
+This module implements a cache of simulated path sets, which lets repeated
+valuations with the same entropy, e.g., by solvers and what-if analyses,
+reuse log paths instead of simulating them again.
+
+A path set is keyed by the parameters of the process, the simulation days
+and spot price of the structure, the entropy and the batch layout of the
+engine. Path sets are kept in memory up to a cap and evicted in least
+recently used order. Evicted path sets are either dropped or, given a spill
+directory, saved to ``.npy`` files and read back as memory maps.
+"""
+import os
+import pickle
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+
+__all__ = ['PathCache']
+
+
+def _fingerprint(obj):
+    """Return a picklable summary of the public attributes of *obj*, which
+    hold the parameters of processes. Private attributes hold caches."""
+    items = []
+    for name, val in sorted(vars(obj).items()):
+        if name.startswith('_'):
+            continue
+        try:
+            val = np.asarray(val, dtype=float).tobytes()
+        except (TypeError, ValueError):
+            val = repr(val)
+        items.append((name, val))
+    return type(obj).__name__, tuple(items)
+
+
+class PathCache:
+    def __init__(self, max_bytes=2 ** 30, spill_dir=None):
+        """A least recently used cache of path sets with a memory cap.
+
+        Pass it to :meth:`~pyoptmc.engine.monte_carlo.MonteCarlo.calc` as
+        *path_cache*, along with a fixed *entropy*.
+
+        Parameters
+        ----------
+        max_bytes : int
+            The maximum number of bytes of path sets kept in memory.
+        spill_dir : str
+            A directory where path sets evicted from memory are saved as
+            ``.npy`` files. If None, evicted path sets are dropped.
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes should be non-negative.")
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._memory = OrderedDict()
+        self._spilled = {}
+
+    @staticmethod
+    def key(option, process, entropy, batch_size, num_iter):
+        """Return the key of the path set simulated for *option* under
+        *process* with *entropy*, in *num_iter* batches of *batch_size*
+        paths."""
+        offsets = getattr(option, 'log_spot_offsets', None)
+        fields = (
+            _fingerprint(process),
+            np.asarray(option.sim_t_array, dtype=float).tobytes(),
+            float(option.spot),
+            getattr(option, 'path_reduction', None),
+            None if offsets is None else np.asarray(offsets).tobytes(),
+            entropy, batch_size, num_iter,
+        )
+        return hashlib.sha1(pickle.dumps(fields)).hexdigest()
+
+    @property
+    def nbytes(self):
+        """Number of bytes of path sets kept in memory."""
+        return sum(paths.nbytes for paths in self._memory.values())
+
+    def __len__(self):
+        return len(self._memory) + len(self._spilled)
+
+    def __contains__(self, key):
+        return key in self._memory or key in self._spilled
+
+    def get(self, key):
+        """Return the path set of *key*, of shape *(num_iter, batch_size,
+        ...)*, or None if it is not cached."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        return self._spilled.get(key)
+
+    def put(self, key, paths):
+        """Cache the path set *paths* under *key*, evicting least recently
+        used path sets beyond the memory cap."""
+        self.discard(key)
+        self._memory[key] = paths
+        while self._memory and self.nbytes > self.max_bytes:
+            self._evict(*self._memory.popitem(last=False))
+
+    def _evict(self, key, paths):
+        if self.spill_dir is None:
+            return
+        file = os.path.join(self.spill_dir, key + '.npy')
+        np.save(file, paths)
+        self._spilled[key] = np.load(file, mmap_mode='r')
+
+    def discard(self, key):
+        """Remove the path set of *key*, and its file if it was spilled."""
+        self._memory.pop(key, None)
+        if self._spilled.pop(key, None) is not None:
+            os.remove(os.path.join(self.spill_dir, key + '.npy'))
+
+    def clear(self):
+        """Remove all path sets and spilled files."""
+        for key in list(self):
+            self.discard(key)
+
+    def __iter__(self):
+        yield from list(self._memory)
+        yield from list(self._spilled)
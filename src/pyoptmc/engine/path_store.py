@@ -0,0 +1,212 @@
+"""
+This module implements an on-disk store of simulated paths, for simulating
+a large number of paths once and valuing many structures against them.
+
+A store is a directory holding ``paths.npy``, an array of log paths of
+shape *(batches, batch_size, ...)*, and ``meta.json``, which describes the
+simulation. Batches are the chunks of the store: each is written in place
+by the worker that simulates it, and read back as a zero-copy view of a
+memory map by the worker that values it, so paths never pass between
+processes.
+"""
+import os
+import json
+import numpy as np
+from multiprocessing import cpu_count
+from numpy.lib.format import open_memmap
+from pyoptmc.engine.monte_carlo import joblib_caller
+
+
+__all__ = ['PathStore', 'simulate_to_store', 'calc_from_store']
+
+_PATHS_FILE = 'paths.npy'
+_META_FILE = 'meta.json'
+
+
+class PathStore:
+    def __init__(self, directory):
+        """A store of paths written by :func:`simulate_to_store`.
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the store."""
+        with open(os.path.join(directory, _META_FILE)) as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.file = os.path.join(directory, _PATHS_FILE)
+        self.sim_t_array = np.array(meta['sim_t_array'])
+        self.df = np.array(meta['df'])
+        self.spot = meta['spot']
+        self.path_reduction = meta['path_reduction']
+        self.process = meta['process']
+        self.entropy = int(meta['entropy'])
+        self.batch_size = meta['batch_size']
+        self.paths = np.load(self.file, mmap_mode='r')
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, i):
+        """Return the log paths of batch *i*, a view of the memory map."""
+        return self.paths[i]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def positions(self, option):
+        """Return the indices into the simulation days of the store of
+        those of *option*, or raise ValueError if *option* cannot be valued
+        on the paths of the store."""
+        if option.spot != self.spot:
+            raise ValueError(
+                "The spot price of the structure, %s, differs from that of "
+                "the store, %s" % (option.spot, self.spot)
+            )
+        # only the name of the process is stored
+        option.check_process(None)
+        if getattr(option, 'path_reduction', None) != self.path_reduction:
+            raise ValueError(
+                "The structure and the store reduce paths differently."
+            )
+        days = self.sim_t_array[1:]
+        option_days = np.asarray(option.sim_t_array[1:])
+        idx = np.searchsorted(days, option_days)
+        if np.any(idx >= len(days)) or np.any(days[idx] != option_days):
+            raise ValueError(
+                "Simulation days of the structure are not simulated in the "
+                "store."
+            )
+        return idx
+
+
+def _get_caller(engine, caller):
+    if caller is None:
+        caller = engine.caller if engine is not None else None
+    if caller is None:
+        caller = joblib_caller
+    if not callable(caller):
+        raise TypeError("caller must be callable or None")
+    return caller
+
+
+def simulate_to_store(engine, option, process, directory, entropy=None,
+                      dtype=np.float64, caller=None):
+    """Simulate *num_iter* batches of *batch_size* paths of *engine* for
+    *option* under *process*, and write them to a store in *directory*.
+
+    Parameters
+    ----------
+    engine : MonteCarlo
+        The engine whose batch layout is used.
+    option : StructureMC
+        The structure whose simulation days and spot price are used, e.g.,
+        a :class:`~pyoptmc.structures.bundle.StructureBundle` of a book.
+    process : BlackScholes or Heston
+        Market process.
+    directory : str
+        The directory of the store, created if necessary.
+    entropy : int
+        Entropy of the seed sequence. If None, fresh entropy is used. Seeds
+        are those of :meth:`~pyoptmc.engine.monte_carlo.MonteCarlo.calc`.
+    dtype : data-type
+        The type of stored log paths, e.g., ``np.float32`` to halve the
+        size of the store.
+    caller : callable
+        Overrides :attr:`~pyoptmc.engine.monte_carlo.MonteCarlo.caller`.
+
+    Returns
+    -------
+    PathStore
+        The store."""
+    option.check_process(process)
+    os.makedirs(directory, exist_ok=True)
+    ss = np.random.SeedSequence(entropy)
+    subs = ss.spawn(engine.num_iter)
+    coordinator = process.coordinator(option, process)
+    batch_size = engine.batch_size
+    file = os.path.join(directory, _PATHS_FILE)
+
+    def _simulate(seed):
+        eps = coordinator.generate_eps(seed, batch_size)
+        return coordinator.paths_given_eps(eps)
+
+    # the first batch tells the shape of the store
+    first = _simulate(subs[0])
+    out = open_memmap(file, mode='w+', dtype=dtype,
+                      shape=(len(subs),) + first.shape)
+    out[0] = first
+    out.flush()
+    del out
+
+    def _write(task):
+        i, seed = task
+        out = open_memmap(file, mode='r+')
+        out[i] = _simulate(seed)
+        out.flush()
+
+    _get_caller(engine, caller)(
+        _write, list(enumerate(subs))[1:],
+        n_jobs=cpu_count(),
+        show_progress=True,
+        progress_desc="Writing paths",
+    )
+
+    meta = dict(
+        sim_t_array=np.asarray(option.sim_t_array).tolist(),
+        df=np.asarray(coordinator.df).tolist(),
+        spot=float(option.spot),
+        path_reduction=getattr(option, 'path_reduction', None),
+        process=type(process).__name__,
+        # entropy may exceed the range of JSON numbers
+        entropy=str(ss.entropy),
+        batch_size=batch_size,
+    )
+    with open(os.path.join(directory, _META_FILE), 'w') as f:
+        json.dump(meta, f)
+    return PathStore(directory)
+
+
+def calc_from_store(option, store, caller=None, return_batches=False):
+    """Value *option* on the paths of *store*, batch by batch in parallel.
+
+    Parameters
+    ----------
+    option : StructureMC
+        The structure to value. Its simulation days must be simulated in the
+        store, and its spot price must be that of the store.
+    store : PathStore
+        The store.
+    caller : callable
+        A caller like :func:`~pyoptmc.engine.monte_carlo.joblib_caller`. If
+        None, *joblib* is used.
+    return_batches : bool
+        If True, return the value of each batch instead of their mean.
+
+    Returns
+    -------
+    float or ndarray
+        The present value of *option*."""
+    idx = store.positions(option)
+    # batches are passed as they are if all days are used
+    if np.array_equal(idx, np.arange(len(store.sim_t_array) - 1)):
+        idx = None
+    file = store.file
+    df = store.df if idx is None else store.df[idx]
+
+    def _value(i):
+        paths = np.load(file, mmap_mode='r')[i]
+        if idx is not None:
+            paths = paths[..., idx]
+        return option.pv_log_paths(paths, df)
+
+    res = np.asarray(_get_caller(None, caller)(
+        _value, range(len(store)),
+        n_jobs=cpu_count(),
+        show_progress=True,
+        progress_desc="Valuing stored paths",
+    ))
+    if return_batches:
+        return res
+    return np.mean(res, axis=0)
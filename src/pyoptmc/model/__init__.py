@@ -1 +1,5 @@
 from pyoptmc.model.market_process import *
+from pyoptmc.model.calibration import *
+from pyoptmc.model.local_vol import *
+from pyoptmc.model.jump_diffusion import *
+from pyoptmc.model.multi_asset import *
@@ -0,0 +1,192 @@
+"""
+This module calibrates the Heston model to European option quotes.
+
+Vanilla prices are computed semi-analytically from the characteristic
+function of the log price (Lewis' single-integral formula) using a fixed
+Gauss-Legendre rule, so that a whole grid of strikes and maturities is
+priced with a few array operations.
+"""
+import functools
+import numpy as np
+from scipy.optimize import least_squares
+from pyoptmc.model.market_process import Heston
+
+
+__all__ = ['HestonCalibrator']
+
+_default_initial = (-0.5, 0.04, 1.5, 0.5, 0.04)
+_default_bounds = (
+    (-0.999, 1e-4, 1e-3, 1e-3, 1e-4),
+    (0.999, 4.0, 20.0, 5.0, 4.0)
+)
+
+
+@functools.lru_cache(maxsize=16)
+def _integration_nodes(n_nodes, upper):
+    """Gauss-Legendre nodes on [0, upper] and weights including the factor
+    1 / (u^2 + 1/4) of the Lewis integrand."""
+    x, w = np.polynomial.legendre.leggauss(n_nodes)
+    u = (x + 1) * upper / 2
+    w = w * upper / 2 / (u * u + 0.25)
+    u.setflags(write=False)
+    w.setflags(write=False)
+    return u, w
+
+
+def _heston_cf(u, t, rho, theta, kappa, xi, v0):
+    """Characteristic function of log(S_t / S_0) - (r - q) t evaluated at
+    complex *u*, in the formulation of Albrecher et al. (2007)."""
+    iu = 1j * u
+    beta = kappa - rho * xi * iu
+    d = np.sqrt(beta * beta + xi * xi * (iu + u * u))
+    g = (beta - d) / (beta + d)
+    e = np.exp(-d * t)
+    c = kappa * theta / (xi * xi) * (
+        (beta - d) * t - 2 * np.log((1 - g * e) / (1 - g))
+    )
+    dd = (beta - d) / (xi * xi) * (1 - e) / (1 - g * e)
+    return np.exp(c + dd * v0)
+
+
+class HestonCalibrator:
+    def __init__(self, r, q, day_counter=252, n_nodes=128, upper=200.0):
+        """Calibrates *rho*, *theta*, *kappa*, *xi* and *v0* of the Heston model
+        to a grid of European option quotes.
+
+        The calibrator keeps the last solution and uses it as the starting
+        point of the next calibration, so intraday recalibration usually takes
+        a few iterations.
+
+        Parameters
+        ----------
+        r : scalar
+            The risk-free rate.
+        q : scalar
+            The continuous yield of the underlying asset.
+        day_counter : int
+            Passed to the calibrated :class:`~pyoptmc.model.market_process.Heston`.
+        n_nodes : int
+            Number of Gauss-Legendre nodes of the pricing integral.
+        upper : scalar
+            Truncation of the pricing integral."""
+        self.r = r
+        self.q = q
+        self.day_counter = day_counter
+        self.n_nodes = n_nodes
+        self.upper = upper
+        self.params = None
+        self.result = None
+
+    def _setup(self, spot, strikes, maturities, is_call):
+        """Everything in the pricing integral that does not depend on model
+        parameters."""
+        strikes, maturities, is_call = np.broadcast_arrays(
+            np.asarray(strikes, dtype=float), np.asarray(maturities, dtype=float),
+            np.asarray(is_call, dtype=bool)
+        )
+        strikes, maturities = strikes.ravel(), maturities.ravel()
+        u, w = _integration_nodes(self.n_nodes, self.upper)
+        t_unique, t_idx = np.unique(maturities, return_inverse=True)
+        k = np.log(spot / strikes) + (self.r - self.q) * maturities
+        return dict(
+            strikes=strikes, is_call=is_call.ravel(),
+            t=maturities, t_unique=t_unique, t_idx=t_idx,
+            u=u[:, None] - 0.5j, w=w,
+            phase=np.exp(1j * np.outer(u, k)),
+            forward=spot * np.exp(-self.q * maturities),
+            scale=np.sqrt(spot * strikes) *
+            np.exp(-(self.r + self.q) * maturities / 2) / np.pi,
+            df=np.exp(-self.r * maturities)
+        )
+
+    @staticmethod
+    def _call_prices(setup, params):
+        rho, theta, kappa, xi, v0 = params
+        # the characteristic function only depends on maturities
+        phi = _heston_cf(setup['u'], setup['t_unique'][None, :],
+                         rho, theta, kappa, xi, v0)
+        integrand = (setup['phase'] * phi[:, setup['t_idx']]).real
+        return setup['forward'] - setup['scale'] * (setup['w'] @ integrand)
+
+    def _prices(self, setup, params):
+        calls = self._call_prices(setup, params)
+        puts = calls - setup['forward'] + setup['strikes'] * setup['df']
+        return np.where(setup['is_call'], calls, puts)
+
+    def prices(self, hst, spot, strikes, maturities, is_call=True):
+        """Price European options under a Heston process.
+
+        Parameters
+        ----------
+        hst : Heston
+            The process. Its *r* and *q* are ignored in favour of those of
+            the calibrator.
+        spot : scalar
+            The spot price of the underlying asset.
+        strikes : array_like
+            Strikes of the options.
+        maturities : array_like
+            Maturities in years, broadcast against *strikes*.
+        is_call : bool or array_like
+            Whether each option is a call or a put, broadcast against
+            *strikes*.
+
+        Returns
+        -------
+        ndarray
+            A flat array of option prices."""
+        setup = self._setup(spot, strikes, maturities, is_call)
+        params = (hst.rho, hst.theta, hst.kappa, hst.xi, hst.default_v0)
+        return self._prices(setup, params)
+
+    def calibrate(self, spot, strikes, maturities, quotes, is_call=True,
+                  weights=None, initial=None, bounds=None, **kwargs):
+        """Fit the model to option quotes by least squares.
+
+        Parameters
+        ----------
+        spot : scalar
+            The spot price of the underlying asset.
+        strikes : array_like
+            Strikes of the options.
+        maturities : array_like
+            Maturities in years, broadcast against *strikes*.
+        quotes : array_like
+            Option prices, broadcast against *strikes*.
+        is_call : bool or array_like
+            Whether each option is a call or a put, broadcast against
+            *strikes*.
+        weights : array_like
+            Weights of the pricing errors, e.g., inverse Black-Scholes vegas.
+            If None, all errors are equally weighted.
+        initial : sequence
+            Starting values of *(rho, theta, kappa, xi, v0)*. If None, the
+            last solution is used, or a generic guess if there is none.
+        bounds : tuple
+            Lower and upper bounds of *(rho, theta, kappa, xi, v0)*.
+        kwargs :
+            Forwarded to :func:`scipy.optimize.least_squares`.
+
+        Returns
+        -------
+        Heston
+            The calibrated process, which can be passed to the Monte Carlo
+            engine."""
+        setup = self._setup(spot, strikes, maturities, is_call)
+        quotes = np.broadcast_to(quotes, setup['strikes'].shape).ravel()
+        weights = 1.0 if weights is None else np.ravel(weights)
+
+        if initial is None:
+            initial = self.params if self.params is not None \
+                else _default_initial
+        if bounds is None:
+            bounds = _default_bounds
+        initial = np.clip(initial, *bounds)
+
+        def _residuals(params):
+            return (self._prices(setup, params) - quotes) * weights
+
+        res = least_squares(_residuals, initial, bounds=bounds, **kwargs)
+        self.params = res.x
+        self.result = res
+        return Heston(self.r, self.q, *res.x, day_counter=self.day_counter)
@@ -0,0 +1,259 @@
+"""
+This module provides jump-diffusion market models.
+
+* Merton jump-diffusion model with normal log jumps
+* Kou jump-diffusion model with double exponential log jumps
+
+Jumps of a whole batch are generated at once: Poisson jump counts of every
+path and simulation step are drawn first, then the jump sizes are summed per
+step in a single vectorized operation.
+"""
+import numpy as np
+from abc import ABC, abstractmethod
+from pyoptmc.structures.base import ProcessCoordinator, OptionABC
+
+
+__all__ = ['Merton', 'Kou']
+
+
+class _JumpDiffusion(ABC):
+    """Base class of jump-diffusion processes, which differ in the
+    distribution of log jumps."""
+
+    def __init__(self, r, q, v, lam, day_counter=252):
+        if lam < 0:
+            raise ValueError("The jump intensity 'lam' must be nonnegative.")
+        self.r = r
+        self.q = q
+        self.v = v
+        self.lam = lam
+        self.day_counter = day_counter
+
+    @property
+    @abstractmethod
+    def kappa(self):
+        """The expected relative jump size :math:`E[e^J]-1`."""
+
+    @abstractmethod
+    def _compound_sums(self, rng, counts):
+        """Return sums of *counts* independent log jumps, elementwise."""
+
+    def _jump_sums(self, rng, batch_size, dt):
+        """Return the sums of log jumps over steps of *dt* days."""
+        counts = rng.poisson(self.lam / self.day_counter * np.asarray(dt),
+                             (batch_size, len(dt)))
+        return self._compound_sums(rng, counts)
+
+    def _logs_drift_diffusion(self, dt, v=None):
+        """Return the drift, compensated for jumps, and the diffusion of the
+        logarithm of stock price over steps of *dt* days."""
+        v = self.v if v is None else v
+        dt = np.maximum(np.asarray(dt, dtype=float), 0) / self.day_counter
+        drift = (self.r - self.q - 0.5 * v * v - self.lam * self.kappa) * dt
+        return drift, v * np.sqrt(dt)
+
+    @staticmethod
+    def _project(drift, diffusion, z, jumps):
+        return (drift + z * diffusion + jumps).cumsum(axis=1)
+
+    @property
+    def coordinator(self):
+        return _JumpDiffusionCoordinator
+
+
+class Merton(_JumpDiffusion):
+    """A Merton jump-diffusion process. The log-return follows
+
+    .. math::
+
+        \\mathrm{d}\\left(\\mathrm{log}{S_t}\\right)=
+        (r-q-\\frac{\\sigma^2}{2}-\\lambda\\kappa)\\mathrm{d}t+
+        \\sigma\\mathrm{d}W_t+\\mathrm{d}J_t
+
+    where :math:`J_t` is a compound Poisson process with intensity
+    :math:`\\lambda` and normal jumps, and
+    :math:`\\kappa=e^{\\mu_J+\\sigma_J^2/2}-1` compensates the jumps.
+
+    Parameters
+    ----------
+    r : scalar
+        The instantaenous risk-free rate.
+    q : scalar
+        The continuous yield.
+    v : scalar
+        The diffusion parameter.
+    lam : scalar
+        The number of jumps per year.
+    mu_j : scalar
+        The mean of log jumps.
+    sigma_j : scalar
+        The standard deviation of log jumps.
+    day_counter : int
+        An integer that controls the numder of trading days in a year. Default is 252."""
+
+    def __init__(self, r, q, v, lam, mu_j, sigma_j, day_counter=252):
+        super().__init__(r, q, v, lam, day_counter)
+        if sigma_j < 0:
+            raise ValueError("'sigma_j' must be nonnegative.")
+        self.mu_j = mu_j
+        self.sigma_j = sigma_j
+
+    @property
+    def kappa(self):
+        return np.exp(self.mu_j + 0.5 * self.sigma_j * self.sigma_j) - 1
+
+    def _compound_sums(self, rng, counts):
+        # a sum of n normal jumps is normal itself
+        return counts * self.mu_j + self.sigma_j * np.sqrt(counts) * \
+            rng.standard_normal(counts.shape)
+
+
+class Kou(_JumpDiffusion):
+    """A Kou jump-diffusion process. The log-return follows
+
+    .. math::
+
+        \\mathrm{d}\\left(\\mathrm{log}{S_t}\\right)=
+        (r-q-\\frac{\\sigma^2}{2}-\\lambda\\kappa)\\mathrm{d}t+
+        \\sigma\\mathrm{d}W_t+\\mathrm{d}J_t
+
+    where :math:`J_t` is a compound Poisson process with intensity
+    :math:`\\lambda` whose log jumps are exponential with rate
+    :math:`\\eta_1` upward with probability *p*, and exponential with rate
+    :math:`\\eta_2` downward otherwise.
+
+    Parameters
+    ----------
+    r : scalar
+        The instantaenous risk-free rate.
+    q : scalar
+        The continuous yield.
+    v : scalar
+        The diffusion parameter.
+    lam : scalar
+        The number of jumps per year.
+    p : scalar
+        The probability of an upward jump.
+    eta1 : scalar
+        The rate of upward log jumps, greater than 1.
+    eta2 : scalar
+        The rate of downward log jumps.
+    day_counter : int
+        An integer that controls the numder of trading days in a year. Default is 252."""
+
+    def __init__(self, r, q, v, lam, p, eta1, eta2, day_counter=252):
+        super().__init__(r, q, v, lam, day_counter)
+        if not 0 <= p <= 1:
+            raise ValueError("'p' must be between 0 and 1.")
+        if eta1 <= 1 or eta2 <= 0:
+            raise ValueError(
+                "'eta1' must be greater than 1 and 'eta2' must be positive."
+            )
+        self.p = p
+        self.eta1 = eta1
+        self.eta2 = eta2
+
+    @property
+    def kappa(self):
+        return self.p * self.eta1 / (self.eta1 - 1) + \
+            (1 - self.p) * self.eta2 / (self.eta2 + 1) - 1
+
+    def _compound_sums(self, rng, counts):
+        n = counts.sum()
+        owner = np.repeat(np.arange(counts.size), counts.ravel())
+        rate = np.where(rng.random(n) < self.p, self.eta1, -self.eta2)
+        sizes = rng.standard_exponential(n) / rate
+        return np.bincount(owner, weights=sizes, minlength=counts.size) \
+            .reshape(counts.shape)
+
+
+class _JumpDiffusionCoordinator(ProcessCoordinator):
+    def __init__(self, option: OptionABC, jd: _JumpDiffusion):
+        self.option = option
+        self.jd = jd
+
+        self.t = option.sim_t_array
+        self.dt = np.diff(self.t)
+        self.df = np.exp(-jd.r / jd.day_counter * self.t[1:])
+        self.drift, self.diffusion = jd._logs_drift_diffusion(self.dt)
+        # the first step is split at its first day, so that the paths of
+        # the next day keep the jumps of the remaining days
+        self._cells = np.concatenate(
+            [[min(self.dt[0], 1), max(self.dt[0] - 1, 0)], self.dt[1:]]
+        )
+
+        self._points_per_path = len(self.dt)
+        self._CACHE = {}
+
+    def generate_eps(self, seed, batch_size):
+        rng = np.random.default_rng(seed)
+        z = rng.normal(0, 1, (batch_size, self._points_per_path))
+        sums = self.jd._jump_sums(rng, batch_size, self._cells)
+        first_day = sums[:, 0]
+        jumps = sums[:, 1:]
+        jumps[:, 0] += first_day
+        return z, jumps, first_day
+
+    def paths_given_eps(self, eps):
+        z, jumps, _ = eps
+        return self.jd._project(self.drift, self.diffusion, z, jumps)
+
+    def initial_state(self, batch_size):
+        return np.zeros(batch_size)
+
+    def evolve(self, rng, state, start, stop):
+        z = rng.normal(0, 1, (len(state), stop - start))
+        jumps = self.jd._jump_sums(rng, len(state), self.dt[start:stop])
+        log_paths = self.jd._project(
+            self.drift[start:stop], self.diffusion[start:stop], z, jumps
+        )
+        log_paths += state[:, None]
+        return log_paths, log_paths[:, -1]
+
+    def shift(self, paths, ds, dr, dv, eps):
+
+        _key_inputs = str(ds) + str(dr) + str(dv)
+
+        try:
+            val = self._CACHE[_key_inputs]
+        except KeyError:
+            jd, t, dt = self.jd, self.t, self.dt
+            day_counter = jd.day_counter
+
+            r_shift = dr / day_counter * t[1:]
+            dt_next_day = dt.copy()
+            dt_next_day[0] -= 1
+
+            val = {
+                'S plus': np.log(1.0 + ds), 'S minus': np.log(1.0 - ds),
+                'R plus': r_shift, 'R minus': -r_shift,
+                'V plus': jd._logs_drift_diffusion(dt, jd.v + dv),
+                'V minus': jd._logs_drift_diffusion(dt, jd.v - dv),
+                'DF plus': np.exp(-(jd.r + dr) / day_counter * t[1:]),
+                'DF minus': np.exp(-(jd.r - dr) / day_counter * t[1:]),
+                'DF next day': np.exp(-jd.r / day_counter * (t[1:] - 1)),
+                'Paths next day': jd._logs_drift_diffusion(dt_next_day)
+            }
+
+            self._CACHE.update({_key_inputs: val})
+
+        z, jumps, first_day = eps
+        jumps_next_day = jumps.copy()
+        jumps_next_day[:, 0] -= first_day
+
+        shifted_paths = {
+            'S plus': paths + val['S plus'],
+            'S minus': paths + val['S minus'],
+            'R plus': paths + val['R plus'],
+            'R minus': paths + val['R minus'],
+            'V plus': self.jd._project(*val['V plus'], z, jumps),
+            'V minus': self.jd._project(*val['V minus'], z, jumps),
+            'DF plus': val['DF plus'],
+            'DF minus': val['DF minus'],
+            'DF next day': val['DF next day'],
+            'Paths next day': self.jd._project(
+                *val['Paths next day'], z, jumps_next_day
+            )
+        }
+
+        return shifted_paths
@@ -0,0 +1,233 @@
+"""
+This module provides a local volatility (Dupire) market model.
+
+The local volatility surface is sampled once onto a lattice of trading days
+and equally spaced log prices. Paths are stepped daily by a compiled kernel
+that interpolates the lattice linearly in log price, so no interpolation
+routine is called inside the simulation loop.
+"""
+import numpy as np
+import numba as nb
+from pyoptmc.structures.base import ProcessCoordinator, OptionABC
+
+
+__all__ = ['LocalVol']
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _local_vol_paths(table, x_lo, inv_dx, mu_dt, dt, row0, x0, eps, obs):
+    """Euler scheme of the log price with daily steps.
+
+    Row ``row0 + k`` of *table* is the local volatility over step *k* on a
+    uniform grid of log prices starting at *x_lo*. Log prices are recorded
+    after ``obs[j]`` steps; *obs* must be sorted."""
+    n, m = eps.shape
+    n_obs = obs.shape[0]
+    last = table.shape[1] - 1
+    sqdt = np.sqrt(dt)
+    out = np.empty((n, n_obs))
+    for i in nb.prange(n):
+        x = x0[i]
+        j = 0
+        for k in range(m + 1):
+            while j < n_obs and obs[j] == k:
+                out[i, j] = x
+                j += 1
+            if k == m or j == n_obs:
+                break
+            row = table[row0 + k]
+            pos = (x - x_lo) * inv_dx
+            if pos <= 0:
+                s = row[0]
+            elif pos >= last:
+                s = row[last]
+            else:
+                c = int(pos)
+                w = pos - c
+                s = row[c] * (1 - w) + row[c + 1] * w
+            x += mu_dt - 0.5 * s * s * dt + s * sqdt * eps[i, k]
+    return out
+
+
+class LocalVol:
+    """A local volatility process. The log-return follows
+
+    .. math::
+
+        \\mathrm{d}\\left(\\mathrm{log}{S_t}\\right)=
+        (r-q-\\frac{\\sigma(t,S_t)^2}{2})\\mathrm{d}t+\\sigma(t,S_t)\\mathrm{d}W_t
+
+    The surface is sampled at the start of each trading day on
+    *n_space* log prices spanning *log_bounds* around the spot price, and
+    extrapolated flat outside of them. Paths are simulated with daily Euler
+    steps, which is why the number of random numbers per path is the number
+    of trading days to the last simulation day rather than the number of
+    simulation days.
+
+    Parameters
+    ----------
+    r : scalar
+        The instantaenous risk-free rate.
+    q : scalar
+        The continuous yield.
+    local_vol : scalar or callable
+        The local volatility surface. A callable is called once per lattice
+        as ``local_vol(t, s)`` with *t* in years of shape *(days, 1)* and
+        prices *s* of shape *(1, n_space)*, and must return an array
+        broadcastable to *(days, n_space)*.
+    day_counter : int
+        An integer that controls the numder of trading days in a year. Default is 252.
+    n_space : int
+        Number of log prices of the lattice.
+    log_bounds : tuple
+        Lowest and highest log-moneyness of the lattice."""
+
+    def __init__(self, r, q, local_vol, day_counter=252, n_space=401,
+                 log_bounds=(-2.0, 2.0)):
+        if n_space < 2:
+            raise ValueError("'n_space' must be at least 2.")
+        if not log_bounds[0] < 0 < log_bounds[1]:
+            raise ValueError("'log_bounds' must enclose 0.")
+        self.r = r
+        self.q = q
+        self.local_vol = local_vol
+        self.day_counter = day_counter
+        self.n_space = n_space
+        self.log_bounds = tuple(log_bounds)
+
+        self._cache = {}
+
+    def lattice(self, spot, days):
+        """Return the local volatility lattice of a spot price.
+
+        Parameters
+        ----------
+        spot : scalar
+            The spot price around which log prices are spaced.
+        days : int
+            Number of trading days, i.e., rows of the lattice.
+
+        Returns
+        -------
+        tuple
+            The lattice of shape *(days, n_space)*, the lowest log price and
+            the inverse of the spacing of log prices."""
+        key = (float(spot), int(days))
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        x = np.log(spot) + np.linspace(*self.log_bounds, self.n_space)
+        if callable(self.local_vol):
+            t = np.arange(days)[:, None] / self.day_counter
+            table = self.local_vol(t, np.exp(x)[None, :])
+        else:
+            table = self.local_vol
+        table = np.ascontiguousarray(
+            np.broadcast_to(np.asarray(table, dtype=float),
+                            (days, self.n_space))
+        )
+        if not np.all(np.isfinite(table)) or np.any(table < 0):
+            raise ValueError(
+                "Local volatilities must be finite and nonnegative."
+            )
+        table.setflags(write=False)
+        val = table, x[0], 1.0 / (x[1] - x[0])
+        self._cache[key] = val
+        return val
+
+    def _project(self, lattice, eps, obs, x0, row0=0, r=None):
+        table, x_lo, inv_dx = lattice
+        r = self.r if r is None else r
+        dt = 1.0 / self.day_counter
+        return _local_vol_paths(
+            table, x_lo, inv_dx, (r - self.q) * dt, dt, row0,
+            np.ascontiguousarray(x0, dtype=float), eps,
+            np.asarray(obs, dtype=np.int64)
+        )
+
+    @property
+    def coordinator(self):
+        return _LocalVolCoordinator
+
+
+class _LocalVolCoordinator(ProcessCoordinator):
+    def __init__(self, option: OptionABC, lv: LocalVol):
+        self.option = option
+        self.lv = lv
+
+        self.t = np.asarray(option.sim_t_array)
+        if np.any(self.t != np.round(self.t)):
+            raise ValueError("Simulation days must be integers.")
+        self.t = self.t.astype(np.int64)
+        self.df = np.exp(-lv.r / lv.day_counter * self.t[1:])
+        self._days = int(self.t[-1])
+        self._x_ref = np.log(option.spot)
+        self._lattice = lv.lattice(option.spot, self._days)
+
+        self._points_per_path = self._days
+        self._CACHE = {}
+
+    def generate_eps(self, seed, batch_size):
+        rng = np.random.default_rng(seed)
+        return rng.normal(0, 1, (batch_size, self._points_per_path))
+
+    def paths_given_eps(self, eps):
+        x0 = self.initial_state(len(eps))
+        return self.lv._project(self._lattice, eps, self.t[1:], x0) \
+            - self._x_ref
+
+    def initial_state(self, batch_size):
+        return np.full(batch_size, self._x_ref)
+
+    def evolve(self, rng, state, start, stop):
+        t0 = self.t[start]
+        eps = rng.normal(0, 1, (len(state), self.t[stop] - t0))
+        x = self.lv._project(
+            self._lattice, eps, self.t[start + 1:stop + 1] - t0, state, t0
+        )
+        return x - self._x_ref, x[:, -1]
+
+    def shift(self, paths, ds, dr, dv, eps):
+        _key_inputs = str(ds) + str(dr) + str(dv)
+
+        try:
+            val = self._CACHE[_key_inputs]
+        except KeyError:
+            lv, t = self.lv, self.t
+            table, x_lo, inv_dx = self._lattice
+            val = {
+                'S plus': np.log(1.0 + ds), 'S minus': np.log(1.0 - ds),
+                'R plus': lv.r + dr, 'R minus': lv.r - dr,
+                # the surface is shifted in parallel on the lattice
+                'V plus': (table + dv, x_lo, inv_dx),
+                'V minus': (np.maximum(table - dv, 0), x_lo, inv_dx),
+                'DF plus': np.exp(-(lv.r + dr) / lv.day_counter * t[1:]),
+                'DF minus': np.exp(-(lv.r - dr) / lv.day_counter * t[1:]),
+                'DF next day': np.exp(-lv.r / lv.day_counter * (t[1:] - 1)),
+            }
+            self._CACHE.update({_key_inputs: val})
+
+        lv, lattice, obs = self.lv, self._lattice, self.t[1:]
+        x0 = self.initial_state(len(eps))
+        x_ref = self._x_ref
+
+        shifted_paths = {
+            'S plus': lv._project(lattice, eps, obs, x0 + val['S plus']),
+            'S minus': lv._project(lattice, eps, obs, x0 + val['S minus']),
+            'R plus': lv._project(lattice, eps, obs, x0, r=val['R plus']),
+            'R minus': lv._project(lattice, eps, obs, x0, r=val['R minus']),
+            'V plus': lv._project(val['V plus'], eps, obs, x0),
+            'V minus': lv._project(val['V minus'], eps, obs, x0),
+            # tomorrow's paths start from today's second lattice row
+            'Paths next day': lv._project(
+                lattice, eps[:, 1:], np.maximum(obs - 1, 0), x0, 1
+            )
+        }
+        for key in shifted_paths:
+            shifted_paths[key] -= x_ref
+        shifted_paths.update({
+            key: val[key] for key in ('DF plus', 'DF minus', 'DF next day')
+        })
+
+        return shifted_paths
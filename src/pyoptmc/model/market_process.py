@@ -3,17 +3,18 @@ This modules provides an API for specification of market dynamics.
 Currently, supported market models are
 
 * Black-Scholes market model
+* Black-Scholes market model with term structures
 """
 import numpy as np
+from scipy.special import ndtr, ndtri
 from pyoptmc.structures.base import ProcessCoordinator, OptionABC
 import math
-from scipy.stats import norm
 from numba import float64
 import numba as nb
 import functools
 
 
-__all__ = ['BlackScholes', 'Heston']
+__all__ = ['BlackScholes', 'BlackScholesTS', 'Heston']
 
 _cache_keys = ['S plus', 'S minus', 'V plus', 'V minus',
                'R plus', 'R minus', 'DF plus', 'DF minus',
@@ -112,6 +113,60 @@ class _BSCoordinator(ProcessCoordinator):
         return self.bs._project_dd(drift=self.drift, diffusion=self.diffusion,
                                    eps=eps)
 
+    def initial_state(self, batch_size):
+        return np.zeros(batch_size)
+
+    def evolve(self, rng, state, start, stop):
+        eps = rng.normal(0, 1, (len(state), stop - start))
+        log_paths = self.bs._project_dd(
+            drift=self.drift[start:stop], diffusion=self.diffusion[start:stop],
+            eps=eps
+        )
+        log_paths += state[:, None]
+        return log_paths, log_paths[:, -1]
+
+    def importance_sample(self, eps, drift):
+        # standard deviations of Brownian increments, in years
+        sd = np.sqrt(self.dt / self.bs.day_counter)
+        shifted = eps + drift * sd
+        return shifted, self.likelihood_ratio(shifted, drift)
+
+    def likelihood_ratio(self, eps, drift):
+        sd = np.sqrt(self.dt / self.bs.day_counter)
+        # exp(-drift * W_T + drift^2 * T / 2), where W_T is the terminal
+        # value of the Brownian motion driven by eps
+        return np.exp(-drift * (eps @ sd) + 0.5 * drift * drift * (sd @ sd))
+
+    def stratify(self, eps, strata):
+        sd = np.sqrt(self.dt / self.bs.day_counter)
+        t_end = sd @ sd
+        w_end = eps @ sd
+        # the terminal value is standard normal, hence a uniform variate
+        # independent of the bridge, which is moved into the stratum
+        u = ndtr(w_end / np.sqrt(t_end))
+        stratum = np.arange(len(eps)) % strata
+        target = ndtri((stratum + u) / strata) * np.sqrt(t_end)
+        # Brownian bridge: W_t + t / T * (target - W_T) has terminal value
+        # target, and increments in proportion to their variances
+        return eps + np.outer((target - w_end) / t_end, sd)
+
+    def paths_given_vol_shift(self, eps, dv):
+        if not dv:
+            return self.paths_given_eps(eps)
+        key = ('vol shift', dv)
+        try:
+            drift, diffusion = self._CACHE[key]
+        except KeyError:
+            bs = self.bs
+            v = bs.v + dv / (bs.day_counter ** 0.5)
+            if v < 0:
+                raise ValueError("shifted volatility must be non-negative")
+            dt = np.maximum(self.dt, 0)
+            drift = (bs.r - bs.q - 0.5 * v * v) * dt
+            diffusion = v * np.sqrt(dt)
+            self._CACHE[key] = drift, diffusion
+        return self.bs._project_dd(drift=drift, diffusion=diffusion, eps=eps)
+
     def shift(self, paths, ds, dr, dv, eps):
 
         _key_inputs = str(ds) + str(dr) + str(dv)
@@ -186,6 +241,204 @@ class _BSCoordinator(ProcessCoordinator):
         return shifted_paths
 
 
+def _as_pillars(x, name):
+    """Return pillar times and values of a scalar or a *(times, values)*
+    pair. A scalar is a flat curve."""
+    if np.ndim(x) == 0:
+        return np.array([1.0]), np.array([float(x)])
+    try:
+        times, values = x
+    except (TypeError, ValueError):
+        raise TypeError(
+            f"'{name}' must be a scalar or a pair of times and values."
+        ) from None
+    times = np.asarray(times, dtype=float).ravel()
+    values = np.asarray(values, dtype=float).ravel()
+    if times.shape != values.shape or times.size == 0:
+        raise ValueError(
+            f"Times and values of '{name}' must have the same nonzero length."
+        )
+    if times[0] <= 0 or np.any(np.diff(times) <= 0):
+        raise ValueError(
+            f"Times of '{name}' must be positive and strictly increasing."
+        )
+    return times, values
+
+
+class BlackScholesTS:
+    """A Black-Scholes process with term structures of the risk-free rate,
+    the dividend yield and the volatility.
+
+    The log-return follows
+
+    .. math::
+
+        \\mathrm{d}\\left(\\mathrm{log}{S_t}\\right)=
+        (r_t-q_t-\\frac{\\sigma_t^2}{2})\\mathrm{d}t+\\sigma_t\\mathrm{d}W_t
+
+    Each curve is either a scalar or a pair *(times, values)* of pillars,
+    with times in years. Rates and yields are zero rates, interpolated
+    linearly between pillars and extrapolated flat. Volatilities are implied
+    (term) volatilities, whose total variance is interpolated linearly and
+    extrapolated with a flat volatility, so that the instantaneous
+    volatility over each step is the forward volatility.
+
+    Drifts, diffusions and discount factors of a simulation grid are computed
+    once and cached, so pricing several times on the same product grid does
+    not recompute them.
+
+    Parameters
+    ----------
+    r : scalar or tuple
+        The risk-free zero rate curve.
+    q : scalar or tuple
+        The continuous yield curve.
+    v : scalar or tuple
+        The implied volatility term structure.
+    day_counter : int
+        An integer that controls the numder of trading days in a year. Default is 252."""
+
+    def __init__(self, r, q, v, day_counter=252):
+        self.r = _as_pillars(r, 'r')
+        self.q = _as_pillars(q, 'q')
+        self.v = _as_pillars(v, 'v')
+        self.day_counter = day_counter
+
+        if np.any(np.diff(self.v[1] ** 2 * self.v[0], prepend=0) < 0):
+            raise ValueError("Total variance must be nondecreasing.")
+
+        self._cache = {}
+
+    _project_dd = staticmethod(BlackScholes._project_dd)
+
+    @staticmethod
+    def _integrated_rate(pillars, t):
+        times, values = pillars
+        return np.interp(t, times, values) * t
+
+    def _total_variance(self, t):
+        times, vols = self.v
+        var = vols * vols * times
+        return np.where(
+            t <= times[-1],
+            np.interp(t, np.append(0, times), np.append(0, var)),
+            var[-1] / times[-1] * t
+        )
+
+    def _bumped(self, dr=0.0, dv=0.0):
+        """Return a process with the rate curve and the volatilities shifted
+        in parallel."""
+        return BlackScholesTS(
+            (self.r[0], self.r[1] + dr), self.q, (self.v[0], self.v[1] + dv),
+            self.day_counter
+        )
+
+    def grid(self, sim_t_array):
+        """Return the drifts, diffusions and discount factors on a grid of
+        simulation days.
+
+        Parameters
+        ----------
+        sim_t_array : array_like
+            Simulation days, starting with 0.
+
+        Returns
+        -------
+        tuple
+            Drifts and diffusions of the log-returns over each step, and
+            discount factors at each simulation day but the first."""
+        t = np.asarray(sim_t_array, dtype=float)
+        key = t.tobytes()
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        years = t / self.day_counter
+        int_r = self._integrated_rate(self.r, years)
+        int_q = self._integrated_rate(self.q, years)
+        variance = np.diff(self._total_variance(years))
+        drift = np.diff(int_r) - np.diff(int_q) - 0.5 * variance
+        diffusion = np.sqrt(variance)
+        df = np.exp(-int_r[1:])
+        for a in (drift, diffusion, df):
+            a.setflags(write=False)
+        self._cache[key] = drift, diffusion, df
+        return drift, diffusion, df
+
+    @property
+    def coordinator(self):
+        return _BSTSCoordinator
+
+
+class _BSTSCoordinator(_BSCoordinator):
+    def __init__(self, option: OptionABC, bs: BlackScholesTS):
+        self.option = option
+        self.bs = bs
+
+        self.t = option.sim_t_array
+        self.dt = np.diff(self.t)
+        self.drift, self.diffusion, self.df = bs.grid(self.t)
+
+        self._points_per_path = len(self.dt)
+        self._CACHE = {}
+
+    def paths_given_vol_shift(self, eps, dv):
+        if not dv:
+            return self.paths_given_eps(eps)
+        key = ('vol shift', dv)
+        try:
+            drift, diffusion = self._CACHE[key]
+        except KeyError:
+            drift, diffusion = self.bs._bumped(dv=dv).grid(self.t)[:2]
+            self._CACHE[key] = drift, diffusion
+        return self.bs._project_dd(drift, diffusion, eps=eps)
+
+    def shift(self, paths, ds, dr, dv, eps):
+
+        _key_inputs = str(ds) + str(dr) + str(dv)
+
+        try:
+            val = self._CACHE[_key_inputs]
+        except KeyError:
+            bs = self.bs
+            t = self.t
+
+            r_shift = dr / bs.day_counter * t[1:]
+            v_plus = bs._bumped(dv=dv).grid(t)
+            v_minus = bs._bumped(dv=-dv).grid(t)
+            next_day = bs.grid(np.maximum(t - 1, 0))
+
+            val = _mk_dict(
+                keys=_cache_keys,
+                values=[
+                    np.log(1.0 + ds), np.log(1.0 - ds),
+                    v_plus[:2], v_minus[:2],
+                    r_shift, -r_shift,
+                    bs._bumped(dr=dr).grid(t)[2],
+                    bs._bumped(dr=-dr).grid(t)[2],
+                    next_day[2], next_day[:2]
+                ]
+            )
+
+            self._CACHE.update({_key_inputs: val})
+
+        shifted_paths = {
+            'S plus': paths + val['S plus'],
+            'S minus': paths + val['S minus'],
+            'R plus': paths + val['R plus'],
+            'R minus': paths + val['R minus'],
+            'V plus': self.bs._project_dd(*val['V plus'], eps=eps),
+            'V minus': self.bs._project_dd(*val['V minus'], eps=eps),
+            'DF plus': val['DF plus'],
+            'DF minus': val['DF minus'],
+            'DF next day': val['DF next day'],
+            'Paths next day': self.bs._project_dd(*val['Paths next day'],
+                                                  eps=eps)
+        }
+
+        return shifted_paths
+
+
 @nb.vectorize(
     [float64(float64, float64,
              float64, float64)]
@@ -204,6 +457,67 @@ def _qe_one_path_one_step(psi, u1, m, z1):
         return math.log((1 - p) / (1 - u1)) / beta
 
 
+@nb.njit(float64(float64), cache=True)
+def _ndtri(p):
+    """Inverse of the standard normal CDF (Wichura's algorithm AS 241)."""
+    q = p - 0.5
+    if abs(q) <= 0.425:
+        r = 0.180625 - q * q
+        return q * (((((((
+            r * 2509.0809287301226727 + 33430.575583588128105) * r +
+            67265.770927008700853) * r + 45921.953931549871457) * r +
+            13731.693765509461125) * r + 1971.5909503065514427) * r +
+            133.14166789178437745) * r + 3.387132872796366608) / (((((((
+                r * 5226.495278852545925 + 28729.085735721942674) * r +
+                39307.89580009271061) * r + 21213.794301586595867) * r +
+                5394.1960214247511077) * r + 687.1870074920579083) * r +
+                42.313330701600911252) * r + 1.0)
+    r = p if q < 0 else 1.0 - p
+    if r <= 0:
+        return -math.inf if q < 0 else math.inf
+    r = math.sqrt(-math.log(r))
+    if r <= 5:
+        r -= 1.6
+        val = (((((((
+            r * 7.7454501427834140764e-4 + 0.0227238449892691845833) * r +
+            0.24178072517745061177) * r + 1.27045825245236838258) * r +
+            3.64784832476320460504) * r + 5.7694972214606914055) * r +
+            4.6303378461565452959) * r + 1.42343711074968357734) / (((((((
+                r * 1.05075007164441684324e-9 + 5.475938084995344946e-4) * r +
+                0.0151986665636164571966) * r + 0.14810397642748007459) * r +
+                0.68976733498510000455) * r + 1.6763848301838038494) * r +
+                2.05319162663775882187) * r + 1.0)
+    else:
+        r -= 5.0
+        val = (((((((
+            r * 2.01033439929228813265e-7 + 2.71155556874348757815e-5) * r +
+            0.0012426609473880784386) * r + 0.026532189526576123093) * r +
+            0.29656057182850489123) * r + 1.7848265399172913358) * r +
+            5.4637849111641143699) * r + 6.6579046435011037772) / (((((((
+                r * 2.04426310338993978564e-15 + 1.4215117583164458887e-7) *
+                r + 1.8463183175100546818e-5) * r + 7.868691311456132591e-4) *
+                r + 0.0148753612908506148525) * r + 0.13692988092273580531) *
+                r + 0.59983220655588793769) * r + 1.0)
+    return -val if q < 0 else val
+
+
+@nb.njit(float64(float64, float64, float64), cache=True)
+def _qe_step(psi, u1, m):
+    """One QE step of the variance. The normal draw needed by the quadratic
+    branch is derived from *u1* only when that branch is taken."""
+    if psi <= 2:
+        psiinv = 1 / psi
+        b2 = 2*psiinv - 1 + math.sqrt(2*psiinv)*math.sqrt(2*psiinv-1)
+        a = m / (1 + b2)
+        return a * (math.sqrt(b2) + _ndtri(u1)) ** 2
+    else:
+        p = (psi - 1) / (psi + 1)
+        if u1 <= p:
+            return 0
+        beta = (1 - p) / m
+        return math.log((1 - p) / (1 - u1)) / beta
+
+
 @functools.lru_cache(maxsize=128)
 def _get_kvkr(kappa, theta, volvol, dt, rho, gamma1, gamma2):
     k1 = np.e ** (-kappa * dt)
@@ -263,10 +577,44 @@ def _jitable_heston(
     return V, X
 
 
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _heston_qe_paths(kv, kr, mu_dt, theta, v0, x0, u, z, steps):
+    """Fused QE kernel. Paths are simulated in parallel, each keeping its
+    variance and log return in local variables through *steps[i]* sub-steps
+    of interval *i*, and only the values at the end of each interval are
+    written to *V* and *X*."""
+    batch_size = u.shape[0]
+    n_points = len(steps)
+    V = np.empty((batch_size, n_points))
+    X = np.empty((batch_size, n_points))
+
+    for b in nb.prange(batch_size):
+        v = v0[b]
+        x = x0[b]
+        j = 0
+        for i in range(n_points):
+            k0, k1, k2, k3 = kv[i, 0], kv[i, 1], kv[i, 2], kv[i, 3]
+            k0r, k1r, k2r = kr[i, 0], kr[i, 1], kr[i, 2]
+            k3r, k4r = kr[i, 3], kr[i, 4]
+            drift = mu_dt[i] + k0r
+            for _ in range(steps[i]):
+                m = theta + v * k1 + k0
+                s2 = v * k2 + k3
+                new_v = _qe_step(s2 / (m * m), u[b, j], m)
+                x += drift + k1r * v + k2r * new_v + \
+                    math.sqrt(k3r * v + k4r * new_v) * z[b, j]
+                v = new_v
+                j += 1
+            V[b, i] = v
+            X[b, i] = x
+    return V, X
+
+
 class Heston:
 
     def __init__(
-            self, r, q, rho, theta, kappa, xi, default_v0, day_counter=252
+            self, r, q, rho, theta, kappa, xi, default_v0, day_counter=252,
+            substeps=None
     ):
         """A stochastic-volatility model due to Heston (1993).
 
@@ -300,7 +648,11 @@ class Heston:
         default_v0 : scalar
             The default starting value of the variance.
         day_counter : int
-            Number of days per year. This affects the discount factor."""
+            Number of days per year. This affects the discount factor.
+        substeps : int or array_like
+            Number of QE steps between two consecutive simulation days of a
+            structure, used when the process is passed to the Monte Carlo
+            engine. If None, one step per day is taken. Default is None."""
         self.r = r
         self.q = q
         self.mu = r - q
@@ -311,6 +663,7 @@ class Heston:
         self.volvol = xi
         self.default_v0 = default_v0
         self.day_counter = day_counter
+        self.substeps = substeps
 
     def generate_path(
             self, t, v0=None, gamma1=0.5, gamma2=0.5,
@@ -371,7 +724,6 @@ class Heston:
                 "make sure that (t*day_counter) is an integer"
             )
 
-        z_v = norm.ppf(u)
         dt = t / grid_points_in_time
 
         kv, kr = _get_kvkr(
@@ -379,12 +731,122 @@ class Heston:
             self.rho, gamma1, gamma2
         )
 
-        kv = np.array(kv)
-        kr = np.array(kr)
-        return _jitable_heston(
-            kv, kr, self.mu, self.theta, v0, dt, u, z_v, z,
-            batch_size, grid_points_in_time
+        steps = np.ones(grid_points_in_time, dtype=np.int64)
+        constants = (
+            np.tile(kv, (grid_points_in_time, 1)),
+            np.tile(kr, (grid_points_in_time, 1)),
+            np.full(grid_points_in_time, self.mu * dt)
         )
+        return self._project_on_grid(constants, steps, u, z, v0, 0.0)
+
+    def _replace(self, **params):
+        """Return a copy of the process with some parameters replaced."""
+        kwargs = dict(
+            r=self.r, q=self.q, rho=self.rho, theta=self.theta,
+            kappa=self.kappa, xi=self.xi, default_v0=self.default_v0,
+            day_counter=self.day_counter, substeps=self.substeps
+        )
+        kwargs.update(params)
+        return Heston(**kwargs)
+
+    @staticmethod
+    def _grid_steps(dt, substeps=None):
+        """Number of QE steps in each interval of *dt* days."""
+        dt = np.asarray(dt)
+        if substeps is None:
+            steps = dt
+        elif hasattr(substeps, "__iter__"):
+            steps = np.asarray(substeps)
+            if len(steps) != len(dt):
+                raise ValueError("Lengths of passed arrays do not match")
+        else:
+            steps = np.full(len(dt), substeps)
+        steps = np.where(dt > 0, steps, 0)
+        if np.any(steps != np.round(steps)):
+            raise ValueError("number of steps must be integers")
+        steps = steps.astype(np.int64)
+        if np.any(steps[dt > 0] < 1):
+            raise ValueError("each interval must contain at least one step")
+        return steps
+
+    def _grid_constants(self, dt, steps, gamma1=0.5, gamma2=0.5):
+        """QE constants of each interval of *dt* days cut into *steps*."""
+        kv = np.zeros((len(dt), 4))
+        kr = np.zeros((len(dt), 5))
+        mu_dt = np.zeros(len(dt))
+        for i, (d, n) in enumerate(zip(dt, steps)):
+            if n == 0:
+                continue
+            h = d / self.day_counter / n
+            kv[i], kr[i] = _get_kvkr(
+                self.kappa, self.theta, self.volvol, h,
+                self.rho, gamma1, gamma2
+            )
+            mu_dt[i] = self.mu * h
+        return kv, kr, mu_dt
+
+    def _project_on_grid(self, constants, steps, u, z, v0, x0):
+        kv, kr, mu_dt = constants
+        batch_size = len(u)
+        if u.shape != z.shape or u.shape[1] != steps.sum():
+            raise ValueError(
+                "u and z must have one column per step, %d in total"
+                % steps.sum()
+            )
+        v0 = np.array(np.broadcast_to(v0, batch_size), dtype=float)
+        x0 = np.array(np.broadcast_to(x0, batch_size), dtype=float)
+        return _heston_qe_paths(
+            kv, kr, mu_dt, float(self.theta), v0, x0,
+            np.ascontiguousarray(u, dtype=float),
+            np.ascontiguousarray(z, dtype=float), steps
+        )
+
+    def num_steps_on_grid(self, sim_t_array, substeps=None):
+        """Return the number of random numbers per path (the number of columns
+        of *u* and *z*) needed by :meth:`generate_path_on_grid`."""
+        return int(self._grid_steps(np.diff(sim_t_array), substeps).sum())
+
+    def generate_path_on_grid(
+            self, sim_t_array, u, z, v0=None, x0=0.0, substeps=None,
+            gamma1=0.5, gamma2=0.5
+    ):
+        """Project variance and log return on the days of *sim_t_array* only.
+
+        The QE scheme is streamed forward through sub-steps of each interval
+        between two consecutive days, and only the values on these days are
+        stored.
+
+        Parameters
+        ----------
+        sim_t_array : array_like
+            Ascending days (in units of *1 / day_counter* years) starting
+            with 0, e.g., ``option.sim_t_array``.
+        u, z : ndarray
+            Uniform and standard normal random numbers. Both must have one
+            column per step; see :meth:`num_steps_on_grid`.
+        v0 : scalar or array_like
+            The initial value of *v*. If None, it is set to *default_v0*.
+        x0 : scalar or array_like
+            The initial log return. Default is 0.
+        substeps : int or array_like
+            Number of steps in each interval. If None, one step per day is
+            taken. Default is None.
+        gamma1, gamma2 : scalar
+            Controls the finite-difference scheme when simulating the log
+            return.
+
+        Returns
+        -------
+        v : ndarray
+            Variance on ``sim_t_array[1:]``.
+        x : ndarray
+            Log return on ``sim_t_array[1:]``."""
+        if v0 is None:
+            v0 = self.default_v0
+        dt = np.diff(sim_t_array)
+        steps = self._grid_steps(dt, substeps)
+        constants = self._grid_constants(dt, steps, gamma1, gamma2)
+        return self._project_on_grid(constants, steps, u, z, v0, x0)
 
     @property
     def coordinator(self):
@@ -393,33 +855,158 @@ class Heston:
 
 # ====================Purely for compatiblity with MC engine=======================
 class _HestonCoordinator(ProcessCoordinator):
+    model_greeks = ('v0', 'theta', 'kappa', 'xi', 'rho')
+
     def __init__(self, option: OptionABC, hst: Heston):
         self.option = option
         self.hst = hst
-        self.t = option.sim_t_array[-1] / hst.day_counter
+        self.t = np.asarray(option.sim_t_array)
 
-        self.df = np.exp(-hst.r * option.sim_t_array[1:] / hst.day_counter)
+        self.df = np.exp(-hst.r * self.t[1:] / hst.day_counter)
 
-        self._batch_size = None
-        self._points_per_path = int(option.sim_t_array[-1])
-        self._points_for_valuation = option.sim_t_array[1:] - 1
+        # only the simulation days of the option are visited
+        self._steps = hst._grid_steps(np.diff(self.t), hst.substeps)
+        self._constants = hst._grid_constants(np.diff(self.t), self._steps)
+        self._points_per_path = int(self._steps.sum())
+        self._CACHE = {}
 
     def generate_eps(self, seed, batch_size):
         rng = np.random.default_rng(seed)
         u = rng.uniform(0, 1, (batch_size, self._points_per_path))
         z = rng.normal(0, 1, (batch_size, self._points_per_path))
-        self._batch_size = batch_size
         return u, z
 
+    def paths_and_variance_given_eps(self, eps):
+        """Return the variance and log return on the simulation days."""
+        u, z = eps
+        return self.hst._project_on_grid(
+            self._constants, self._steps, u, z, self.hst.default_v0, 0.0
+        )
+
     def paths_given_eps(self, eps):
+        return self.paths_and_variance_given_eps(eps)[1]
+
+    def initial_state(self, batch_size):
+        # log return and variance
+        state = np.zeros((batch_size, 2))
+        state[:, 1] = self.hst.default_v0
+        return state
+
+    def evolve(self, rng, state, start, stop):
+        steps = self._steps[start:stop]
+        n = int(steps.sum())
+        u = rng.uniform(0, 1, (len(state), n))
+        z = rng.normal(0, 1, (len(state), n))
+        constants = tuple(c[start:stop] for c in self._constants)
+        v, x = self.hst._project_on_grid(
+            constants, steps, u, z, state[:, 1], state[:, 0]
+        )
+        return x, np.column_stack([x[:, -1], v[:, -1]])
+
+    def paths_given_vol_shift(self, eps, dv):
+        """Return the log paths driven by *eps* with the volatility, i.e.,
+        the square roots of *v0* and *theta*, shifted by *dv*."""
+        if not dv:
+            return self.paths_given_eps(eps)
+        key = ('vol shift', dv)
+        try:
+            hst, constants = self._CACHE[key]
+        except KeyError:
+            hst = self.hst
+            sqrt_v0, sqrt_theta = math.sqrt(hst.default_v0), \
+                math.sqrt(hst.theta)
+            if sqrt_v0 + dv <= 0 or sqrt_theta + dv <= 0:
+                raise ValueError("shifted v0 and theta must be positive")
+            hst = hst._replace(default_v0=(sqrt_v0 + dv) ** 2,
+                               theta=(sqrt_theta + dv) ** 2)
+            constants = hst._grid_constants(np.diff(self.t), self._steps)
+            self._CACHE[key] = hst, constants
         u, z = eps
-        paths = self.hst.generate_path_given_uz(
-            t=self.t, u=u, z=z, v0=None,
-            batch_size=self._batch_size)[1]
-        return paths[:, self._points_for_valuation]
+        return hst._project_on_grid(
+            constants, self._steps, u, z, hst.default_v0, 0.0
+        )[1]
 
     def shift(self, paths, ds, dr, dv, eps):
-        raise NotImplementedError(
-            "does not support calculating greeks or shifting paths"
-            "under Heston model at this point"
-        )
\ No newline at end of file
+        """Shift paths for finite-difference Greeks.
+
+        All shifted paths are projected from the same *u* and *z* as
+        *paths*. Besides the keys returned under Black-Scholes, the result
+        contains paths under bumps of size *dv* to each parameter in
+        :attr:`model_greeks`. *V plus* and *V minus* shift the volatility,
+        i.e., the square roots of *v0* and *theta*, by *dv*."""
+        _key_inputs = str(ds) + str(dr) + str(dv)
+
+        try:
+            val = self._CACHE[_key_inputs]
+        except KeyError:
+            hst = self.hst
+            t = self.t[1:] / hst.day_counter
+            dt = np.diff(self.t)
+            if not (-1 < hst.rho - dv and hst.rho + dv < 1):
+                raise ValueError("shifted rho must lie between -1 and 1")
+            if hst.default_v0 - dv <= 0 or hst.theta - dv <= 0:
+                raise ValueError("shifted v0 and theta must be positive")
+
+            bumped = {}
+            sqrt_v0, sqrt_theta = math.sqrt(hst.default_v0), \
+                math.sqrt(hst.theta)
+            for name, sign in (('V plus', 1), ('V minus', -1)):
+                bumped[name] = hst._replace(
+                    default_v0=(sqrt_v0 + sign * dv) ** 2,
+                    theta=(sqrt_theta + sign * dv) ** 2
+                )
+            for name in self.model_greeks:
+                attr = 'default_v0' if name == 'v0' else name
+                level = getattr(hst, attr)
+                for suffix, sign in ((' plus', 1), (' minus', -1)):
+                    bumped[name + suffix] = hst._replace(
+                        **{attr: level + sign * dv}
+                    )
+            bumped = {
+                k: (b, self._steps, b._grid_constants(dt, self._steps))
+                for k, b in bumped.items()
+            }
+
+            # the valuation day moves one day forward and the shocks of
+            # steps that are no longer simulated are dropped
+            dt_next_day = dt.copy()
+            dt_next_day[0] -= 1
+            dt_next_day[dt_next_day < 0] = 0
+            steps_next_day = hst._grid_steps(dt_next_day, hst.substeps)
+            bumped['Paths next day'] = (
+                hst, steps_next_day,
+                hst._grid_constants(dt_next_day, steps_next_day)
+            )
+
+            val = dict(
+                bumped=bumped,
+                drop=self._points_per_path - int(steps_next_day.sum()),
+                s_plus=np.log(1.0 + ds),
+                s_minus=np.log(1.0 - ds),
+                r_shift=dr * t,
+                df_plus=np.exp(-(hst.r + dr) * t),
+                df_minus=np.exp(-(hst.r - dr) * t),
+                df_next_day=np.exp(-hst.r * (t - 1 / hst.day_counter))
+            )
+            self._CACHE.update({_key_inputs: val})
+
+        u, z = eps
+        shifted_paths = {
+            'S plus': paths + val['s_plus'],
+            'S minus': paths + val['s_minus'],
+            'R plus': paths + val['r_shift'],
+            'R minus': paths - val['r_shift'],
+            'DF plus': val['df_plus'],
+            'DF minus': val['df_minus'],
+            'DF next day': val['df_next_day'],
+        }
+        for name, (hst, steps, constants) in val['bumped'].items():
+            if name == 'Paths next day':
+                _u, _z = u[:, val['drop']:], z[:, val['drop']:]
+            else:
+                _u, _z = u, z
+            shifted_paths[name] = hst._project_on_grid(
+                constants, steps, _u, _z, hst.default_v0, 0.0
+            )[1]
+
+        return shifted_paths
@@ -0,0 +1,229 @@
+"""
+This module provides a correlated multi-asset Black-Scholes market model.
+
+Log paths of a multi-asset process have the shape *(batch, assets, time)*.
+Structures on several underlyings reduce them to a single performance per
+path and time, e.g., with :func:`pyoptmc.tools.helper.worst_of`.
+"""
+import numpy as np
+import numba as nb
+from pyoptmc.structures.base import ProcessCoordinator, OptionABC
+
+
+__all__ = ['MultiAssetBlackScholes']
+
+_reductions = ('worst', 'best')
+
+
+@nb.njit(parallel=True, cache=True)
+def _reduced_paths(chol, drift, diffusion, x0, eps, best):
+    """Simulate correlated log-returns and keep only the worst (or best) of
+    them at each time, so that the paths of every asset are never stored.
+
+    Returns the reduced paths of shape *(batch, steps)* and the log-returns
+    of every asset after the last step."""
+    n, a, m = eps.shape
+    out = np.empty((n, m))
+    last = np.empty((n, a))
+    for i in nb.prange(n):
+        x = x0[i].copy()
+        for k in range(m):
+            for p in range(a):
+                w = 0.0
+                for j in range(p + 1):
+                    w += chol[p, j] * eps[i, j, k]
+                x[p] += drift[p, k] + diffusion[p, k] * w
+            red = x[0]
+            for p in range(1, a):
+                if (x[p] > red) == best:
+                    red = x[p]
+            out[i, k] = red
+        last[i] = x
+    return out, last
+
+
+class MultiAssetBlackScholes:
+    """A Black-Scholes process of several correlated assets. Each log-return
+    follows
+
+    .. math::
+
+        \\mathrm{d}\\left(\\mathrm{log}{S^i_t}\\right)=
+        (r-q_i-\\frac{\\sigma_i^2}{2})\\mathrm{d}t+\\sigma_i\\mathrm{d}W^i_t,
+        \\quad \\mathrm{d}W^i_t\\mathrm{d}W^j_t=\\rho_{ij}\\mathrm{d}t
+
+    The Cholesky factor of the correlation matrix is computed once, when the
+    process is created.
+
+    A structure setting ``path_reduction`` to ``'worst'`` or ``'best'``
+    receives log paths of shape *(batch, time)* holding the worst (or best)
+    log-return of all assets, which are computed on the fly by a compiled
+    kernel instead of being reduced from the paths of every asset.
+
+    Log paths are log-returns of each asset from the spot price of the
+    structure. A structure may set ``log_spot_offsets``, an array of one
+    log-return per asset, which is added to the paths of that asset, e.g.,
+    the log performance of each asset since its initial fixing.
+
+    Parameters
+    ----------
+    r : scalar
+        The instantaenous risk-free rate.
+    q : scalar or array_like
+        The continuous yields of the assets.
+    v : array_like
+        The diffusion parameters of the assets.
+    corr : array_like
+        The correlation matrix of the assets.
+    day_counter : int
+        An integer that controls the numder of trading days in a year. Default is 252."""
+
+    def __init__(self, r, q, v, corr, day_counter=252):
+        v = np.asarray(v, dtype=float).ravel()
+        corr = np.asarray(corr, dtype=float)
+        n = len(v)
+        if corr.shape != (n, n):
+            raise ValueError(
+                "'corr' must be a square matrix matching the number of assets."
+            )
+        if not np.allclose(corr, corr.T) or not np.allclose(np.diag(corr), 1):
+            raise ValueError(
+                "'corr' must be symmetric with a unit diagonal."
+            )
+        try:
+            self._chol = np.linalg.cholesky(corr)
+        except np.linalg.LinAlgError:
+            raise ValueError("'corr' must be positive definite.") from None
+
+        self.r = r
+        self.q = np.broadcast_to(np.asarray(q, dtype=float), (n,)).copy()
+        self.v = v
+        self.corr = corr
+        self.day_counter = day_counter
+
+    @property
+    def num_assets(self):
+        return len(self.v)
+
+    def _logs_drift_diffusion(self, dt, v=None):
+        """Return the drifts and diffusions of the logarithms of asset prices,
+        of shape *(assets, steps)*."""
+        v = self.v if v is None else v
+        dt = np.maximum(np.asarray(dt, dtype=float), 0) / self.day_counter
+        drift = np.outer(self.r - self.q - 0.5 * v * v, dt)
+        diffusion = np.outer(v, np.sqrt(dt))
+        return drift, diffusion
+
+    def _project(self, drift, diffusion, eps):
+        """Correlate independent normals of shape *(batch, assets, steps)*
+        and accumulate log-returns along time."""
+        exp_ds = np.matmul(self._chol, eps)
+        exp_ds *= diffusion
+        exp_ds += drift
+        return exp_ds.cumsum(axis=2)
+
+    @property
+    def coordinator(self):
+        return _MultiAssetBSCoordinator
+
+
+class _MultiAssetBSCoordinator(ProcessCoordinator):
+    def __init__(self, option: OptionABC, mbs: MultiAssetBlackScholes):
+        self.option = option
+        self.mbs = mbs
+
+        self.t = option.sim_t_array
+        self.dt = np.diff(self.t)
+        self.df = np.exp(-mbs.r / mbs.day_counter * self.t[1:])
+        self.drift, self.diffusion = mbs._logs_drift_diffusion(self.dt)
+        offsets = getattr(option, 'log_spot_offsets', None)
+        self._offsets = np.zeros((mbs.num_assets, 1)) if offsets is None \
+            else np.reshape(offsets, (mbs.num_assets, 1))
+        self._reduction = getattr(option, 'path_reduction', None)
+        if self._reduction not in (None,) + _reductions:
+            raise ValueError(
+                "'path_reduction' must be None or one of %s, got %r"
+                % (_reductions, self._reduction)
+            )
+
+        self._points_per_path = len(self.dt)
+        self._CACHE = {}
+
+    def generate_eps(self, seed, batch_size):
+        rng = np.random.default_rng(seed)
+        return rng.normal(
+            0, 1, (batch_size, self.mbs.num_assets, self._points_per_path)
+        )
+
+    def _paths(self, drift, diffusion, eps, state=None):
+        """Return log paths, reduced if required by the structure, and the
+        log-returns of every asset after the last step."""
+        if state is None:
+            state = self.initial_state(len(eps))
+        if self._reduction is not None:
+            return _reduced_paths(
+                self.mbs._chol, drift, diffusion, state, eps,
+                self._reduction == 'best'
+            )
+        paths = self.mbs._project(drift, diffusion, eps)
+        paths += state[:, :, None]
+        return paths, paths[:, :, -1]
+
+    def paths_given_eps(self, eps):
+        return self._paths(self.drift, self.diffusion, eps)[0]
+
+    def initial_state(self, batch_size):
+        return np.repeat(self._offsets.T, batch_size, axis=0)
+
+    def evolve(self, rng, state, start, stop):
+        eps = rng.normal(0, 1, (len(state), self.mbs.num_assets, stop - start))
+        return self._paths(
+            self.drift[:, start:stop], self.diffusion[:, start:stop], eps, state
+        )
+
+    def shift(self, paths, ds, dr, dv, eps):
+
+        _key_inputs = str(ds) + str(dr) + str(dv)
+
+        try:
+            val = self._CACHE[_key_inputs]
+        except KeyError:
+            mbs, t, dt = self.mbs, self.t, self.dt
+            day_counter = mbs.day_counter
+
+            # all assets are shifted in parallel
+            r_shift = dr / day_counter * t[1:]
+            dt_next_day = dt.copy()
+            dt_next_day[0] -= 1
+
+            val = {
+                'S plus': np.log(1.0 + ds), 'S minus': np.log(1.0 - ds),
+                'R plus': r_shift, 'R minus': -r_shift,
+                'V plus': mbs._logs_drift_diffusion(dt, mbs.v + dv),
+                'V minus': mbs._logs_drift_diffusion(dt, mbs.v - dv),
+                'DF plus': np.exp(-(mbs.r + dr) / day_counter * t[1:]),
+                'DF minus': np.exp(-(mbs.r - dr) / day_counter * t[1:]),
+                'DF next day': np.exp(-mbs.r / day_counter * (t[1:] - 1)),
+                'Paths next day': mbs._logs_drift_diffusion(dt_next_day)
+            }
+
+            self._CACHE.update({_key_inputs: val})
+
+        def _paths(drift_diffusion):
+            return self._paths(*drift_diffusion, eps)[0]
+
+        # shifts common to all assets commute with the reduction
+        shifted_paths = {
+            'S plus': paths + val['S plus'],
+            'S minus': paths + val['S minus'],
+            'R plus': paths + val['R plus'],
+            'R minus': paths + val['R minus'],
+            'V plus': _paths(val['V plus']),
+            'V minus': _paths(val['V minus']),
+            'DF plus': val['DF plus'],
+            'DF minus': val['DF minus'],
+            'DF next day': val['DF next day'],
+            'Paths next day': _paths(val['Paths next day'])
+        }
+
+        return shifted_paths
@@ -1 +1,3 @@
-from pyoptmc.products.products import *
\ No newline at end of file
+from pyoptmc.products.products import *
+from pyoptmc.products.book import *
+from pyoptmc.products.scenarios import *
@@ -0,0 +1,346 @@
+"""
+This module implements a book of products, which follows the lifecycle of
+each trade day by day and values all live trades at the end of the day.
+
+The state of a trade, i.e., whether it is knocked in or out, the cash flows
+it has paid and the positions of its next observations, is advanced by one
+trading day per fixing, so no schedule is re-derived from dates. Trades on
+the same underlying asset are valued together on the same paths.
+"""
+import datetime
+import numpy as np
+import pyoptmc.structures as structures
+from pyoptmc.dateutil import Calendar
+from pyoptmc.products.products import (
+    SnowballProd,
+    PhoenixProd,
+    _check_calendar,
+    _check_is_trading,
+)
+
+
+__all__ = ['Book']
+
+
+class _TradeState:
+    """Lifecycle state of a trade. Intended to be subclassed not used.
+
+    *elapsed* is the number of trading days since the start date of the
+    product. Subclasses implement :meth:`_observe` and :meth:`structure`."""
+
+    def __init__(self, product):
+        self.product = product
+        self.elapsed = 0
+        self.knocked_in = False
+        self.knocked_out = False
+        self.alive = True
+        self.cash_flows = []
+
+    @staticmethod
+    def _hit(days, pos, day):
+        """Return whether *day* is the observation day at *pos* of *days*,
+        and the position of the next observation day."""
+        if pos < len(days) and days[pos] == day:
+            return True, pos + 1
+        return False, pos
+
+    def fix(self, date, price):
+        """Advance the trade by one trading day, observing *price* on
+        *date*. Return the amount paid to the holder on this day."""
+        self.elapsed += 1
+        amount = self._observe(self.elapsed, price)
+        if amount:
+            self.cash_flows.append((date, amount))
+        return amount
+
+    def _observe(self, day, price):
+        raise NotImplementedError
+
+    def structure(self, spot):
+        """Return the structure valuing the rest of the life of the trade,
+        given the spot price after today's fixing."""
+        raise NotImplementedError
+
+    def snapshot(self):
+        """Return the lifecycle state as a dict."""
+        return dict(
+            elapsed=self.elapsed, knocked_in=self.knocked_in,
+            knocked_out=self.knocked_out, alive=self.alive,
+            paid=sum(amount for _, amount in self.cash_flows),
+            cash_flows=list(self.cash_flows),
+        )
+
+
+class _SnowballState(_TradeState):
+    def __init__(self, product):
+        super().__init__(product)
+        self.ko_days = np.asarray(product.ob_days_out)
+        self.ki_days = np.asarray(product.ob_days_in)
+        self.ko_pos = 0
+        self.ki_pos = 0
+
+    def _observe(self, day, price):
+        p = self.product
+        ki_obs, self.ki_pos = self._hit(self.ki_days, self.ki_pos, day)
+        if ki_obs and price <= p.ki_barriers[self.ki_pos - 1]:
+            self.knocked_in = True
+        ko_obs, self.ko_pos = self._hit(self.ko_days, self.ko_pos, day)
+        if ko_obs and price >= p.ko_barriers[self.ko_pos - 1]:
+            self.knocked_out = True
+            self.alive = False
+            return p.ko_rebate[self.ko_pos - 1]
+        if day == self.ko_days[-1]:
+            self.alive = False
+            payoff = p.ki_payoff if self.knocked_in else p.nk_payoff
+            return payoff(np.array([price]))[0]
+        return 0.0
+
+    def structure(self, spot):
+        p = self.product
+        ko = slice(self.ko_pos, None)
+        ki = slice(self.ki_pos, None)
+        ob_days_out = self.ko_days[ko] - self.elapsed
+        if self.knocked_in or self.ki_pos == len(self.ki_days):
+            # no knock-in is left to observe
+            payoff = p.ki_payoff if self.knocked_in else p.nk_payoff
+            return p._structure_ki(
+                spot=spot, ob_days=ob_days_out, rebate=p.ko_rebate[ko],
+                payoff=payoff, barrier=p.ko_barriers[ko]
+            )
+        return p._structure_nki(
+            spot=spot, ob_days_out=ob_days_out, rebate_out=p.ko_rebate[ko],
+            ob_days_in=self.ki_days[ki] - self.elapsed,
+            payoff_in=p.ki_payoff, upper_barrier_out=p.ko_barriers[ko],
+            lower_barrier_in=p.ki_barriers[ki], payoff_nk=p.nk_payoff
+        )
+
+
+class _PhoenixState(_TradeState):
+    def __init__(self, product):
+        super().__init__(product)
+        self.ko_days = np.asarray(product.ob_days_out)
+        self.ki_days = np.asarray(product.ob_days_in)
+        self.settlement_days = np.asarray(product.ob_days_settled)
+        self.maturity = max(self.ko_days[-1], self.ki_days[-1],
+                            self.settlement_days[-1])
+        self.ko_pos = 0
+        self.ki_pos = 0
+        self.settlement_pos = 0
+        # a knock-in barrier of 0 marks the product as knocked in
+        self.knocked_in = product.ki_barrier == 0.0
+
+    def _observe(self, day, price):
+        p = self.product
+        amount = 0.0
+        ki_obs, self.ki_pos = self._hit(self.ki_days, self.ki_pos, day)
+        if ki_obs and price <= p.ki_barrier:
+            self.knocked_in = True
+        settled, self.settlement_pos = self._hit(
+            self.settlement_days, self.settlement_pos, day
+        )
+        if settled and price >= p.settlement_barrier:
+            amount += p.settlement_coupons[self.settlement_pos - 1]
+        ko_obs, self.ko_pos = self._hit(self.ko_days, self.ko_pos, day)
+        if ko_obs and price >= p.ko_barrier:
+            self.knocked_out = True
+            self.alive = False
+            return amount
+        if day == self.maturity:
+            self.alive = False
+            if self.knocked_in:
+                amount -= max(p.initial_price - price, 0.0)
+        return amount
+
+    def structure(self, spot):
+        p = self.product
+        ki_days = self.ki_days[self.ki_pos:] - self.elapsed
+        ko_days = self.ko_days[self.ko_pos:] - self.elapsed
+        settlement_days = \
+            self.settlement_days[self.settlement_pos:] - self.elapsed
+        obj = p._structure(
+            spot, p.ko_barrier, 0.0 if self.knocked_in else p.ki_barrier,
+            p.settlement_barrier, ki_days, ko_days, settlement_days,
+            p.settlement_coupons[self.settlement_pos:],
+            np.zeros(len(ko_days)), 0.0
+        )
+        obj._strike = p.initial_price
+        return obj
+
+
+_STATES = ((SnowballProd, _SnowballState), (PhoenixProd, _PhoenixState))
+
+
+class Book:
+    def __init__(self, date: datetime.date, calendar: Calendar = None):
+        """A book of trades whose lifecycle is advanced day by day.
+
+        Parameters
+        ----------
+        date : datetime.date
+            The current date of the book. It must be a trading day.
+        calendar : Calendar
+            *Calendar* object. If *None* a default calendar will be used.
+
+        Examples
+        --------
+        At the end of each trading day, fixings of all underlying assets
+        advance the trades, and live trades are valued on shared paths::
+
+            book = Book(today)
+            book.add('sb-1', snowball, 'CSI500')
+            paid = book.advance(next_day, {'CSI500': 6012.3})
+            pvs = book.value(mc, {'CSI500': bs}, entropy=1)
+        """
+        if calendar is None:
+            calendar = Calendar()
+        self.calendar = _check_calendar(calendar)
+        self.date = _check_is_trading(date, calendar)
+        self.spots = {}
+        self._trades = {}
+        self._pending = {}
+
+    def add(self, trade_id, product, underlying, fixings=None):
+        """Add a trade to the book.
+
+        Parameters
+        ----------
+        trade_id : hashable
+            Identifier of the trade.
+        product : SnowballProd or PhoenixProd
+            The product traded, on a single underlying asset.
+        underlying : hashable
+            Identifier of the underlying asset, the key of its fixings.
+        fixings : array_like
+            If the product started before the current date of the book, the
+            daily prices of the underlying asset on each trading day after
+            the start date up to the current date, which are replayed to
+            catch up with the book.
+        """
+        if trade_id in self._trades or trade_id in self._pending:
+            raise ValueError("Trade %s is already in the book" % trade_id)
+        for product_cls, state_cls in _STATES:
+            if isinstance(product, product_cls) and \
+                    not hasattr(product, 'initial_prices'):
+                break
+        else:
+            raise TypeError(
+                "%s is not supported by Book" % product.__class__.__name__
+            )
+        state = state_cls(product)
+        if product.start_date > self.date:
+            self._pending[trade_id] = (state, underlying)
+            return
+        dates = self.calendar.trading_days_between(
+            product.start_date, self.date, endpoints=True
+        )[1:]
+        fixings = [] if fixings is None else list(fixings)
+        if len(fixings) != len(dates):
+            raise ValueError(
+                "Expected %d fixings since the start date, got %d"
+                % (len(dates), len(fixings))
+            )
+        for date, price in zip(dates, fixings):
+            if state.alive:
+                state.fix(date, price)
+        if fixings:
+            # the latest fixing is the spot price until the next advance
+            self.spots.setdefault(underlying, fixings[-1])
+        self._trades[trade_id] = (state, underlying)
+
+    def advance(self, date: datetime.date, fixings):
+        """Advance the book to *date*, the next trading day, given the
+        fixings of the underlying assets on that day.
+
+        Parameters
+        ----------
+        date : datetime.date
+            The next trading day.
+        fixings : dict
+            Prices of the underlying assets, keyed by their identifiers.
+
+        Returns
+        -------
+        dict
+            Amounts paid to holders on *date*, keyed by trade identifiers.
+        """
+        if date != self.calendar.offset(self.date, 1):
+            raise ValueError(
+                "%s is not the trading day after %s" % (date, self.date)
+            )
+        paid = {}
+        for trade_id, (state, underlying) in self._trades.items():
+            if not state.alive:
+                continue
+            try:
+                price = fixings[underlying]
+            except KeyError:
+                raise ValueError(
+                    "Missing fixing of %s for trade %s"
+                    % (underlying, trade_id)
+                ) from None
+            amount = state.fix(date, price)
+            if amount:
+                paid[trade_id] = amount
+        # trades starting today are observed from the next trading day
+        for trade_id, (state, underlying) in list(self._pending.items()):
+            if state.product.start_date == date:
+                self._trades[trade_id] = self._pending.pop(trade_id)
+        self.date = date
+        self.spots.update(fixings)
+        return paid
+
+    def state(self, trade_id):
+        """Return the lifecycle state of a trade as a dict."""
+        if trade_id in self._pending:
+            return self._pending[trade_id][0].snapshot()
+        return self._trades[trade_id][0].snapshot()
+
+    def live_trades(self):
+        """Return the identifiers of live trades, grouped by underlying
+        asset."""
+        groups = {}
+        for trade_id, (state, underlying) in self._trades.items():
+            if state.alive:
+                groups.setdefault(underlying, []).append(trade_id)
+        return groups
+
+    def value(self, engine, processes, spots=None, entropy=None,
+              caller=None):
+        """Value live trades at the end of the current date of the book.
+        Trades on the same underlying asset are valued in one pass of
+        *engine* on the same paths.
+
+        Parameters
+        ----------
+        engine : MonteCarlo
+            The engine.
+        processes : dict
+            Market processes of the underlying assets, keyed by their
+            identifiers.
+        spots : dict
+            Spot prices of the underlying assets. If None, their latest
+            fixings.
+        entropy : int
+            Forwarded to :meth:`~pyoptmc.engine.monte_carlo.MonteCarlo.calc`.
+        caller : callable
+            Forwarded to :meth:`~pyoptmc.engine.monte_carlo.MonteCarlo.calc`.
+
+        Returns
+        -------
+        dict
+            Present values keyed by trade identifiers.
+        """
+        spots = self.spots if spots is None else spots
+        pvs = {}
+        for underlying, trade_ids in self.live_trades().items():
+            try:
+                spot = spots[underlying]
+            except KeyError:
+                raise ValueError("No spot price of %s" % underlying) from None
+            bundle = structures.StructureBundle([
+                self._trades[t][0].structure(spot) for t in trade_ids
+            ])
+            res = engine.calc(bundle, processes[underlying], entropy=entropy,
+                              caller=caller)
+            pvs.update(zip(trade_ids, res))
+        return pvs
@@ -6,10 +6,14 @@ import pyoptmc.tools.payoffs as pay
 from functools import partial
 from pyoptmc.tools.helper import arr_scalar_converter
 from pyoptmc.dateutil import Calendar
-from scipy.optimize import fsolve
+from pyoptmc.engine.path_cache import PathCache
+from pyoptmc.products.scenarios import ScenarioCube
+from scipy.optimize import bisect
+from numpy.lib.stride_tricks import sliding_window_view
 from numpy import array, any, argmax
 
-__all__ = ['SnowballProd', 'PhoenixProd']
+__all__ = ['SnowballProd', 'PhoenixProd', 'WorstOfSnowballProd',
+           'WorstOfPhoenixProd']
 
 
 def _interval_coupon(
@@ -37,9 +41,7 @@ def _update_day_arr(arr, offset, *more):
         if d >= 0:
             nn.append(d)
 
-    if more:
-        return nn, *(m[len(arr) - len(nn):] for m in more)
-    return nn
+    return nn, *(m[len(arr) - len(nn):] for m in more)
 
 def _compute_coupons(dates, start_date, spot, coupon_rate):
     first = (dates[0] - start_date).days / 365.0
@@ -82,12 +84,210 @@ def _check_calendar(calendar):
         raise TypeError("calendar must be Calendar object")
     return calendar
 
+def _solve_coupon_rate(engine, process, target_pv, base, unit,
+                       entropy=None, caller=None):
+    """Solve for the coupon rate of a product whose PV is affine in it.
+
+    *base* and *unit* are the structures of the product with coupon rates 0
+    and 1. They are valued in one pass on the same paths, so that the PV at
+    rate *c* is ``pv(base) + c * (pv(unit) - pv(base))`` on these paths.
+    The error is the standard error of the rate, estimated from the
+    residuals of batches."""
+    bundle = structures.StructureBundle([base, unit])
+    res = engine.calc_batches(bundle, process, entropy=entropy, caller=caller)
+    fixed_leg = res[:, 0]
+    coupon_leg = res[:, 1] - res[:, 0]
+    rate = (target_pv - fixed_leg.mean()) / coupon_leg.mean()
+    residuals = fixed_leg + rate * coupon_leg - target_pv
+    error = np.nan
+    if len(residuals) > 1:
+        error = residuals.std(ddof=1) / np.sqrt(len(residuals)) / \
+            abs(coupon_leg.mean())
+    return dict(result=rate, diff=residuals.mean(), error=error)
+
+
+def _solve_barrier(engine, process, target_pv, make_structure, bracket,
+                   entropy=None, xtol=1e-4, path_cache=None):
+    """Solve for the barrier level given by *make_structure(level)* within
+    *bracket* by bisection.
+
+    Structures of all levels are valued on the same paths, simulated once
+    given *entropy* and kept in *path_cache*, or in a cache without memory
+    cap if None. The barrier must not change the simulation days."""
+    if path_cache is None:
+        path_cache = PathCache(max_bytes=np.inf)
+    entropy = np.random.SeedSequence(entropy).entropy
+    lo, hi = bracket
+
+    def _diff(level):
+        return engine.calc(make_structure(level), process, entropy=entropy,
+                           path_cache=path_cache) - target_pv
+
+    if np.sign(_diff(lo)) == np.sign(_diff(hi)):
+        raise ValueError(
+            "PVs at the barriers %s and %s are on the same side of the "
+            "target PV" % (lo, hi)
+        )
+    level = bisect(_diff, lo, hi, xtol=xtol)
+    return dict(result=level, diff=_diff(level))
+
+
+class _Backtest:
+    """Mixin backtesting a product over all windows of a daily price series.
+
+    Subclasses implement :meth:`_payment_days` and :meth:`_window_cash_flows`.
+    *_backtest_level* is the level to which prices are scaled at the start
+    of each window, or None to backtest on the prices as they are."""
+
+    _backtest_level = None
+    #: how the prices of several assets are reduced to one, e.g., 'worst'
+    _backtest_reduction = None
+
+    def _payment_days(self):
+        """Return the ascending days on which cash flows may be paid. The
+        last one is the maturity."""
+        raise NotImplementedError
+
+    def _window_cash_flows(self, levels):
+        """Return the cash flows of all windows on the payment days, their
+        holding days and a dict of further results, given *levels*, a
+        function returning the scaled prices of all windows on given
+        days."""
+        raise NotImplementedError
+
+    def _windows(self, prices, n_days):
+        """Return a function of days returning the scaled prices of all
+        windows of *n_days + 1* consecutive prices on these days. Windows
+        are zero-copy views of *prices*."""
+        prices = np.asarray(prices, dtype=float)
+        reduce = self._backtest_reduction is not None
+        if prices.ndim != (2 if reduce else 1):
+            raise ValueError(
+                "Prices should be a %s array." % ("2-D" if reduce else "1-D")
+            )
+        if len(prices) <= n_days:
+            raise ValueError(
+                "At least %d prices are required, got %d"
+                % (n_days + 1, len(prices))
+            )
+        # windows run along the last axis
+        windows = sliding_window_view(prices, n_days + 1, axis=0)
+        level = self._backtest_level
+
+        def levels(days):
+            days = np.asarray(days, dtype=int)
+            if reduce:
+                # the worst performance of the assets of each window
+                return np.min(windows[..., days] / windows[..., :1],
+                              axis=1) * level
+            if level is None:
+                return windows[:, days]
+            return windows[:, days] / windows[:, :1] * level
+        return levels
+
+    def backtest_windows(self, daily_underlying_asset_prices):
+        """Backtest the product started on each day of a price series, in
+        one vectorized pass over all windows of the life of the product.
+
+        Observation days are counted in trading days from the start of each
+        window. Prices in a window are scaled such that its first price is
+        the initial price of the product, if the product has one.
+
+        Parameters
+        ----------
+        daily_underlying_asset_prices : array_like
+            Daily prices of the underlying asset, longer than the life of
+            the product. For products on several assets, an array of shape
+            *(days, assets)*.
+
+        Returns
+        -------
+        dict
+            *payment_days*, the days on which cash flows may be paid, and
+            arrays with an element per window, i.e., per start day:
+            *cash_flows*, the amounts paid to the holder on the payment
+            days, *payout*, their sum, *holding_days*, the number of
+            trading days until the product ends, and results specific to
+            the product, e.g., whether it is knocked out.
+        """
+        payment_days = np.asarray(self._payment_days())
+        levels = self._windows(daily_underlying_asset_prices, payment_days[-1])
+        cash_flows, holding_days, results = self._window_cash_flows(levels)
+        return dict(payment_days=payment_days, cash_flows=cash_flows,
+                    payout=cash_flows.sum(axis=1), holding_days=holding_days,
+                    **results)
+
+
+class _Scenarios:
+    """Mixin valuing a product over a grid of valuation dates, spot prices
+    and volatility shifts. Subclasses implement *to_structure*."""
+
+    def scenario_grid(self, engine, process, valuation_dates, spots,
+                      vol_shifts=(0.0,), ki_flag=False, entropy=None,
+                      caller=None):
+        """Value the product over a grid of valuation dates, spot prices and
+        parallel shifts of the volatility.
+
+        Grid points of a valuation date share the remaining schedule of the
+        product, so they are valued together by
+        :meth:`~pyoptmc.engine.monte_carlo.MonteCarlo.calc_scenarios` on one
+        set of random numbers: spot prices by shifting the paths relative to
+        the barriers, and volatility shifts by scaling the diffusion. All
+        dates use the same *entropy*, so differences across the grid are
+        not blurred by noise.
+
+        Parameters
+        ----------
+        engine : MonteCarlo
+            The engine.
+        process : BlackScholes or Heston
+            Market process. It must support volatility scenarios.
+        valuation_dates : sequence of datetime.date
+            Valuation dates.
+        spots : array_like
+            Spot prices.
+        vol_shifts : array_like
+            Parallel shifts of the annual volatility, e.g., ``(-0.02, 0,
+            0.02)``.
+        ki_flag : bool
+            Whether the product is knocked in on all valuation dates.
+        entropy : int
+            Entropy of the seed sequence. If None, the entropy drawn for the
+            first date is reused for all dates.
+        caller : callable
+            Forwarded to the engine.
+
+        Returns
+        -------
+        ScenarioCube
+            Present values with dimensions *date*, *spot* and *vol_shift*.
+        """
+        valuation_dates = list(valuation_dates)
+        spots = np.asarray(spots, dtype=float).ravel()
+        values = {}
+        for date in valuation_dates:
+            if date in values:
+                continue
+            structure = self.to_structure(date, spots[0], ki_flag)
+            values[date] = engine.calc_scenarios(
+                structure, process, spots, vol_shifts, entropy, caller
+            )
+            entropy = engine.most_recent_entropy
+        return ScenarioCube(
+            np.stack([values[d] for d in valuation_dates]),
+            dict(date=valuation_dates, spot=spots,
+                 vol_shift=np.asarray(vol_shifts, dtype=float).ravel())
+        )
+
+
 # class Product(ABC):
 #     def __init__(self):
 #         pass
 
 
-class PhoenixProd:
+class PhoenixProd(_Backtest, _Scenarios):
+    _structure = structures.StandardPhoenix
+
     def __init__(
             self,
             start_date,
@@ -139,26 +339,33 @@ class PhoenixProd:
         self.settlement_coupons = _compute_coupons(settlement_dates, start_date, initial_price,
                                                    settlement_coupon_rate)
         self.start_date = start_date
+        self.initial_price = initial_price
+        # the spot passed to *value* on the start date
+        self._spot_at_start = initial_price
+        self._backtest_level = initial_price
 
     def to_structure(self, valuation_date, spot, ki_flag):
-        if ki_flag:
-            self.ki_barrier = 0.0
+        # a knock-in barrier of 0 marks the structure as knocked in
+        ki_barrier = 0.0 if ki_flag else self.ki_barrier
         valuation_date = _check_is_trading(valuation_date, self.calendar)
         td = self.calendar.num_trading_days_between(
             start=self.start_date, end=valuation_date, count_end=True
         )
         ob_days_out = _update_day_arr(self.ob_days_out, td)
         ob_days_out = np.array(ob_days_out[0])
-        ob_days_settled = _update_day_arr(self.ob_days_settled, td)
-        ob_days_settled = np.array(ob_days_settled[0])
+        ob_days_settled, coupons = _update_day_arr(
+            self.ob_days_settled, td, self.settlement_coupons
+        )
+        ob_days_settled = np.array(ob_days_settled)
         ob_days_in = _update_day_arr(self.ob_days_in, td)
         ob_days_in = np.array(ob_days_in[0])
-        obj = structures.StandardPhoenix(spot, self.ko_barrier, self.ki_barrier, self.settlement_barrier,
-                                         ob_days_in, ob_days_out, ob_days_settled,
-                                         self.settlement_coupons,
-                                         0.0 * np.ones(len(ob_days_out)),
-                                         0.0)
-
+        obj = self._structure(spot, self.ko_barrier, ki_barrier, self.settlement_barrier,
+                              ob_days_in, ob_days_out, ob_days_settled,
+                              coupons,
+                              0.0 * np.ones(len(ob_days_out)),
+                              0.0)
+        # the put is struck at the initial price, not at the spot
+        obj._strike = self.initial_price
         return obj
 
 
@@ -166,7 +373,87 @@ class PhoenixProd:
         return self.to_structure(valuation_date, spot, ki_flag).calc_value(
             *args, **kwargs)
 
-class SnowballProd:
+    def _payment_days(self):
+        return np.union1d(np.union1d(self.ob_days_settled, self.ob_days_out),
+                          self.ob_days_in)
+
+    def _window_cash_flows(self, levels):
+        payment_days = self._payment_days()
+        n_days = payment_days[-1]
+        ko_days = np.asarray(self.ob_days_out)
+        settlement_days = np.asarray(self.ob_days_settled)
+        ko_hit = levels(ko_days) >= self.ko_barrier
+        knocked_out = ko_hit.any(axis=1)
+        ko_day = np.where(knocked_out, ko_days[ko_hit.argmax(axis=1)], n_days)
+        if self.ki_barrier == 0.0:
+            # the product is knocked in already
+            knocked_in = ~knocked_out
+        else:
+            knocked_in = np.any(
+                levels(self.ob_days_in) <= self.ki_barrier, axis=1
+            ) & ~knocked_out
+
+        # coupons are paid on settlement days up to the knock-out day
+        paid = settlement_days <= ko_day[:, None]
+        if self.settlement_barrier != 0.0:
+            paid &= levels(settlement_days) >= self.settlement_barrier
+        cash_flows = np.zeros((len(ko_day), len(payment_days)))
+        cash_flows[:, np.searchsorted(payment_days, settlement_days)] = \
+            paid * np.asarray(self.settlement_coupons)
+        # a short put struck at the initial price if knocked in
+        final = levels([n_days])[:, 0]
+        cash_flows[:, -1] -= knocked_in * pay.plain_vanilla(
+            final, self.initial_price, 'put')
+        return cash_flows, ko_day, dict(knocked_out=knocked_out,
+                                        knocked_in=knocked_in)
+
+    def _replace(self, **changes):
+        """Return a copy of the product with some inputs changed."""
+        return self.__class__(**dict(self._inputs, **changes))
+
+    def find_coup_rate(self, engine, process, target_pv,
+                       entropy=None, caller=None):
+        """Give a target PV, find the settlement coupon rate.
+
+        The PV is affine in the rate, so it is solved from one valuation of
+        the products with rates 0 and 1 on the same paths. *entropy* and
+        *caller* are forwarded to
+        :meth:`pyoptmc.engine.monte_carlo.MonteCarlo.calc_batches`.
+
+        Returns
+        -------
+        dict
+            The rate *result*, the mean difference *diff* between the PV at
+            the rate and *target_pv*, and the standard error *error* of the
+            rate.
+        """
+        base, unit = (
+            self._replace(settlement_coupon_rate=c).to_structure(
+                self.start_date, self._spot_at_start, False)
+            for c in (0.0, 1.0)
+        )
+        return _solve_coupon_rate(engine, process, target_pv, base, unit,
+                                  entropy, caller)
+
+    def find_ko_barrier(self, engine, process, target_pv, bracket,
+                        entropy=None, xtol=1e-4, path_cache=None):
+        """Give a target PV, find the knock-out barrier within *bracket*, a
+        tuple of levels at which PVs are on either side of *target_pv*.
+
+        Paths are simulated once given *entropy* and kept in *path_cache*,
+        a :class:`~pyoptmc.engine.path_cache.PathCache`, or in memory if
+        None, and the barrier is found by bisection on them to a tolerance
+        of *xtol*.
+        """
+        return _solve_barrier(
+            engine, process, target_pv,
+            lambda b: self._replace(ko_barrier=b).to_structure(
+                self.start_date, self._spot_at_start, False),
+            bracket, entropy, xtol, path_cache
+        )
+
+
+class SnowballProd(_Backtest, _Scenarios):
     """A snowball structure is an autocallable structured product with snowballing
     coupon payments.
 
@@ -236,6 +523,9 @@ class SnowballProd:
         # value the contract given day and spot price
         option.value(datetime.date(2019, 5, 7), 102, False, mc, bs)"""
 
+    _structure_nki = structures.UpOutDownIn
+    _structure_ki = structures.UpOut
+
     def __init__(
             self, start_date, initial_price, ko_barriers,
             ko_ob_dates, ki_barriers, ki_ob_dates, ki_payoff,
@@ -301,6 +591,9 @@ class SnowballProd:
         ) for d in ko_ob_dates]
 
         self._frozen = _frozen
+        # the spot passed to *value* on the start date
+        self._spot_at_start = initial_price
+        self._backtest_level = initial_price
 
     def to_structure(self, valuation_date, spot, ki_flag):
         """Return the structure used to value the product."""
@@ -315,14 +608,14 @@ class SnowballProd:
             self.ob_days_in, td, self.ki_barriers
         )
         if not ki_flag:
-            obj = structures.UpOutDownIn(
+            obj = self._structure_nki(
                 spot=spot, ob_days_out=ob_days_out, rebate_out=rebate_out,
                 ob_days_in=ob_days_in, payoff_in=self.ki_payoff,
                 upper_barrier_out=barrier_out, lower_barrier_in=barrier_in,
                 payoff_nk=self.nk_payoff
             )
         else:
-            obj = structures.UpOut(
+            obj = self._structure_ki(
                 spot=spot, ob_days=ob_days_out, rebate=rebate_out,
                 payoff=self.ki_payoff, barrier=barrier_out
             )
@@ -346,30 +639,52 @@ class SnowballProd:
         return self.to_structure(valuation_date, spot, ki_flag).calc_value(
             *args, **kwargs)
 
+    def _replace(self, **changes):
+        """Return a copy of the product with some inputs changed."""
+        return self.__class__(**dict(self._inputs, **changes))
+
     def find_coup_rate(self, engine, process, target_pv,
                        entropy=None, caller=None):
-        """Give a target PV, find the coupon rate.
+        """Give a target PV, find the coupon rate, which applies both on
+        knock-out and at maturity.
 
-        *entropy* and *caller* are forwarded to
-        :meth:`pyoptmc.engine.monte_carlo.MonteCarlo.calc`
+        The PV is affine in the rate, so it is solved from one valuation of
+        the products with rates 0 and 1 on the same paths. *entropy* and
+        *caller* are forwarded to
+        :meth:`pyoptmc.engine.monte_carlo.MonteCarlo.calc_batches`.
+
+        Returns
+        -------
+        dict
+            The rate *result*, the mean difference *diff* between the PV at
+            the rate and *target_pv*, and the standard error *error* of the
+            rate.
         """
-        e = entropy
-
-        def _call(c):
-            nonlocal e
-            if e is None:
-                e = engine.most_recent_entropy
-            inputs = self._inputs
-            inputs['ko_coupon_rate'] = c[0]
-            inputs['maturity_coupon_rate'] = c[0]
-            s = self.__class__(**inputs)
-            diff = s.value(self.start_date, self.initial_price, False,
-                           engine, process, entropy=e,
-                           caller=caller) - target_pv
-            return diff
-
-        rate = fsolve(_call, array([self.ko_coupon_rate]))[0]
-        return dict(result=rate, diff=_call([rate]))
+        base, unit = (
+            self._replace(ko_coupon_rate=c, maturity_coupon_rate=c)
+            .to_structure(self.start_date, self._spot_at_start, False)
+            for c in (0.0, 1.0)
+        )
+        return _solve_coupon_rate(engine, process, target_pv, base, unit,
+                                  entropy, caller)
+
+    def find_ko_barrier(self, engine, process, target_pv, bracket,
+                        entropy=None, xtol=1e-4, path_cache=None):
+        """Give a target PV, find the time-invariant knock-out barrier within
+        *bracket*, a tuple of levels at which PVs are on either side of
+        *target_pv*.
+
+        Paths are simulated once given *entropy* and kept in *path_cache*,
+        a :class:`~pyoptmc.engine.path_cache.PathCache`, or in memory if
+        None, and the barrier is found by bisection on them to a tolerance
+        of *xtol*.
+        """
+        return _solve_barrier(
+            engine, process, target_pv,
+            lambda b: self._replace(ko_barriers=b).to_structure(
+                self.start_date, self._spot_at_start, False),
+            bracket, entropy, xtol, path_cache
+        )
 
     def backtest(self, daily_underlying_asset_prices):
         """backtest the performance of the product in the option holders' view
@@ -388,29 +703,122 @@ class SnowballProd:
         payout: double
             the actual payout of the product to the option holder
         """
-        strct = self.to_structure(self.start_date, self.initial_price, False)
-        ko_ob_days = strct.ob_days_out
-        ki_ob_days = strct.ob_days_in
-        ko_barriers = strct.upper_barrier_out
-        ki_barriers = strct.log_barrier_in
-        n_days = ko_ob_days[-1]
-        rebates = strct.rebate_out
-
-        prices = daily_underlying_asset_prices / daily_underlying_asset_prices[0] * self.initial_price
-        knocked_out = any(prices[ko_ob_days] > ko_barriers)
-        if knocked_out:
-            ko_index = argmax(prices[ko_ob_days] > ko_barriers)
-            return self.ko_ob_dates[ko_index], rebates[ko_index]
-        knocked_in = any(prices[ki_ob_days] < ki_barriers)
-        if knocked_in:
-            return self.maturity_date, self.ki_payoff(prices[n_days])
-        else:
-            return self.maturity_date, rebates[-1]
+        n_days = self.ob_days_out[-1]
+        res = self.backtest_windows(daily_underlying_asset_prices[:n_days + 1])
+        if res['knocked_out'][0]:
+            ko_index = np.searchsorted(self.ob_days_out, res['holding_days'][0])
+            return self.ko_ob_dates[ko_index], res['payout'][0]
+        return self.maturity_date, res['payout'][0]
+
+    def _payment_days(self):
+        return self.ob_days_out
+
+    def _window_cash_flows(self, levels):
+        ko_days = np.asarray(self.ob_days_out)
+        n_days = ko_days[-1]
+        ko_hit = levels(ko_days) >= self.ko_barriers
+        knocked_out = ko_hit.any(axis=1)
+        ko_index = ko_hit.argmax(axis=1)
+        knocked_in = np.any(
+            levels(self.ob_days_in) <= self.ki_barriers, axis=1
+        ) & ~knocked_out
+
+        final = levels([n_days])[:, 0]
+        cash_flows = np.zeros((len(final), len(ko_days)))
+        rows = np.arange(len(final))
+        # knock-out rebates on knock-out days, or payoffs at maturity
+        cash_flows[rows, np.where(knocked_out, ko_index, -1)] = np.where(
+            knocked_out,
+            np.asarray(self.ko_rebate)[ko_index],
+            np.where(knocked_in, self.ki_payoff(final), self.nk_payoff(final))
+        )
+        holding_days = np.where(knocked_out, ko_days[ko_index], n_days)
+        return cash_flows, holding_days, dict(knocked_out=knocked_out,
+                                              knocked_in=knocked_in)
+
+
+class _WorstOfProd:
+    """Mixin turning a single-asset product into a worst-of product on
+    several assets.
+
+    *initial_price* of the product becomes a reference level, e.g., 100, in
+    which barriers are expressed, and *initial_prices* are the prices of the
+    assets on the start date. Products are valued given the spot prices of
+    all assets, and backtested on the prices of all assets, of shape
+    *(days, assets)*."""
+
+    _backtest_reduction = 'worst'
+
+    def __init__(self, initial_prices, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initial_prices = np.asarray(initial_prices, dtype=float).ravel()
+        self._inputs['initial_prices'] = initial_prices
+        self._spot_at_start = self.initial_prices
+
+    def to_structure(self, valuation_date, spots, ki_flag):
+        """Return the structure used to value the product given the spot
+        prices of all assets."""
+        spots = np.asarray(spots, dtype=float).ravel()
+        if spots.shape != self.initial_prices.shape:
+            raise ValueError(
+                "Expected %d spot prices, got %d"
+                % (len(self.initial_prices), len(spots))
+            )
+        obj = super().to_structure(valuation_date, self.initial_price, ki_flag)
+        obj.performances = spots / self.initial_prices
+        return obj
+
+    def scenario_grid(self, *args, **kwargs):
+        raise TypeError(
+            "Scenarios of a single spot price do not apply to %s"
+            % self.__class__.__name__
+        )
+
 
+class WorstOfSnowballProd(_WorstOfProd, SnowballProd):
+    """A snowball structure on the worst performance of several assets.
 
-class SingleBarrierOption:
+    Parameters
+    ----------
+    initial_prices : array_like
+        Prices of the underlying assets on *start_date*.
+    args, kwargs :
+        Parameters of :class:`SnowballProd`. *initial_price* is the
+        reference level of barriers and the notional principal, e.g., 100.
+
+    Examples
+    --------
+    Barriers at 103% and 70% of initial prices are ``ko_barriers=103`` and
+    ``ki_barriers=70`` with ``initial_price=100``. The product is valued
+    with ``option.value(date, [spot_1, spot_2], False, mc, process)`` where
+    *process* is a :class:`~pyoptmc.model.multi_asset.MultiAssetBlackScholes`.
+    """
+    _structure_nki = structures.WorstOfUpOutDownIn
+    _structure_ki = structures.WorstOfUpOut
+
+
+class WorstOfPhoenixProd(_WorstOfProd, PhoenixProd):
+    """A phoenix structure on the worst performance of several assets.
+
+    Parameters
+    ----------
+    initial_prices : array_like
+        Prices of the underlying assets on *start_date*.
+    args, kwargs :
+        Parameters of :class:`PhoenixProd`. *initial_price* is the
+        reference level of barriers and the notional principal, e.g., 100.
+    """
+    _structure = structures.WorstOfPhoenix
+
+
+class SingleBarrierOption(_Backtest):
+    """Single-barrier options. Intended to be subclassed not used.
+
+    Backtests use prices as they are, since barriers and payoffs are given
+    in levels of the price of the underlying asset."""
     _structure = structures.SingleBarrierOption
     _out = True
+    _up = True
 
     def __init__(self, start, barrier, rebate, ob_dates, payoff, calendar):
         self.calendar = _check_calendar(calendar)
@@ -433,9 +841,14 @@ class SingleBarrierOption:
 
     def to_structure(self, valuation_date=None, spot=None):
         td = self.calendar.num_trading_days_between(self.start, valuation_date)
-        ob_days, rebate, barrier = _update_day_arr(
-            valuation_date, td, self.rebate, self.barrier
-        )
+        if self._out:
+            ob_days, rebate, barrier = _update_day_arr(
+                self.ob_days, td, self.rebate, self.barrier
+            )
+        else:
+            # the rebate of knock-in options is a scalar
+            ob_days, barrier = _update_day_arr(self.ob_days, td, self.barrier)
+            rebate = self.rebate
         return self.__class__._structure(
             spot=spot, barrier=barrier, rebate=rebate,
             ob_days=ob_days, payoff=-self.payoff
@@ -445,6 +858,31 @@ class SingleBarrierOption:
         return self.to_structure(valuation_date, spot
                                  ).calc_value(*args, **kwargs)
 
+    def _payment_days(self):
+        return self.ob_days if self._out else self.ob_days[-1:]
+
+    def _window_cash_flows(self, levels):
+        ob_days = np.asarray(self.ob_days)
+        observed = levels(ob_days)
+        hit = observed >= self.barrier if self._up else \
+            observed <= self.barrier
+        touched = hit.any(axis=1)
+        final = observed[:, -1]
+        # the payoff is that of the structure valued by *value*
+        payoff = -self.payoff(final)
+        if not self._out:
+            cash_flows = np.where(touched, payoff, self.rebate)[:, None]
+            holding_days = np.full(len(final), ob_days[-1])
+            return cash_flows, holding_days, dict(knocked_in=touched)
+        hit_index = hit.argmax(axis=1)
+        cash_flows = np.zeros((len(final), len(ob_days)))
+        rows = np.arange(len(final))
+        cash_flows[rows, np.where(touched, hit_index, -1)] = np.where(
+            touched, np.asarray(self.rebate)[hit_index], payoff
+        )
+        holding_days = np.where(touched, ob_days[hit_index], ob_days[-1])
+        return cash_flows, holding_days, dict(knocked_out=touched)
+
 
 class UpOut(SingleBarrierOption):
     _structure = structures.UpOut
@@ -452,6 +890,7 @@ class UpOut(SingleBarrierOption):
 
 class DownOut(SingleBarrierOption):
     _structure = structures.DownOut
+    _up = False
 
 
 class UpIn(SingleBarrierOption):
@@ -462,6 +901,7 @@ class UpIn(SingleBarrierOption):
 class DownIn(SingleBarrierOption):
     _structure = structures.DownIn
     _out = False
+    _up = False
 
 
 if __name__ == "__main__":
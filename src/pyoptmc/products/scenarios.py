@@ -0,0 +1,74 @@
+"""
+This module implements a labelled array of values over a grid of scenarios,
+e.g., present values of a product over valuation dates, spot prices and
+volatility shifts.
+"""
+import numpy as np
+
+
+__all__ = ['ScenarioCube']
+
+
+class ScenarioCube:
+    def __init__(self, values, coords):
+        """An array of values labelled along each dimension, in the manner of
+        *xarray.DataArray*.
+
+        Parameters
+        ----------
+        values : array_like
+            The values, with one dimension per item of *coords*.
+        coords : dict
+            Labels of each dimension, keyed by the name of the dimension, in
+            the order of the dimensions of *values*.
+        """
+        values = np.asarray(values)
+        self.dims = tuple(coords)
+        self.coords = {dim: list(labels) for dim, labels in coords.items()}
+        shape = tuple(len(labels) for labels in self.coords.values())
+        if values.shape != shape:
+            raise ValueError(
+                "The shape of values, %s, does not match the coordinates, %s"
+                % (values.shape, shape)
+            )
+        self.values = values
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __repr__(self):
+        dims = ", ".join("%s: %d" % (dim, len(self.coords[dim]))
+                         for dim in self.dims)
+        return "ScenarioCube(%s)" % dims
+
+    def _index(self, dim, label):
+        try:
+            return self.coords[dim].index(label)
+        except ValueError:
+            raise KeyError("%s is not a label of %s" % (label, dim)) from None
+
+    def sel(self, **labels):
+        """Select values by labels, e.g., ``cube.sel(spot=100)``.
+
+        Returns
+        -------
+        ScenarioCube or scalar
+            The values along dimensions not selected, or a scalar if all
+            dimensions are selected."""
+        for dim in labels:
+            if dim not in self.coords:
+                raise KeyError("%s is not a dimension" % dim)
+        idx = tuple(self._index(dim, labels[dim]) if dim in labels
+                    else slice(None) for dim in self.dims)
+        values = self.values[idx]
+        coords = {dim: self.coords[dim] for dim in self.dims
+                  if dim not in labels}
+        if not coords:
+            return values
+        return ScenarioCube(values, coords)
+
+    def to_xarray(self):
+        """Return the values as an *xarray.DataArray*. Requires *xarray*."""
+        import xarray as xr
+        return xr.DataArray(self.values, coords=self.coords, dims=self.dims)
@@ -1,2 +1,6 @@
 from pyoptmc.structures.barrier_options import *
 from pyoptmc.structures.autocalls import *
+from pyoptmc.structures.worst_of import *
+from pyoptmc.structures.asian import *
+from pyoptmc.structures.early_exercise import *
+from pyoptmc.structures.bundle import *
@@ -69,6 +69,23 @@ _pv_log_paths_docs = """Calculate the present value given a set of paths
     scalar
         The present value of the option."""
 
+###
+_pv_paths_docs = """Calculate the present value of each path given a set of
+    paths and an array of discount factor.
+
+    Parameters
+    ----------
+    log_paths : array_like
+        A 2-D array containing the set of projections of the
+        price of the underlying asset.
+    df : array_like
+        A 1-D array specifying the discount factors.
+
+    Returns
+    -------
+    ndarray
+        The present values of the option on each path."""
+
 ###
 _spot_docs = """The spot price of the underlying asset.
 """
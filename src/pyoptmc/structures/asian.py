@@ -1,14 +1,239 @@
+"""
+This module implements Monte Carlo valuation of Asian options, which include
+
+* Fixed-strike Asian options
+* Floating-strike Asian options
+
+Prices are averaged arithmetically or geometrically over the observation
+days. Averages of simulated paths are accumulated row by row by a compiled
+kernel, so no array of prices of the size of the paths is created.
+"""
+import math
+import numba as nb
 import numpy as np
+from scipy.stats import norm
+from pyoptmc.tools.payoffs import plain_vanilla
 from pyoptmc.structures.base import StructureMC
+from pyoptmc.model.market_process import BlackScholes
+from pyoptmc.structures._docs import _pv_log_paths_docs
+from pyoptmc._decorators import DocstringWriter
+
+
+__all__ = ['FixedStrike', 'FloatingStrike']
+
+_avgfuncs = ('arithmetic', 'geometric')
+
+
+@nb.njit(parallel=True, cache=True)
+def _running_averages(log_paths):
+    """Return the arithmetic and the geometric averages of the exponential
+    of each row of *log_paths*, and the exponential of its last element."""
+    n, m = log_paths.shape
+    arithmetic = np.empty(n)
+    geometric = np.empty(n)
+    last = np.empty(n)
+    for i in nb.prange(n):
+        s_exp = 0.0
+        s_log = 0.0
+        for j in range(m):
+            x = log_paths[i, j]
+            s_exp += math.exp(x)
+            s_log += x
+        arithmetic[i] = s_exp / m
+        geometric[i] = math.exp(s_log / m)
+        last[i] = math.exp(log_paths[i, m - 1])
+    return arithmetic, geometric, last
+
+
+def _check_asian_args(ob_days, option_type, avgfunc):
+    if len(ob_days) == 0:
+        raise ValueError("At least one observation day is required.")
+    if option_type not in ('call', 'put'):
+        raise ValueError(
+            "Option type should be 'call' or 'put', got %s" % option_type
+        )
+    if avgfunc not in _avgfuncs:
+        raise ValueError(
+            "avgfunc should be one of %s, got %s" % (_avgfuncs, avgfunc)
+        )
+
+
+def geometric_asian_price(spot, strike, ob_days, bs, option_type='call'):
+    """Price a fixed-strike Asian option on the geometric average of prices
+    observed on *ob_days* under a Black-Scholes process. The option is paid
+    on the last observation day.
+
+    Parameters
+    ----------
+    spot : scalar
+        The spot price of the underlying asset.
+    strike : scalar
+        The strike of the option.
+    ob_days : array_like
+        Observation days.
+    bs : BlackScholes
+        The market process.
+    option_type : str
+        "put" or "call".
+
+    Returns
+    -------
+    float
+        The price of the option."""
+    t = np.asarray(ob_days, dtype=float)
+    n = len(t)
+    # bs holds parameters per day
+    mu = bs.r - bs.q - 0.5 * bs.v * bs.v
+    mean = math.log(spot) + mu * t.mean()
+    # sum of min(t_i, t_j) over all pairs of sorted days
+    t = np.sort(t)
+    var = bs.v * bs.v * np.sum(t * (2 * (n - np.arange(n)) - 1)) / (n * n)
+    std = math.sqrt(var)
+    df = math.exp(-bs.r * t[-1])
+    if std == 0:
+        return df * plain_vanilla(math.exp(mean), strike, option_type)
+    d2 = (mean - math.log(strike)) / std
+    d1 = d2 + std
+    forward = math.exp(mean + 0.5 * var)
+    if option_type == 'call':
+        return df * (forward * norm.cdf(d1) - strike * norm.cdf(d2))
+    return df * (strike * norm.cdf(-d2) - forward * norm.cdf(-d1))
 
 
 class FixedStrike(StructureMC):
-    def __init__(self, spot, ob_days, payoff, avgfunc):
+    def __init__(self, spot, strike, ob_days, option_type='call',
+                 avgfunc='arithmetic', control_variate=None):
+        """A fixed-strike Asian option, paying the difference between the
+        average price of the underlying asset over *ob_days* and *strike*
+        on the last observation day.
+
+        Parameters
+        ----------
+        spot : scalar
+            The spot (i.e. on the valuation day) of the price of the underlying asset.
+        strike : scalar
+            The strike of the option.
+        ob_days : array_like
+            A 1-D array of integers specifying observation days. Each of its elements
+            represents the number of days that an observation day is from the valuation
+            day.
+        option_type : str
+            "put" or "call".
+        avgfunc : str
+            "arithmetic" or "geometric".
+        control_variate : BlackScholes
+            If given and *avgfunc* is "arithmetic", the geometric Asian
+            option, whose price under *control_variate* is known in closed
+            form, is used as a control variate with a coefficient estimated
+            from each batch. Engines raise ValueError unless they are given
+            a Black-Scholes process with the same parameters.
+
+        Note
+        ----
+        The control variate is only valid for the present value. Greeks and
+        scenarios are computed on shifted paths whose geometric price
+        differs from the closed form, so engines raise ValueError if they
+        are requested with a control variate.
+
+        The signature was ``(spot, ob_days, payoff, avgfunc)`` before the
+        option was implemented. The payoff is now given by *strike* and
+        *option_type*.
+        """
+        _check_asian_args(ob_days, option_type, avgfunc)
         self._spot = spot
+        self.strike = strike
         self.ob_days = ob_days
+        self.option_type = option_type
+        self.avgfunc = avgfunc
+        self.control_variate = control_variate
         self._sim_t_array = np.append([0], ob_days)
-        self.payoff = payoff
+        self._geometric_price = None
+        if control_variate is not None and avgfunc == 'arithmetic':
+            self._geometric_price = geometric_asian_price(
+                spot, strike, ob_days, control_variate, option_type
+            )
+
+    def _set_spot(self, val):
+        if val <= 0:
+            raise ValueError("Spot price should be positive.")
+        self._spot = val
+        if self._geometric_price is not None:
+            self._geometric_price = geometric_asian_price(
+                val, self.strike, self.ob_days, self.control_variate,
+                self.option_type
+            )
+
+    def check_process(self, process, shifted=False):
+        """Raise ValueError if the control variate is used on paths which are
+        shifted, or not simulated under :attr:`control_variate`."""
+        if self._geometric_price is None:
+            return
+        if shifted:
+            raise ValueError(
+                "The control variate is only valid for the present value; "
+                "calculate Greeks and scenarios without it"
+            )
+        cv = self.control_variate
+        if not (type(process) is BlackScholes and
+                (process.r, process.q, process.v, process.day_counter) ==
+                (cv.r, cv.q, cv.v, cv.day_counter)):
+            raise ValueError(
+                "The control variate requires paths simulated under a "
+                "Black-Scholes process with its parameters, got a different "
+                "%s" % process.__class__.__name__
+            )
+
+    @DocstringWriter(_pv_log_paths_docs)
+    def pv_log_paths(self, log_paths, df):
+        arithmetic, geometric, _ = _running_averages(log_paths)
+        average = arithmetic if self.avgfunc == 'arithmetic' else geometric
+        pv = plain_vanilla(average * self.spot, self.strike,
+                           self.option_type) * df[-1]
+        if self._geometric_price is None:
+            return pv.mean()
+        pv_geometric = plain_vanilla(geometric * self.spot, self.strike,
+                                     self.option_type) * df[-1]
+        cov = np.cov(pv, pv_geometric)
+        beta = cov[0, 1] / cov[1, 1] if cov[1, 1] > 0 else 0.0
+        return pv.mean() - beta * (pv_geometric.mean() - self._geometric_price)
+
+
+class FloatingStrike(StructureMC):
+    def __init__(self, spot, ob_days, option_type='call',
+                 avgfunc='arithmetic'):
+        """A floating-strike Asian option, paying the difference between the
+        price of the underlying asset on the last observation day and its
+        average price over *ob_days*.
+
+        Parameters
+        ----------
+        spot : scalar
+            The spot (i.e. on the valuation day) of the price of the underlying asset.
+        ob_days : array_like
+            A 1-D array of integers specifying observation days. Each of its elements
+            represents the number of days that an observation day is from the valuation
+            day.
+        option_type : str
+            "put" or "call".
+        avgfunc : str
+            "arithmetic" or "geometric".
+        """
+        _check_asian_args(ob_days, option_type, avgfunc)
+        self._spot = spot
+        self.ob_days = ob_days
+        self.option_type = option_type
         self.avgfunc = avgfunc
+        self._sim_t_array = np.append([0], ob_days)
+
+    def _set_spot(self, val):
+        if val <= 0:
+            raise ValueError("Spot price should be positive.")
+        self._spot = val
 
+    @DocstringWriter(_pv_log_paths_docs)
     def pv_log_paths(self, log_paths, df):
-        pass
\ No newline at end of file
+        arithmetic, geometric, last = _running_averages(log_paths)
+        average = arithmetic if self.avgfunc == 'arithmetic' else geometric
+        sign = 1.0 if self.option_type == 'call' else -1.0
+        payoff = np.maximum(sign * (last - average), 0) * self.spot
+        return payoff.mean() * df[-1]
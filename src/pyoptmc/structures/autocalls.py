@@ -27,7 +27,7 @@ from pyoptmc.tools.helper import (
 )
 from pyoptmc.tools.payoffs import plain_vanilla
 from pyoptmc.structures.base import StructureMC
-from pyoptmc.structures._docs import _pv_log_paths_docs
+from pyoptmc.structures._docs import _pv_log_paths_docs, _pv_paths_docs
 from pyoptmc._decorators import DocstringWriter
 
 __all__ = ['StandardPhoenix', 'StandardSnowball', 'UpOutDownIn', 'StandardPhoenix']
@@ -73,9 +73,14 @@ class StandardPhoenix(StructureMC):
             raise ValueError("Spot price should be positive.")
         self._spot = val
 
-        self.log_barrier_in = np.log(self.barrier_in / val)
+        if not self.is_knock_in:
+            self.log_barrier_in = np.log(self.barrier_in / val)
         self.log_barrier_out = np.log(self.barrier_out / val)
-        self.log_barrier_coupon = np.log(self.barrier_coupon / val)
+        if not self.settled_anytime:
+            self.log_barrier_coupon = np.log(self.barrier_coupon / val)
+
+    def knock_out_schedule(self):
+        return np.flatnonzero(self._idx_out), self.log_barrier_out
 
     @DocstringWriter(_pv_log_paths_docs)
     def pv_log_paths(self, log_paths, df):
@@ -157,29 +162,32 @@ class StandardSnowball(StructureMC):
         self.log_barrier_in = np.log(self.barrier_in / val)
         self.log_barrier_out = np.log(self.barrier_out / val)
 
-    @DocstringWriter(_pv_log_paths_docs)
-    def pv_log_paths(self, log_paths, df):
+    def knock_out_schedule(self):
+        return np.flatnonzero(self._idx_out), self.log_barrier_out
+
+    @DocstringWriter(_pv_paths_docs)
+    def pv_paths(self, log_paths, df):
         df_ko_obs = df[self._idx_out]
         _df = df[-1]
-        # find out KO time and indices of NKO paths
-        ko_t_idx, _, nko_idx = up_ko_t_and_surviving_paths(log_paths[:, self._idx_out],
-                                                           self.log_barrier_out,
-                                                           return_idx=True)
-        # vector of present value of KO paths
-        pv_out = self.ko_coupon[ko_t_idx] * df_ko_obs[ko_t_idx]
-        # NKO paths
-        paths_nko = log_paths[nko_idx]
-        # KI paths
-        ki_paths = down_ki_paths(paths_nko[:, self._idx_in], self.log_barrier_in,
-                                 return_idx=False)
-        # vector of present value of KO paths
-        pv_in = -plain_vanilla(
-            np.exp(ki_paths[:, -1]) * self.spot, self._strike, option_type='put'
+        # find out KO time and indices of KO and NKO paths
+        ko_t_idx, ko_idx, nko_idx = up_ko_t_and_surviving_paths(
+            log_paths[:, self._idx_out], self.log_barrier_out, return_idx=True
+        )
+        # KI paths among NKO paths
+        ki_idx = down_ki_paths(log_paths[:, self._idx_in], self.log_barrier_in,
+                               return_idx=True) & nko_idx
+        # paths neither KO nor KI receive the full coupon
+        pv = np.full(len(log_paths), self.full_coupon * _df)
+        pv[ko_idx] = self.ko_coupon[ko_t_idx] * df_ko_obs[ko_t_idx]
+        pv[ki_idx] = -plain_vanilla(
+            np.exp(log_paths[ki_idx, -1]) * self.spot, self._strike,
+            option_type='put'
         ) * _df
-        # present value of paths NKI and NKO
-        # this is a scalar
-        pv_full_c = (len(log_paths) - len(pv_out) - len(pv_in)) * self.full_coupon * _df
-        return (pv_out.sum() + pv_in.sum() + pv_full_c) / len(log_paths)
+        return pv
+
+    @DocstringWriter(_pv_log_paths_docs)
+    def pv_log_paths(self, log_paths, df):
+        return self.pv_paths(log_paths, df).mean()
 
 
 class UpOutDownIn(StructureMC):
@@ -249,28 +257,36 @@ class UpOutDownIn(StructureMC):
         self.log_barrier_out = np.log(self.upper_barrier_out / self.spot)
         self.log_barrier_in = np.log(self.lower_barrier_in / self.spot)
 
-    @DocstringWriter(_pv_log_paths_docs)
-    def pv_log_paths(self, log_paths, df):
+    def knock_out_schedule(self):
+        # The upper barrier dominates, so a knocked-out path is settled
+        # regardless of what happens afterwards
+        return np.flatnonzero(self._idx_out), self.log_barrier_out
+
+    @DocstringWriter(_pv_paths_docs)
+    def pv_paths(self, log_paths, df):
         df_ko_ob = df[self._idx_out]
         df_terminal = df[-1]
-        # Identify ko paths: ko time idx and nko path idx
-        ko_t_idx, _, nko_paths_idx = up_ko_t_and_surviving_paths(
+        # Identify ko paths: ko time idx, ko and nko path idx
+        ko_t_idx, ko_paths_idx, nko_paths_idx = up_ko_t_and_surviving_paths(
             paths=log_paths[:, self._idx_out], barrier=self.log_barrier_out,
             return_idx=True)
-        # nko paths
-        nko_paths = log_paths[nko_paths_idx]
-        # Identify ki paths from nko paths
-        ki_paths_idx = down_ki_paths(paths=nko_paths[:, self._idx_in],
-                                     barrier=self.log_barrier_in, return_idx=True)
-        # ki paths and nk paths
-        ki_paths = nko_paths[ki_paths_idx]
-        nk_paths = nko_paths[np.logical_not(ki_paths_idx)]
+        # Identify ki paths from nko paths, the rest are nk paths
+        ki_paths_idx = down_ki_paths(paths=log_paths[:, self._idx_in],
+                                     barrier=self.log_barrier_in,
+                                     return_idx=True) & nko_paths_idx
+        nk_paths_idx = nko_paths_idx & np.logical_not(ki_paths_idx)
         # PV of payoff from three sets of paths
-        pv_out = self.rebate_out[ko_t_idx] * df_ko_ob[ko_t_idx]
-        pv_in = self.payoff_in(np.exp(ki_paths[:, -1]) * self.spot) * df_terminal
-        pv_nk = self.payoff_nk(np.exp(nk_paths[:, -1]) * self.spot) * df_terminal
-        # Average three PVs
-        return (pv_out.sum() + pv_in.sum() + pv_nk.sum()) / len(log_paths)
+        pv = np.empty(len(log_paths))
+        pv[ko_paths_idx] = self.rebate_out[ko_t_idx] * df_ko_ob[ko_t_idx]
+        pv[ki_paths_idx] = self.payoff_in(
+            np.exp(log_paths[ki_paths_idx, -1]) * self.spot) * df_terminal
+        pv[nk_paths_idx] = self.payoff_nk(
+            np.exp(log_paths[nk_paths_idx, -1]) * self.spot) * df_terminal
+        return pv
+
+    @DocstringWriter(_pv_log_paths_docs)
+    def pv_log_paths(self, log_paths, df):
+        return self.pv_paths(log_paths, df).mean()
 
 
 if __name__ == "__main__":
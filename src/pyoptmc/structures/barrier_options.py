@@ -38,6 +38,7 @@ from pyoptmc.structures._docs import (
     _single_barrier_out_param_docs,
     _single_barrier_in_param_docs,
     _pv_log_paths_docs,
+    _pv_paths_docs,
     _payoff_docs,
 )
 from pyoptmc._decorators import DocstringWriter
@@ -132,23 +133,23 @@ class UpOut(SingleBarrierOption):
         
     """ % {'param_docs': _single_barrier_out_param_docs}
 
-    @DocstringWriter(_pv_log_paths_docs)
-    def pv_log_paths(self, log_paths, df):
+    def knock_out_schedule(self):
+        return np.arange(len(self.ob_days)), self.log_barrier
 
-        ko_t, _, nko_paths = up_ko_t_and_surviving_paths(
-            log_paths, self.log_barrier, return_idx=False
+    @DocstringWriter(_pv_paths_docs)
+    def pv_paths(self, log_paths, df):
+        ko_t, ko_idx, nko_idx = up_ko_t_and_surviving_paths(
+            log_paths, self.log_barrier, return_idx=True
         )
-        terminal = nko_paths[:, -1]
-        surviving = self.payoff(np.exp(terminal)*self.spot) * df[-1]
-        knocked_out = self.rebate[ko_t] * df[ko_t]
-        pv_terminal = pv_knocked_out = 0
+        pv = np.empty(len(log_paths))
+        pv[ko_idx] = self.rebate[ko_t] * df[ko_t]
+        pv[nko_idx] = self.payoff(
+            np.exp(log_paths[nko_idx, -1]) * self.spot) * df[-1]
+        return pv
 
-        if surviving.size > 0:
-            pv_terminal = np.sum(surviving)
-        if knocked_out.size > 0:
-            pv_knocked_out = np.sum(knocked_out)
-
-        return (pv_terminal + pv_knocked_out) / len(log_paths)
+    @DocstringWriter(_pv_log_paths_docs)
+    def pv_log_paths(self, log_paths, df):
+        return self.pv_paths(log_paths, df).mean()
 
 
 class DownOut(SingleBarrierOption):
@@ -184,22 +185,20 @@ class DownOut(SingleBarrierOption):
         
     """ % {'param_docs': _single_barrier_out_param_docs}
 
-    @DocstringWriter(_pv_log_paths_docs)
-    def pv_log_paths(self, log_paths, df):
-        ko_t, _, nko_paths = down_ko_t_and_surviving_paths(
-            log_paths, self.log_barrier, return_idx=False
+    @DocstringWriter(_pv_paths_docs)
+    def pv_paths(self, log_paths, df):
+        ko_t, ko_idx, nko_idx = down_ko_t_and_surviving_paths(
+            log_paths, self.log_barrier, return_idx=True
         )
-        terminal = nko_paths[:, -1]
-        surviving = self.payoff(np.exp(terminal)*self.spot) * df[-1]
-        knocked_out = self.rebate[ko_t] * df[ko_t]
-        pv_terminal = pv_knocked_out = 0
+        pv = np.empty(len(log_paths))
+        pv[ko_idx] = self.rebate[ko_t] * df[ko_t]
+        pv[nko_idx] = self.payoff(
+            np.exp(log_paths[nko_idx, -1]) * self.spot) * df[-1]
+        return pv
 
-        if surviving.size > 0:
-            pv_terminal = np.sum(surviving)
-        if knocked_out.size > 0:
-            pv_knocked_out = np.sum(knocked_out)
-
-        return (pv_terminal + pv_knocked_out) / len(log_paths)
+    @DocstringWriter(_pv_log_paths_docs)
+    def pv_log_paths(self, log_paths, df):
+        return self.pv_paths(log_paths, df).mean()
 
 
 class DownIn(SingleBarrierOption):
@@ -234,19 +233,17 @@ class DownIn(SingleBarrierOption):
         
     """ % {'param_docs': _single_barrier_in_param_docs}
 
+    @DocstringWriter(_pv_paths_docs)
+    def pv_paths(self, log_paths, df):
+        ki_idx = down_ki_paths(log_paths, self.log_barrier, True)
+        pv = np.full(len(log_paths), self.rebate * df[-1])
+        pv[ki_idx] = self.payoff(
+            np.exp(log_paths[ki_idx, -1]) * self.spot) * df[-1]
+        return pv
+
     @DocstringWriter(_pv_log_paths_docs)
     def pv_log_paths(self, log_paths, df):
-        ki_paths = down_ki_paths(log_paths, self.log_barrier, False)
-        terminal = ki_paths[:, -1]
-        num_in = len(terminal)
-        num_voided = len(log_paths) - num_in
-        in_payoff = self.payoff(np.exp(terminal) * self.spot) * df[-1]
-        pv_in = 0
-
-        if in_payoff.size > 0:
-            pv_in = np.sum(in_payoff)
-
-        return (pv_in + self.rebate * num_voided * df[-1]) / len(log_paths)
+        return self.pv_paths(log_paths, df).mean()
 
 
 class UpIn(SingleBarrierOption):
@@ -281,17 +278,17 @@ class UpIn(SingleBarrierOption):
         
     """ % {'param_docs': _single_barrier_in_param_docs}
 
+    @DocstringWriter(_pv_paths_docs)
+    def pv_paths(self, log_paths, df):
+        ki_idx = up_ki_paths(log_paths, self.log_barrier, True)
+        pv = np.full(len(log_paths), self.rebate * df[-1])
+        pv[ki_idx] = self.payoff(
+            np.exp(log_paths[ki_idx, -1]) * self.spot) * df[-1]
+        return pv
+
     @DocstringWriter(_pv_log_paths_docs)
     def pv_log_paths(self, log_paths, df):
-        ki_paths = up_ki_paths(log_paths, self.log_barrier, False)
-        terminal = ki_paths[:, -1]
-        num_in = len(terminal)
-        num_voided = len(log_paths) - num_in
-        in_payoff = self.payoff(np.exp(terminal) * self.spot) * df[-1]
-        pv_in = 0
-        if in_payoff.size > 0:
-            pv_in = np.sum(in_payoff)
-        return (pv_in + self.rebate * num_voided * df[-1]) / len(log_paths)
+        return self.pv_paths(log_paths, df).mean()
 
 
 class DoubleBarrierOption(StructureMC):
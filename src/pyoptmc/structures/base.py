@@ -32,9 +32,35 @@ class StructureMC(OptionABC):
     def pv_log_paths(self, log_paths, df):
         pass
 
+    def pv_paths(self, log_paths, df):
+        """Return the present value of each path, whose mean is
+        :meth:`pv_log_paths`. Structures implementing it can be valued with
+        weighted paths, e.g., under importance sampling."""
+        raise NotImplementedError(
+            "%s does not value paths individually" % self.__class__.__name__
+        )
+
     def calc_single_batch(self, engine, process, *args, **kwargs):
         return engine.single_iter_caller(self, process, *args, **kwargs)
 
+    def knock_out_schedule(self):
+        """Return the upward knock-out schedule of the structure, or None.
+
+        The schedule is a tuple *(positions, log_barriers)*, where *positions*
+        are indices into ``sim_t_array[1:]`` on which a path is knocked out if
+        its log return is greater than or equal to the matching element of
+        *log_barriers*. Structures returning a schedule promise that the value
+        of a path knocked out at a position does not depend on the rest of the
+        path, so knocked-out paths may be retired from the simulation."""
+        return None
+
+    def check_process(self, process, shifted=False):
+        """Raise ValueError if the structure cannot be valued on paths of
+        *process*, which is None if unknown, e.g., for stored paths.
+        *shifted* tells that the paths are shifted from those of *process*,
+        e.g., for Greeks or scenarios. Engines call it before simulation."""
+        pass
+
     def _set_spot(self, val):
         pass
 
@@ -44,6 +70,10 @@ class StructureMC(OptionABC):
 
 
 class ProcessCoordinator(ABC):
+    #: Names of model parameters whose sensitivities are returned by
+    #: :meth:`shift` under the keys ``'<name> plus'`` and ``'<name> minus'``
+    model_greeks = ()
+
     @abstractmethod
     def generate_eps(self, seed, batch_size):
         pass
@@ -55,3 +85,58 @@ class ProcessCoordinator(ABC):
     @abstractmethod
     def shift(self, paths, ds, dr, dv, eps):
         pass
+
+    def initial_state(self, batch_size):
+        """Return the state of *batch_size* paths at the valuation day. The
+        first axis of the state must run over paths."""
+        raise NotImplementedError(
+            "%s does not support sequential path generation"
+            % self.__class__.__name__
+        )
+
+    def evolve(self, rng, state, start, stop):
+        """Draw random numbers from *rng* and evolve *state* through points
+        *start* to *stop* (exclusive) of ``sim_t_array[1:]``. Return the log
+        paths of these points and the new state."""
+        raise NotImplementedError(
+            "%s does not support sequential path generation"
+            % self.__class__.__name__
+        )
+
+    def importance_sample(self, eps, drift):
+        """Shift *eps* from :meth:`generate_eps` such that the driving
+        Brownian motion gets an annual *drift*. Return the shifted *eps* and
+        the likelihood ratio of each path, by which its present value is
+        weighted."""
+        raise NotImplementedError(
+            "%s does not support importance sampling"
+            % self.__class__.__name__
+        )
+
+    def likelihood_ratio(self, eps, drift):
+        """Return the likelihood ratio of the original measure against the
+        one under which the Brownian motion has an annual *drift*, given
+        *eps* driving each path."""
+        raise NotImplementedError(
+            "%s does not support importance sampling"
+            % self.__class__.__name__
+        )
+
+    def stratify(self, eps, strata):
+        """Move the terminal value of the Brownian motion driven by each row
+        of *eps* into one of *strata* equiprobable strata, the *i*-th row
+        into stratum *i % strata*, and fill the rest of it by a Brownian
+        bridge. Return the stratified *eps*."""
+        raise NotImplementedError(
+            "%s does not support stratified sampling"
+            % self.__class__.__name__
+        )
+
+    def paths_given_vol_shift(self, eps, dv):
+        """Return the log paths driven by *eps* from :meth:`generate_eps`
+        with the annual volatility of the process shifted by *dv*, so that
+        scenarios of volatility are valued on common random numbers."""
+        raise NotImplementedError(
+            "%s does not support volatility scenarios"
+            % self.__class__.__name__
+        )
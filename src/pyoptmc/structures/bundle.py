@@ -0,0 +1,86 @@
+"""
+This module implements bundles of structures on the same underlying asset,
+valued on one set of paths.
+
+Valuing structures together shares the cost of simulation, and makes their
+values differ only by their terms, not by noise, which solvers rely on,
+e.g., when a value is linear in a coupon rate.
+"""
+import numpy as np
+from pyoptmc.structures.base import StructureMC
+
+
+__all__ = ['StructureBundle']
+
+
+class StructureBundle(StructureMC):
+    def __init__(self, structures):
+        """A bundle of structures whose present values are calculated on the
+        same paths. Its present value is the array of those of *structures*.
+
+        Paths are simulated on the union of the simulation days of
+        *structures*, and each structure values them on its own days.
+
+        Parameters
+        ----------
+        structures : sequence of StructureMC
+            Structures with the same spot price, and, under multi-asset
+            processes, the same ``path_reduction`` and ``log_spot_offsets``.
+        """
+        structures = list(structures)
+        if not structures:
+            raise ValueError("At least one structure is required.")
+        spots = [s.spot for s in structures]
+        if any(spot != spots[0] for spot in spots):
+            raise ValueError(
+                "Structures in a bundle must have the same spot price."
+            )
+        self.path_reduction = self._common(structures, 'path_reduction')
+        self.log_spot_offsets = self._common(structures, 'log_spot_offsets')
+        self.structures = structures
+        self._spot = spots[0]
+        t = np.unique(np.concatenate([s.sim_t_array for s in structures]))
+        self._sim_t_array = t
+        # positions of the simulation days of each structure
+        self._idx = [np.searchsorted(t[1:], s.sim_t_array[1:])
+                     for s in structures]
+
+    @staticmethod
+    def _common(structures, name):
+        first = getattr(structures[0], name, None)
+        for s in structures[1:]:
+            val = getattr(s, name, None)
+            if (val is None) != (first is None) or \
+                    (val is not None and not np.array_equal(val, first)):
+                raise ValueError(
+                    "Structures in a bundle must have the same %s." % name
+                )
+        return first
+
+    def _set_spot(self, val):
+        if val <= 0:
+            raise ValueError("Spot price should be positive.")
+        self._spot = val
+        for s in self.structures:
+            s._set_spot(val)
+
+    def check_process(self, process, shifted=False):
+        for s in self.structures:
+            s.check_process(process, shifted)
+
+    def pv_log_paths(self, log_paths, df):
+        """Return the present values of the structures given a set of paths
+        and an array of discount factors on the simulation days of the
+        bundle."""
+        return np.array([
+            s.pv_log_paths(log_paths[..., idx], df[idx])
+            for s, idx in zip(self.structures, self._idx)
+        ])
+
+    def pv_paths(self, log_paths, df):
+        """Return the present values of the structures on each path, of
+        shape *(paths, structures)*."""
+        return np.stack([
+            s.pv_paths(log_paths[..., idx], df[idx])
+            for s, idx in zip(self.structures, self._idx)
+        ], axis=-1)
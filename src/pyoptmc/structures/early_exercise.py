@@ -0,0 +1,160 @@
+"""
+This module implements structures with early exercise features, valued by
+least-squares Monte Carlo (:class:`~pyoptmc.engine.lsm.LeastSquaresMC`):
+
+* Bermudan options, exercised by the holder
+* Callable notes, called by the issuer
+
+Such a structure describes its cash flows and what is paid on exercise; the
+engine decides when to exercise.
+"""
+import numpy as np
+from abc import abstractmethod
+from pyoptmc.tools.payoffs import Payoff, plain_vanilla, constant_payoff
+from pyoptmc.tools.helper import arr_scalar_converter, merge_days
+from pyoptmc.structures.base import StructureMC
+
+
+__all__ = ['EarlyExerciseStructure', 'BermudanOption', 'CallableNote']
+
+
+class EarlyExerciseStructure(StructureMC):
+    """Structures with early exercise features. Intended to be subclassed
+    not used.
+
+    Subclasses set :attr:`exercise_positions` and implement
+    :meth:`cash_flows` and :meth:`exercise_values`. Cash flows on an exercise
+    day are paid whether or not the structure is exercised on that day; once
+    it is exercised, no further cash flow is paid."""
+
+    #: If True, the holder exercises to maximize the value of the structure.
+    #: Otherwise, the issuer exercises to minimize it.
+    holder_exercises = True
+
+    #: Indices into ``sim_t_array[1:]`` of exercise days.
+    exercise_positions = None
+
+    @abstractmethod
+    def cash_flows(self, log_paths):
+        """Return the amounts paid to the holder on each simulation day, of
+        shape *(batch, days)*, if the structure is alive."""
+
+    @abstractmethod
+    def exercise_values(self, log_paths):
+        """Return the amounts paid to the holder upon exercise on each
+        exercise day, of shape *(batch, exercise days)*."""
+
+    def pv_log_paths(self, log_paths, df):
+        raise TypeError(
+            "%s has early exercise features and must be valued by "
+            "LeastSquaresMC" % self.__class__.__name__
+        )
+
+
+class BermudanOption(EarlyExerciseStructure):
+    def __init__(self, spot, strike, ob_days, option_type='put'):
+        """A Bermudan option, which the holder may exercise on any of
+        *ob_days*.
+
+        Parameters
+        ----------
+        spot : scalar
+            The spot (i.e. on the valuation day) of the price of the underlying asset.
+        strike : scalar
+            The strike of the option.
+        ob_days : array_like
+            A 1-D array of integers specifying exercise days. Each of its elements
+            represents the number of days that an exercise day is from the valuation
+            day. The last one is the expiry.
+        option_type : str
+            "put" or "call".
+        """
+        if option_type not in ('call', 'put'):
+            raise ValueError(
+                "Option type should be 'call' or 'put', got %s" % option_type
+            )
+        self._spot = spot
+        self.strike = strike
+        self.ob_days = ob_days
+        self.option_type = option_type
+        self._sim_t_array = np.append([0], ob_days)
+        self.exercise_positions = np.arange(len(ob_days))
+
+    def cash_flows(self, log_paths):
+        return np.zeros(log_paths.shape)
+
+    def exercise_values(self, log_paths):
+        return plain_vanilla(
+            np.exp(log_paths[:, self.exercise_positions]) * self.spot,
+            self.strike, self.option_type
+        )
+
+
+class CallableNote(EarlyExerciseStructure):
+    holder_exercises = False
+
+    def __init__(self, spot, principal, coupon_days, coupons, call_days,
+                 call_price=None, redemption=None, coupon_barrier=None):
+        """A note paying coupons, which the issuer may redeem early on any
+        of *call_days*.
+
+        Parameters
+        ----------
+        spot : scalar
+            The spot (i.e. on the valuation day) of the price of the underlying asset.
+        principal : scalar
+            The notional principal.
+        coupon_days : array_like
+            A 1-D array of integers specifying coupon days. The last one is
+            the maturity.
+        coupons : scalar or array_like
+            Coupon amounts. If an array is passed, it must match the length
+            of *coupon_days*.
+        call_days : array_like
+            Days on which the issuer may call the note, after the coupon of
+            the day is paid.
+        call_price : scalar or array_like
+            Amount paid to the holder when the note is called. If None, the
+            principal.
+        redemption : Payoff
+            Amount paid at maturity as a function of the price of the
+            underlying asset. If None, the principal.
+        coupon_barrier : scalar
+            If given, a coupon is only paid if the price of the underlying
+            asset is at or above this level on its coupon day.
+        """
+        if max(call_days) > max(coupon_days):
+            raise ValueError("Call days must not be later than the maturity.")
+        if call_price is None:
+            call_price = principal
+        if redemption is None:
+            redemption = Payoff(constant_payoff, amount=principal)
+        self._spot = spot
+        self.principal = principal
+        self.coupon_days = coupon_days
+        self.coupons = arr_scalar_converter(coupons, coupon_days)
+        self.call_days = call_days
+        self.call_price = arr_scalar_converter(call_price, call_days)
+        self.redemption = redemption
+        self.coupon_barrier = coupon_barrier
+        _t, self._idx_coupon, self._idx_call = merge_days(coupon_days,
+                                                          call_days)
+        self._sim_t_array = np.append([0], _t)
+        self.exercise_positions = np.flatnonzero(self._idx_call)
+
+    def cash_flows(self, log_paths):
+        flows = np.zeros(log_paths.shape)
+        coupons = np.broadcast_to(self.coupons, (len(log_paths),
+                                                 len(self.coupons)))
+        if self.coupon_barrier is not None:
+            paid = np.exp(log_paths[:, self._idx_coupon]) * self.spot >= \
+                self.coupon_barrier
+            coupons = coupons * paid
+        flows[:, self._idx_coupon] = coupons
+        flows[:, -1] += self.redemption(np.exp(log_paths[:, -1]) * self.spot)
+        return flows
+
+    def exercise_values(self, log_paths):
+        return np.broadcast_to(
+            self.call_price, (len(log_paths), len(self.call_price))
+        )
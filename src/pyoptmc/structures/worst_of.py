@@ -0,0 +1,93 @@
+"""
+This module implements worst-of variants of barrier and autocall structures
+on several underlying assets:
+
+* Worst-of up-and-out option
+* Worst-of snowball structure (up-and-out and down-and-in)
+* Worst-of phoenix structure
+
+Knock-out, knock-in and coupon conditions of these structures are
+determined by the worst performance of all underlying assets. Barriers and
+the spot price are levels of a reference price, e.g., 100, such that a
+barrier of 103 is hit when the worst performing asset is at 103% of its
+initial price.
+
+They are meant to be valued under a multi-asset process like
+:class:`~pyoptmc.model.multi_asset.MultiAssetBlackScholes`, which reduces
+the paths of all assets to the worst performance as it simulates them.
+"""
+import numpy as np
+from pyoptmc.tools.helper import worst_of
+from pyoptmc.structures.barrier_options import UpOut
+from pyoptmc.structures.autocalls import UpOutDownIn, StandardPhoenix
+
+__all__ = ['WorstOfUpOut', 'WorstOfUpOutDownIn', 'WorstOfPhoenix']
+
+
+class _WorstOf:
+    """Mixin turning a single-asset structure into a worst-of structure.
+
+    *performances* are the current prices of the assets divided by their
+    initial prices. If None, all assets are at their initial prices."""
+
+    #: The multi-asset coordinator returns the worst performance of each path
+    path_reduction = 'worst'
+
+    def __init__(self, *args, performances=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.performances = performances
+
+    @property
+    def performances(self):
+        return self._performances
+
+    @performances.setter
+    def performances(self, val):
+        if val is not None:
+            val = np.asarray(val, dtype=float).ravel()
+            if np.any(val <= 0):
+                raise ValueError("Performances should be positive.")
+        self._performances = val
+
+    @property
+    def log_spot_offsets(self):
+        """Log performances of the assets, added to their simulated paths."""
+        if self._performances is None:
+            return None
+        return np.log(self._performances)
+
+    def pv_log_paths(self, log_paths, df):
+        # paths of every asset are reduced here if the process did not
+        if np.ndim(log_paths) == 3:
+            log_paths = worst_of(log_paths)
+        return super().pv_log_paths(log_paths, df)
+
+    def pv_paths(self, log_paths, df):
+        if np.ndim(log_paths) == 3:
+            log_paths = worst_of(log_paths)
+        return super().pv_paths(log_paths, df)
+
+
+class WorstOfUpOut(_WorstOf, UpOut):
+    """An up-and-out option on the worst performance of several assets.
+
+    Parameters are those of :class:`~pyoptmc.structures.UpOut`, with the
+    keyword *performances*, the current prices of the assets divided by
+    their initial prices."""
+
+
+class WorstOfUpOutDownIn(_WorstOf, UpOutDownIn):
+    """A worst-of snowball structure: an up-and-out and down-and-in
+    structure on the worst performance of several assets.
+
+    Parameters are those of :class:`~pyoptmc.structures.UpOutDownIn`, with
+    the keyword *performances*, the current prices of the assets divided by
+    their initial prices."""
+
+
+class WorstOfPhoenix(_WorstOf, StandardPhoenix):
+    """A worst-of phoenix structure on several assets.
+
+    Parameters are those of :class:`~pyoptmc.structures.StandardPhoenix`,
+    with the keyword *performances*, the current prices of the assets
+    divided by their initial prices."""
@@ -164,3 +164,18 @@ def fill_arr(arr, ob_days, all_days, val_with):
     # set the full array's elements to barrier
     filled[pos_ob_days] = arr
     return filled
+
+
+def worst_of(paths):
+    """Reduce multi-asset log paths of shape (batch, assets, time) to the
+    worst performance of each path at each time, of shape (batch, time),
+    so that single-asset barrier helpers can be applied to the result.
+    """
+    return np.min(paths, axis=1)
+
+
+def best_of(paths):
+    """Reduce multi-asset log paths of shape (batch, assets, time) to the
+    best performance of each path at each time, of shape (batch, time).
+    """
+    return np.max(paths, axis=1)
@@ -1 +1,6 @@
-# test raw api
\ No newline at end of file
+# test raw api
+
+
+def serial_caller(calc, seeds, **kwargs):
+    """Run Monte Carlo batches one after another in this process."""
+    return [calc(s) for s in seeds]
@@ -0,0 +1,62 @@
+import numpy as np
+import unittest
+from pyoptmc import *
+from pyoptmc.structures.asian import geometric_asian_price
+from tests.raw_api import serial_caller
+
+
+mc = MonteCarlo(5000, 20, caller=serial_caller)
+bs = BlackScholes(0.03, 0.01, 0.25, 252)
+ob_days = list(range(21, 253, 21))
+
+
+class TestFixedStrike(unittest.TestCase):
+    def test_geometric_closed_form(self):
+        for option_type in ('call', 'put'):
+            option = FixedStrike(100, 100, ob_days, option_type, 'geometric')
+            self.assertAlmostEqual(
+                mc.calc(option, bs, entropy=1),
+                geometric_asian_price(100, 100, ob_days, bs, option_type),
+                delta=0.1
+            )
+
+    def test_control_variate(self):
+        plain = FixedStrike(100, 95, ob_days)
+        controlled = FixedStrike(100, 95, ob_days, control_variate=bs)
+        pvs = [mc.calc(plain, bs, entropy=e) for e in range(5)]
+        pvs_cv = [mc.calc(controlled, bs, entropy=e) for e in range(5)]
+        self.assertAlmostEqual(np.mean(pvs), np.mean(pvs_cv), delta=0.1)
+        self.assertLess(np.std(pvs_cv), np.std(pvs) / 5)
+
+    def test_control_variate_process(self):
+        controlled = FixedStrike(100, 95, ob_days, control_variate=bs)
+        mc.calc(controlled, BlackScholes(0.03, 0.01, 0.25, 252), entropy=1)
+        # paths must be those of the closed form
+        with self.assertRaises(ValueError):
+            mc.calc(controlled, BlackScholes(0.03, 0.01, 0.3, 252))
+        with self.assertRaises(ValueError):
+            mc.calc(controlled, Heston(.03, .01, -.5, .0625, 1, .25, .0625,
+                                       252))
+        with self.assertRaises(ValueError):
+            mc.calc(controlled, bs, request_greeks=True)
+        with self.assertRaises(ValueError):
+            mc.calc_scenarios(controlled, bs, [90, 100])
+        mc.calc_scenarios(controlled, bs, [100], entropy=1)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            FixedStrike(100, 100, ob_days, avgfunc='harmonic')
+        with self.assertRaises(ValueError):
+            FloatingStrike(100, ob_days, option_type='straddle')
+
+
+class TestFloatingStrike(unittest.TestCase):
+    def test_parity(self):
+        call = mc.calc(FloatingStrike(100, ob_days, 'call'), bs, entropy=2)
+        put = mc.calc(FloatingStrike(100, ob_days, 'put'), bs, entropy=2)
+        t = np.array(ob_days) / 252
+        forward = 100 * np.exp(0.02 * t)
+        self.assertAlmostEqual(
+            call - put, np.exp(-0.03) * (forward[-1] - forward.mean()),
+            delta=0.15
+        )
@@ -0,0 +1,189 @@
+import datetime
+import os
+import pickle
+import tempfile
+import numpy as np
+import unittest
+from pyoptmc import Calendar, HolidaySet
+
+
+calendar = Calendar()
+start = datetime.date(2019, 1, 31)
+
+
+def trading_days_by_loop(start, end):
+    """Trading days from *start* to *end*, both included, day by day."""
+    days = []
+    date = start
+    while date <= end:
+        if date.weekday() < 5 and not calendar.holiday_rule(date):
+            days.append(date)
+        date += datetime.timedelta(days=1)
+    return days
+
+
+class TestCalendar(unittest.TestCase):
+    def test_trading_days(self):
+        end = datetime.date(2021, 3, 1)
+        expected = trading_days_by_loop(start, end)
+        self.assertEqual(calendar.trading_days_between(start, end), expected)
+        self.assertEqual(
+            calendar.trading_days_between(start, end, endpoints=False),
+            expected[1:-1]
+        )
+        self.assertEqual(calendar.num_trading_days_between(start, end),
+                         len(expected) - 1)
+        # Chinese New Year of 2019
+        self.assertFalse(calendar.is_trading(datetime.date(2019, 2, 5)))
+
+    def test_offset(self):
+        self.assertEqual(calendar.offset(start, 1), datetime.date(2019, 2, 1))
+        self.assertEqual(calendar.offset(datetime.date(2019, 2, 1), 1),
+                         datetime.date(2019, 2, 11))
+        self.assertEqual(calendar.offset(datetime.date(2019, 2, 11), -1),
+                         datetime.date(2019, 2, 1))
+        self.assertEqual(calendar.offset(datetime.date(2019, 2, 5), -2),
+                         start)
+        # across the years covered so far
+        far = calendar.offset(start, 2000)
+        self.assertEqual(calendar.num_trading_days_between(start, far), 2000)
+        self.assertEqual(calendar.offset(far, -2000), start)
+        with self.assertRaises(TypeError):
+            calendar.offset(start, 1.0)
+
+    def test_vectorized(self):
+        dates = trading_days_by_loop(start, datetime.date(2019, 12, 31))
+        np.testing.assert_array_equal(
+            calendar.to_scalar(dates, start), np.arange(len(dates))
+        )
+        arr = np.array(dates, dtype='datetime64[D]')
+        self.assertTrue(calendar.is_trading(arr).all())
+        self.assertFalse(calendar.is_trading(arr + 1)[
+            [d.weekday() == 4 for d in dates]].any())
+        np.testing.assert_array_equal(calendar.offset(arr[:-1], 1), arr[1:])
+        np.testing.assert_array_equal(calendar.offset(dates[1:], -1), arr[:-1])
+        self.assertEqual(calendar.to_scalar([], start), [])
+
+    def test_add_holidays(self):
+        cal = Calendar()
+        self.assertTrue(cal.is_trading(datetime.date(2019, 3, 1)))
+        cal.add_holidays([datetime.date(2019, 3, 1)])
+        self.assertFalse(cal.is_trading(datetime.date(2019, 3, 1)))
+        cal.add_holiday_rule(lambda d: d.month == 4 and d.day == 1)
+        self.assertFalse(cal.is_trading(datetime.date(2019, 4, 1)))
+        self.assertFalse(cal.is_trading(datetime.date(2019, 3, 1)))
+        self.assertEqual(cal.offset(datetime.date(2019, 2, 28), 1),
+                         datetime.date(2019, 3, 4))
+
+
+class TestPeriodic(unittest.TestCase):
+    def test_month_end(self):
+        dates = calendar.periodic(start, '1M', 13)
+        self.assertEqual(len(dates), 13)
+        # the day of the start, or the last day of shorter months, rolled to
+        # the next trading day
+        self.assertEqual(dates[1:4], [datetime.date(2019, 2, 28),
+                                      datetime.date(2019, 4, 1),
+                                      datetime.date(2019, 4, 30)])
+        self.assertTrue(calendar.is_trading(dates).all())
+        prev = calendar.periodic(start, '1M', 13, if_close="prev")
+        self.assertEqual(prev[2], datetime.date(2019, 3, 29))
+
+    def test_months_after_february(self):
+        # two months after the end of February 2016 are those of April and
+        # June, not their 29th
+        dates = calendar.periodic(datetime.date(2015, 8, 31), '2m', 6)
+        self.assertEqual(dates[3:], [datetime.date(2016, 2, 29),
+                                     datetime.date(2016, 5, 3),
+                                     datetime.date(2016, 6, 30)])
+
+    def test_duplicates(self):
+        # days of the Spring Festival all roll to the same trading day
+        friday = datetime.date(2019, 2, 1)
+        self.assertEqual(calendar.periodic(friday, '1D', 5),
+                         [friday, datetime.date(2019, 2, 11)])
+        forced = calendar.periodic(friday, '1D', 5, force=True)
+        self.assertEqual(forced, calendar.trading_days_between(
+            friday, datetime.date(2019, 2, 14)))
+        self.assertEqual(calendar.periodic(friday, '1D', 5, "prev"), [friday])
+
+    def test_many_starts(self):
+        starts = calendar.trading_days_between(start,
+                                               datetime.date(2019, 12, 31))
+        for period in ('1M', '3m', '2W', '10d'):
+            schedules = calendar.periodic(starts, period, 13, force=True)
+            self.assertEqual(
+                schedules, [calendar.periodic(s, period, 13, force=True)
+                            for s in starts]
+            )
+            self.assertTrue(all(len(s) == 13 for s in schedules))
+        with self.assertRaises(ValueError):
+            calendar.periodic([start, datetime.date(2019, 2, 5)], '1M', 13)
+
+
+class TestHolidaySet(unittest.TestCase):
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'exchange.txt')
+            with open(file, 'w') as f:
+                f.write("# an exchange\n2019-12-25\n\n2019-12-30/2020-01-01\n")
+            holidays = HolidaySet.from_file(file)
+        self.assertEqual(len(holidays), 4)
+        self.assertIn(datetime.date(2019, 12, 31), holidays)
+        cal = Calendar(holidays)
+        self.assertEqual(
+            cal.trading_days_between(datetime.date(2019, 12, 24),
+                                     datetime.date(2020, 1, 3)),
+            [datetime.date(2019, 12, 24), datetime.date(2019, 12, 26),
+             datetime.date(2019, 12, 27), datetime.date(2020, 1, 2),
+             datetime.date(2020, 1, 3)]
+        )
+        with self.assertRaises(ValueError):
+            HolidaySet.bundled('nowhere')
+
+    def test_years(self):
+        self.assertEqual(calendar.holidays.years, (1990, 2100))
+        # holidays before 1990 and after 2100 are unknown
+        with self.assertRaises(ValueError):
+            calendar.is_trading(datetime.date(1989, 10, 2))
+        with self.assertRaises(ValueError):
+            calendar.offset(datetime.date(1990, 1, 3), -5)
+        with self.assertRaises(ValueError):
+            calendar.offset(datetime.date(2100, 12, 30), 5)
+        cal = Calendar()
+        cal.add_holiday_rule(lambda d: False)
+        with self.assertRaises(ValueError):
+            cal.is_trading(datetime.date(2101, 1, 3))
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'exchange.txt')
+            with open(file, 'w') as f:
+                f.write("years: 2019/2020\n2019-12-25\n")
+            holidays = HolidaySet.from_file(file)
+        self.assertEqual(holidays.years, (2019, 2020))
+        self.assertEqual(holidays.union([]).years, (2019, 2020))
+        cal = Calendar(holidays)
+        self.assertTrue(cal.is_trading(datetime.date(2020, 6, 1)))
+        with self.assertRaises(ValueError):
+            cal.is_trading(datetime.date(2021, 6, 1))
+
+    def test_busdaycalendar(self):
+        end = datetime.date(2022, 6, 30)
+        busdaycal = calendar.holidays.busdaycalendar
+        self.assertEqual(
+            np.busday_count(start, end, busdaycal=busdaycal),
+            calendar.num_trading_days_between(start, end)
+        )
+        dates = np.arange(np.datetime64(start), np.datetime64(end))
+        np.testing.assert_array_equal(
+            calendar.is_trading(dates),
+            np.is_busday(dates, busdaycal=busdaycal)
+        )
+
+    def test_other_holidays(self):
+        cal = Calendar(other_holidays=[datetime.date(2019, 3, 1)])
+        self.assertIsNotNone(cal.holidays)
+        self.assertFalse(cal.is_trading(datetime.date(2019, 3, 1)))
+        self.assertFalse(cal.is_trading(datetime.date(2019, 2, 5)))
+        # calendars travel to worker processes
+        cal = pickle.loads(pickle.dumps(cal))
+        self.assertFalse(cal.is_trading(datetime.date(2019, 3, 1)))
@@ -0,0 +1,264 @@
+import os
+import numpy as np
+import unittest
+from scipy.stats import norm
+from pyoptmc import *
+from tests.raw_api import serial_caller
+
+
+entropy = 12345678
+mc = MonteCarlo(2000, 20, caller=serial_caller)
+bs = BlackScholes(0.03, 0, 0.25, 252)
+dense_d_arr = list(range(1, 253))
+sparse_d_arr = list(range(21, 253, 21))
+
+sb = UpOutDownIn(
+    spot=100,
+    upper_barrier_out=103,
+    ob_days_out=sparse_d_arr,
+    rebate_out=np.linspace(15/12, 15, 12),
+    lower_barrier_in=80,
+    ob_days_in=dense_d_arr,
+    payoff_in=-Payoff(plain_vanilla, strike=100, option_type="put"),
+    payoff_nk=Payoff(constant_payoff, amount=15),
+)
+
+
+class TestRetireKnockedOut(unittest.TestCase):
+    def test_close_to_full_simulation(self):
+        full = mc.calc(sb, bs, entropy=entropy)
+        retired = mc.calc(sb, bs, entropy=entropy, retire_knocked_out=True)
+        self.assertAlmostEqual(full, retired, delta=0.15)
+
+    def test_requires_schedule(self):
+        option = DownIn(
+            spot=100, barrier=80, rebate=0, ob_days=sparse_d_arr,
+            payoff=Payoff(plain_vanilla, strike=100, option_type="put")
+        )
+        with self.assertRaises(ValueError):
+            mc.calc(option, bs, retire_knocked_out=True)
+
+    def test_no_greeks(self):
+        with self.assertRaises(ValueError):
+            mc.calc(sb, bs, request_greeks=True, retire_knocked_out=True)
+
+
+class TestMultilevelMC(unittest.TestCase):
+    option = DownOut(
+        spot=100, barrier=85, rebate=0, ob_days=dense_d_arr,
+        payoff=Payoff(plain_vanilla, strike=100)
+    )
+
+    def test_level_days(self):
+        from pyoptmc.engine.mlmc import _level_days
+        self.assertEqual(list(_level_days(10, 4)), [3, 7, 9])
+        self.assertEqual(list(_level_days(10, 1)), list(range(10)))
+
+    def test_close_to_full_simulation(self):
+        ml = MultilevelMC(2000, 4, caller=serial_caller, levels=5)
+        res = ml.calc(self.option, bs, entropy=entropy, target_error=0.05)
+        self.assertLess(res['Error'], 0.06)
+        self.assertEqual(len(res['Iterations']), 5)
+        full = mc.calc(self.option, bs, entropy=entropy)
+        self.assertAlmostEqual(res['PV'], full, delta=0.25)
+
+    def test_requires_black_scholes(self):
+        ml = MultilevelMC(100, 2, caller=serial_caller)
+        hst = Heston(.03, 0, -.5, .0625, 1, .4, .0625, 252)
+        with self.assertRaises(TypeError):
+            ml.calc(self.option, hst)
+
+
+class TestImportanceSampling(unittest.TestCase):
+    option = DownIn(
+        spot=100, barrier=65, rebate=0, ob_days=sparse_d_arr,
+        payoff=Payoff(plain_vanilla, strike=80, option_type="put")
+    )
+
+    def test_pv_paths(self):
+        coordinator = bs.coordinator(sb, bs)
+        paths = coordinator.paths_given_eps(coordinator.generate_eps(1, 500))
+        self.assertAlmostEqual(sb.pv_paths(paths, coordinator.df).mean(),
+                               sb.pv_log_paths(paths, coordinator.df))
+
+    def test_reduces_variance(self):
+        seeds = np.random.SeedSequence(entropy).spawn(20)
+        plain = serial_caller(mc.single_iter_caller(self.option, bs), seeds)
+        sampled = serial_caller(
+            mc.single_iter_caller(self.option, bs, importance_drift=-2.0),
+            seeds
+        )
+        self.assertAlmostEqual(np.mean(plain), np.mean(sampled), delta=0.03)
+        self.assertLess(np.std(sampled), np.std(plain) / 2)
+
+    def test_pilot(self):
+        pv = mc.calc(self.option, bs, entropy=entropy,
+                     importance_drift='pilot')
+        self.assertLess(mc.most_recent_importance_drift, 0)
+        full = mc.calc(self.option, bs, entropy=entropy)
+        self.assertAlmostEqual(pv, full, delta=0.03)
+
+    def test_greeks(self):
+        res = mc.calc(sb, bs, entropy=entropy, request_greeks=True,
+                      importance_drift=-0.5)
+        full = mc.calc(sb, bs, entropy=entropy, request_greeks=True)
+        self.assertAlmostEqual(res['PV'], full['PV'], delta=0.3)
+        self.assertAlmostEqual(res['Delta'], full['Delta'], delta=0.05)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            mc.calc(self.option, bs, importance_drift='optimal')
+        with self.assertRaises(ValueError):
+            mc.calc(sb, bs, retire_knocked_out=True, importance_drift=-1.0)
+        hst = Heston(.03, 0, -.5, .0625, 1, .4, .0625, 252)
+        with self.assertRaises(NotImplementedError):
+            mc.calc(self.option, hst, importance_drift=-1.0)
+
+
+class TestStratifiedSampling(unittest.TestCase):
+    def test_stratify(self):
+        coordinator = bs.coordinator(sb, bs)
+        eps = coordinator.generate_eps(1, 1000)
+        stratified = coordinator.stratify(eps, 10)
+        sd = np.sqrt(coordinator.dt / bs.day_counter)
+        u = norm.cdf(stratified @ sd / np.sqrt(sd @ sd))
+        # row i lands in stratum i % 10
+        np.testing.assert_array_equal(np.floor(u * 10), np.arange(1000) % 10)
+        # the bridge leaves the first increment close to standard normal
+        self.assertAlmostEqual(stratified[:, 0].std(), 1, delta=0.1)
+
+    def test_reduces_variance(self):
+        seeds = np.random.SeedSequence(entropy).spawn(20)
+        plain = serial_caller(mc.single_iter_caller(sb, bs), seeds)
+        stratified = serial_caller(
+            mc.single_iter_caller(sb, bs, strata=100), seeds
+        )
+        self.assertAlmostEqual(np.mean(plain), np.mean(stratified), delta=0.2)
+        self.assertLess(np.std(stratified), np.std(plain))
+
+    def test_unequal_strata(self):
+        res = mc.calc(sb, bs, entropy=entropy, strata=333)
+        full = mc.calc(sb, bs, entropy=entropy, strata=100)
+        self.assertAlmostEqual(res, full, delta=0.15)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            mc.calc(sb, bs, strata=0)
+        with self.assertRaises(ValueError):
+            mc.calc(sb, bs, retire_knocked_out=True, strata=10)
+
+
+class TestPathCache(unittest.TestCase):
+    def counting_caller(self, calc, seeds, **kwargs):
+        self.simulated += 1
+        return serial_caller(calc, seeds)
+
+    def setUp(self):
+        self.simulated = 0
+        self.mc = MonteCarlo(500, 4, caller=self.counting_caller)
+
+    def test_reuse(self):
+        cache = PathCache()
+        pv = self.mc.calc(sb, bs, entropy=entropy, path_cache=cache)
+        again = self.mc.calc(sb, bs, entropy=entropy, path_cache=cache)
+        self.assertEqual(self.simulated, 1)
+        self.assertEqual(pv, again)
+        self.assertAlmostEqual(pv, self.mc.calc(sb, bs, entropy=entropy))
+        # different process parameters are different path sets
+        self.mc.calc(sb, BlackScholes(0.03, 0, 0.3, 252), entropy=entropy,
+                     path_cache=cache)
+        self.assertEqual(self.simulated, 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_eviction(self):
+        cache = PathCache(max_bytes=500 * 4 * len(sb.sim_t_array) * 8)
+        self.mc.calc(sb, bs, entropy=1, path_cache=cache)
+        self.mc.calc(sb, bs, entropy=2, path_cache=cache)
+        self.assertEqual(len(cache), 1)
+        self.mc.calc(sb, bs, entropy=1, path_cache=cache)
+        self.assertEqual(self.simulated, 3)
+
+    def test_spill(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as spill_dir:
+            cache = PathCache(max_bytes=0, spill_dir=spill_dir)
+            pv = self.mc.calc(sb, bs, entropy=entropy, path_cache=cache)
+            self.assertEqual(cache.nbytes, 0)
+            again = self.mc.calc(sb, bs, entropy=entropy, path_cache=cache)
+            self.assertEqual(self.simulated, 1)
+            self.assertEqual(pv, again)
+            cache.clear()
+            self.assertEqual(os.listdir(spill_dir), [])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.mc.calc(sb, bs, request_greeks=True, path_cache=PathCache())
+
+
+class TestPathStore(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self._dir = tempfile.TemporaryDirectory()
+        self.mc = MonteCarlo(500, 4, caller=serial_caller)
+        self.store = simulate_to_store(self.mc, sb, bs, self._dir.name,
+                                       entropy=entropy)
+
+    def tearDown(self):
+        del self.store
+        self._dir.cleanup()
+
+    def test_same_as_calc(self):
+        pv = calc_from_store(sb, self.store, caller=serial_caller)
+        self.assertAlmostEqual(pv, self.mc.calc(sb, bs, entropy=entropy))
+        reopened = PathStore(self._dir.name)
+        self.assertEqual(reopened.entropy, entropy)
+        self.assertEqual(reopened[0].shape, (500, len(sb.sim_t_array) - 1))
+
+    def test_float32(self):
+        store = simulate_to_store(self.mc, sb, bs, self._dir.name,
+                                  entropy=entropy, dtype=np.float32)
+        self.assertEqual(store.paths.dtype, np.float32)
+        pv = calc_from_store(sb, store, caller=serial_caller)
+        self.assertAlmostEqual(pv, self.mc.calc(sb, bs, entropy=entropy),
+                               places=4)
+
+    def test_subset_of_days(self):
+        option = UpOut(spot=100, barrier=120, rebate=0,
+                       ob_days=sparse_d_arr, payoff=Payoff(plain_vanilla, 100))
+        pv = calc_from_store(option, self.store, caller=serial_caller,
+                             return_batches=True)
+        self.assertEqual(pv.shape, (4,))
+        with self.assertRaises(ValueError):
+            calc_from_store(UpOut(spot=100, barrier=120, rebate=0,
+                                  ob_days=[300], payoff=Payoff(plain_vanilla, 100)),
+                            self.store)
+        with self.assertRaises(ValueError):
+            calc_from_store(UpOut(spot=99, barrier=120, rebate=0,
+                                  ob_days=sparse_d_arr,
+                                  payoff=Payoff(plain_vanilla, 100)),
+                            self.store)
+
+
+class TestScenarios(unittest.TestCase):
+    mc = MonteCarlo(500, 4, caller=serial_caller)
+
+    def test_common_random_numbers(self):
+        res = self.mc.calc_scenarios(sb, bs, [95, 100, 105], [-0.05, 0, 0.05],
+                                     entropy=entropy)
+        self.assertEqual(res.shape, (3, 3))
+        self.assertAlmostEqual(res[1, 1], self.mc.calc(sb, bs, entropy=entropy))
+        for j, vol in ((0, 0.2), (2, 0.3)):
+            self.assertAlmostEqual(res[1, j], self.mc.calc(
+                sb, BlackScholes(0.03, 0, vol, 252), entropy=entropy))
+        # a higher spot makes the snowball less likely to be knocked in
+        self.assertTrue(np.all(np.diff(res[:, 1]) > 0))
+
+    def test_term_structure_and_heston(self):
+        res = self.mc.calc_scenarios(sb, BlackScholesTS(0.03, 0, 0.25), [100],
+                                     [0.05], entropy=entropy)
+        self.assertAlmostEqual(res[0, 0], self.mc.calc(
+            sb, BlackScholes(0.03, 0, 0.3, 252), entropy=entropy))
+        hst = Heston(.03, 0, -.5, .0625, 1, .4, .0625, 252)
+        res = self.mc.calc_scenarios(sb, hst, [100], [0.05], entropy=entropy)
+        self.assertAlmostEqual(res[0, 0], self.mc.calc(
+            sb, Heston(.03, 0, -.5, .09, 1, .4, .09, 252), entropy=entropy))
@@ -0,0 +1,87 @@
+import numpy as np
+import unittest
+from pyoptmc import *
+from tests.raw_api import serial_caller
+
+
+hst = Heston(.03, 0, -.5, .0625, 1, .4, .0625, 252)
+sparse_d_arr = list(range(21, 253, 21))
+sim_t_array = np.append([0], sparse_d_arr)
+rng = np.random.default_rng(1)
+
+
+class TestHestonOnGrid(unittest.TestCase):
+    def test_daily_steps_match_full_simulation(self):
+        n = hst.num_steps_on_grid(sim_t_array)
+        self.assertEqual(n, 252)
+        u = rng.uniform(0, 1, (50, n))
+        z = rng.normal(0, 1, (50, n))
+        v, x = hst.generate_path_on_grid(sim_t_array, u, z)
+        v_full, x_full = hst.generate_path_given_uz(t=1, u=u, z=z, batch_size=50)
+        idx = sim_t_array[1:] - 1
+        self.assertTrue(np.allclose(v, v_full[:, idx]))
+        self.assertTrue(np.allclose(x, x_full[:, idx]))
+
+    def test_substeps(self):
+        n = hst.num_steps_on_grid(sim_t_array, substeps=3)
+        self.assertEqual(n, 3 * len(sparse_d_arr))
+        u = rng.uniform(0, 1, (50, n))
+        z = rng.normal(0, 1, (50, n))
+        v, x = hst.generate_path_on_grid(sim_t_array, u, z, substeps=3)
+        self.assertEqual(v.shape, (50, len(sparse_d_arr)))
+        self.assertTrue(np.all(v >= 0))
+        with self.assertRaises(ValueError):
+            hst.generate_path_on_grid(sim_t_array, u[:, 1:], z[:, 1:], substeps=3)
+
+
+class TestHestonGreeks(unittest.TestCase):
+    def test_greeks(self):
+        mc = MonteCarlo(2000, 5, caller=serial_caller)
+        option = UpOut(
+            spot=100, rebate=1, barrier=120, ob_days=sparse_d_arr,
+            payoff=Payoff(plain_vanilla, strike=100)
+        )
+        res = mc.calc(option, hst, request_greeks=True, entropy=7)
+        for key in ('PV', 'Delta', 'Gamma', 'Rho', 'Vega', 'Theta', 'Vega v0',
+                    'Vega theta', 'Vega kappa', 'Vega xi', 'Vega rho'):
+            self.assertTrue(np.isfinite(res[key]))
+        self.assertEqual(res['PV'], mc.calc(option, hst, entropy=7))
+        # a parallel shift of 0.01 in volatility moves v0 and theta by
+        # about 2 * 0.25 * 0.01
+        self.assertAlmostEqual(
+            res['Vega'], (res['Vega v0'] + res['Vega theta']) / 2, delta=0.02
+        )
+
+
+class TestHestonCalibrator(unittest.TestCase):
+    strikes = np.array([70, 80, 90, 100, 110, 120, 130.])
+    maturities = np.array([0.25, 0.5, 1, 2])[:, None]
+
+    def test_black_scholes_limit(self):
+        from scipy.stats import norm
+        r, q, v = 0.03, 0.01, 0.2
+        k, t = self.strikes, self.maturities
+        d1 = (np.log(100 / k) + (r - q + v * v / 2) * t) / (v * np.sqrt(t))
+        d2 = d1 - v * np.sqrt(t)
+        bs_calls = 100 * np.exp(-q * t) * norm.cdf(d1) - \
+            k * np.exp(-r * t) * norm.cdf(d2)
+        calibrator = HestonCalibrator(r, q)
+        prices = calibrator.prices(
+            Heston(r, q, 0, v * v, 1, 1e-4, v * v), 100, k, t
+        )
+        self.assertTrue(np.allclose(prices, bs_calls.ravel(), atol=1e-4))
+
+    def test_recover_parameters(self):
+        calibrator = HestonCalibrator(0.03, 0.01)
+        true = Heston(0.03, 0.01, -0.7, 0.05, 2.0, 0.6, 0.03)
+        is_call = self.strikes >= 100
+        quotes = calibrator.prices(
+            true, 100, self.strikes, self.maturities, is_call
+        )
+        fitted = calibrator.calibrate(
+            100, self.strikes, self.maturities, quotes, is_call
+        )
+        self.assertIsInstance(fitted, Heston)
+        self.assertTrue(np.allclose(
+            calibrator.params, [-0.7, 0.05, 2.0, 0.6, 0.03], atol=1e-4
+        ))
@@ -0,0 +1,52 @@
+import numpy as np
+import unittest
+from pyoptmc import *
+from tests.raw_api import serial_caller
+
+
+lsm = LeastSquaresMC(10000, 5, caller=serial_caller)
+coupon_days = list(range(21, 253, 21))
+
+
+class TestLeastSquaresMC(unittest.TestCase):
+    def test_bermudan_put(self):
+        # Longstaff and Schwartz (2001), Table 1: S=36, K=40, American 4.478
+        bs = BlackScholes(0.06, 0, 0.2, 250)
+        option = BermudanOption(36, 40, list(range(5, 251, 5)))
+        self.assertAlmostEqual(lsm.calc(option, bs, entropy=1), 4.47, delta=0.05)
+        self.assertEqual(lsm.coefficients.shape, (50, 4))
+        # a single exercise day is a European put
+        european = BermudanOption(36, 40, [250])
+        self.assertAlmostEqual(lsm.calc(european, bs, entropy=1), 3.844,
+                               delta=0.05)
+
+    def test_callable_note(self):
+        bs = BlackScholes(0.03, 0, 0.25)
+        bullet = CallableNote(100, 100, coupon_days, 0.5, [252])
+        exact = 0.5 * np.exp(-0.03 * np.array(coupon_days) / 252).sum() + \
+            100 * np.exp(-0.03)
+        self.assertAlmostEqual(lsm.calc(bullet, bs, entropy=1), exact)
+        callable_note = CallableNote(100, 100, coupon_days, 0.5, coupon_days[2:])
+        self.assertLess(lsm.calc(callable_note, bs, entropy=1), exact)
+
+    def test_invalid_structures(self):
+        option = UpOut(spot=100, rebate=1, barrier=120, ob_days=coupon_days,
+                       payoff=Payoff(plain_vanilla, strike=100))
+        with self.assertRaises(TypeError):
+            lsm.calc(option, BlackScholes(0.03, 0, 0.25))
+        with self.assertRaises(ValueError):
+            lsm.calc(BermudanOption(100, 100, coupon_days),
+                     BlackScholes(0.03, 0, 0.25), request_greeks=True)
+
+    def test_abstract_hooks(self):
+        from pyoptmc.structures.early_exercise import EarlyExerciseStructure
+
+        class NoExercise(EarlyExerciseStructure):
+            spot = 100
+            sim_t_array = [0, 21]
+
+            def cash_flows(self, log_paths):
+                return np.zeros_like(log_paths)
+
+        with self.assertRaises(TypeError):
+            NoExercise()
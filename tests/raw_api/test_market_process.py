@@ -0,0 +1,147 @@
+import numpy as np
+import unittest
+from pyoptmc import *
+from tests.raw_api import serial_caller
+
+
+mc = MonteCarlo(2000, 5, caller=serial_caller)
+sparse_d_arr = list(range(21, 253, 21))
+option = UpOut(
+    spot=100, rebate=1, barrier=120, ob_days=sparse_d_arr,
+    payoff=Payoff(plain_vanilla, strike=100)
+)
+
+
+class TestBlackScholesTS(unittest.TestCase):
+    def test_flat_curves_match_black_scholes(self):
+        bs = BlackScholes(0.03, 0.01, 0.25)
+        ts = BlackScholesTS(0.03, ([0.5, 2], [0.01, 0.01]), ([1, 3], [0.25, 0.25]))
+        res_bs = mc.calc(option, bs, request_greeks=True, entropy=3)
+        res_ts = mc.calc(option, ts, request_greeks=True, entropy=3)
+        for key in res_bs:
+            self.assertAlmostEqual(res_bs[key], res_ts[key], places=8)
+
+    def test_grid(self):
+        ts = BlackScholesTS(([0.5, 1], [0.02, 0.04]), 0, ([0.5, 1], [0.2, 0.25]))
+        t = np.array([0, 63, 126, 189, 252])
+        drift, diffusion, df = ts.grid(t)
+        self.assertIs(ts.grid(t)[0], drift)
+        self.assertAlmostEqual(df[-1], np.exp(-0.04))
+        self.assertAlmostEqual(np.sum(diffusion ** 2), 0.0625)
+        self.assertAlmostEqual(np.sum(diffusion[:2] ** 2), 0.02)
+        self.assertAlmostEqual(np.sum(drift), 0.04 - 0.0625 / 2)
+
+    def test_calendar_arbitrage(self):
+        with self.assertRaises(ValueError):
+            BlackScholesTS(0.03, 0, ([0.5, 1], [0.4, 0.2]))
+
+
+def smile(t, s):
+    return 0.2 + 0.1 * np.log(s / 100) ** 2 + 0.02 * t
+
+
+class TestLocalVol(unittest.TestCase):
+    def test_flat_surface_matches_black_scholes(self):
+        dense = DownIn(
+            spot=100, barrier=80, rebate=0, ob_days=list(range(1, 253)),
+            payoff=Payoff(plain_vanilla, strike=100, option_type="put")
+        )
+        bs = BlackScholes(0.03, 0.01, 0.25)
+        lv = LocalVol(0.03, 0.01, 0.25)
+        eps = np.random.default_rng(0).normal(0, 1, (100, 252))
+        self.assertTrue(np.allclose(
+            bs.coordinator(dense, bs).paths_given_eps(eps),
+            lv.coordinator(dense, lv).paths_given_eps(eps)
+        ))
+
+    def test_greeks_and_lattice(self):
+        lv = LocalVol(0.03, 0, smile)
+        res = mc.calc(option, lv, request_greeks=True, entropy=3)
+        for value in res.values():
+            self.assertTrue(np.isfinite(value))
+        self.assertEqual(res['PV'], mc.calc(option, lv, entropy=3))
+        self.assertIs(lv.lattice(100, 252), lv.lattice(100, 252))
+        with self.assertRaises(ValueError):
+            LocalVol(0.03, 0, -0.2).lattice(100, 252)
+
+    def test_next_day_paths(self):
+        lv = LocalVol(0.03, 0, smile)
+        coordinator = lv.coordinator(option, lv)
+        eps = np.random.default_rng(0).normal(0, 1, (100, 252))
+        paths = coordinator.paths_given_eps(eps)
+        next_day = coordinator.shift(paths, 0.01, 0.01, 0.005, eps)
+        # tomorrow's paths run on the surface from tomorrow on
+        obs = np.asarray(option.sim_t_array[1:]) - 1
+        x0 = coordinator.initial_state(100)
+        expected = lv._project(coordinator._lattice, eps[:, 1:], obs, x0, 1)
+        np.testing.assert_allclose(next_day['Paths next day'],
+                                   expected - np.log(100))
+        today = lv._project(coordinator._lattice, eps[:, 1:], obs, x0)
+        self.assertFalse(np.allclose(expected, today))
+
+
+class TestJumpDiffusion(unittest.TestCase):
+    def test_no_jumps_match_black_scholes(self):
+        bs = BlackScholes(0.03, 0.01, 0.25)
+        merton = Merton(0.03, 0.01, 0.25, 0, -0.1, 0.1)
+        z = np.random.default_rng(0).normal(0, 1, (100, len(sparse_d_arr)))
+        jumps = np.zeros_like(z)
+        self.assertTrue(np.allclose(
+            bs.coordinator(option, bs).paths_given_eps(z),
+            merton.coordinator(option, merton).paths_given_eps(
+                (z, jumps, jumps[:, 0])
+            )
+        ))
+
+    def test_martingale(self):
+        for process in (Merton(0.03, 0.01, 0.2, 5, -0.1, 0.15),
+                        Kou(0.03, 0.01, 0.2, 5, 0.3, 10, 5)):
+            coordinator = process.coordinator(option, process)
+            paths = coordinator.paths_given_eps(
+                coordinator.generate_eps(1, 200000)
+            )
+            self.assertAlmostEqual(
+                np.exp(paths[:, -1]).mean(), np.exp(0.02),
+                delta=0.005
+            )
+
+    def test_abstract_jumps(self):
+        from pyoptmc.model.jump_diffusion import _JumpDiffusion
+
+        class NoJumpSizes(_JumpDiffusion):
+            kappa = 0.0
+
+        with self.assertRaises(TypeError):
+            NoJumpSizes(0.03, 0, 0.2, 1)
+
+    def test_greeks(self):
+        kou = Kou(0.03, 0, 0.2, 3, 0.4, 10, 8)
+        res = mc.calc(option, kou, request_greeks=True, entropy=3)
+        for value in res.values():
+            self.assertTrue(np.isfinite(value))
+        self.assertEqual(res['PV'], mc.calc(option, kou, entropy=3))
+
+
+class TestMultiAssetBlackScholes(unittest.TestCase):
+    corr = [[1, 0.6, 0.3], [0.6, 1, 0.5], [0.3, 0.5, 1]]
+
+    def test_paths(self):
+        from pyoptmc.tools.helper import worst_of, best_of
+        mbs = MultiAssetBlackScholes(0.03, [0, 0.01, 0.02], [0.2, 0.25, 0.3],
+                                     self.corr)
+        coordinator = mbs.coordinator(option, mbs)
+        paths = coordinator.paths_given_eps(coordinator.generate_eps(1, 100000))
+        self.assertEqual(paths.shape, (100000, 3, len(sparse_d_arr)))
+        returns = np.diff(paths, axis=2, prepend=0)
+        self.assertTrue(np.allclose(
+            np.corrcoef(returns[:, :, -1].T), self.corr, atol=0.02
+        ))
+        self.assertTrue(np.allclose(
+            np.exp(paths[:, :, -1]).mean(axis=0),
+            np.exp(0.03 - np.array([0, 0.01, 0.02])), atol=0.01
+        ))
+        self.assertTrue(np.all(worst_of(paths) <= best_of(paths)))
+
+    def test_invalid_correlation(self):
+        with self.assertRaises(ValueError):
+            MultiAssetBlackScholes(0.03, 0, [0.2, 0.2], [[1, 1.2], [1.2, 1]])
@@ -0,0 +1,268 @@
+import datetime
+import numpy as np
+import unittest
+from pyoptmc import *
+from pyoptmc.products import (
+    SnowballProd, PhoenixProd, WorstOfSnowballProd, Book
+)
+from tests.raw_api import serial_caller
+
+
+entropy = 12345678
+mc = MonteCarlo(1000, 10, caller=serial_caller)
+bs = BlackScholes(0.03, 0, 0.25, 252)
+calendar = Calendar()
+start = datetime.date(2019, 1, 31)
+dates = calendar.periodic(start, '1M', 13, "next")[1:]
+
+
+def make_snowball(ko_barriers=103, coupon_rate=0.15):
+    return SnowballProd(
+        start_date=start, initial_price=100, ko_barriers=ko_barriers,
+        ko_ob_dates=dates, ki_barriers=80, ki_ob_dates="daily",
+        ki_payoff=-Payoff(plain_vanilla, 100, "put"),
+        ko_coupon_rate=coupon_rate, maturity_coupon_rate=coupon_rate,
+        calendar=calendar
+    )
+
+
+def make_phoenix(ko_barrier=100, coupon_rate=0.15):
+    return PhoenixProd(
+        start_date=start, end_date=dates[-1], initial_price=100,
+        settlement_barrier=80, settlement_dates=dates,
+        settlement_coupon_rate=coupon_rate, ko_barrier=ko_barrier,
+        ko_ob_dates=dates, ki_barrier=70, ki_ob_dates="daily",
+        calendar=calendar
+    )
+
+
+class TestStructureBundle(unittest.TestCase):
+    def test_same_paths(self):
+        sb = make_snowball().to_structure(start, 100, False)
+        up_out = UpOut(spot=100, barrier=120, rebate=0,
+                       ob_days=sb.sim_t_array[21::21],
+                       payoff=Payoff(plain_vanilla, strike=100))
+        bundle = StructureBundle([sb, up_out])
+        pv = mc.calc(bundle, bs, entropy=entropy)
+        self.assertEqual(pv.shape, (2,))
+        # a structure observed on all days of the bundle gets the same paths
+        self.assertAlmostEqual(pv[0], mc.calc(sb, bs, entropy=entropy))
+
+    def test_different_spots(self):
+        with self.assertRaises(ValueError):
+            StructureBundle([make_snowball().to_structure(start, 100, False),
+                             make_snowball().to_structure(start, 99, False)])
+
+
+class TestSolvers(unittest.TestCase):
+    def test_snowball_coupon_rate(self):
+        res = make_snowball().find_coup_rate(mc, bs, 0, entropy=entropy)
+        self.assertAlmostEqual(res['diff'], 0, places=8)
+        self.assertGreater(res['error'], 0)
+        pv = make_snowball(coupon_rate=res['result']).value(
+            start, 100, False, mc, bs, entropy=entropy)
+        self.assertAlmostEqual(pv, 0, places=8)
+
+    def test_phoenix_coupon_rate(self):
+        res = make_phoenix().find_coup_rate(mc, bs, 0, entropy=entropy)
+        pv = make_phoenix(coupon_rate=res['result']).value(
+            start, 100, False, mc, bs, entropy=entropy)
+        self.assertAlmostEqual(pv, 0, places=8)
+
+    def test_snowball_ko_barrier(self):
+        res = make_snowball().find_ko_barrier(mc, bs, 0, (103, 130),
+                                              entropy=entropy)
+        pv = make_snowball(ko_barriers=res['result']).value(
+            start, 100, False, mc, bs, entropy=entropy)
+        self.assertAlmostEqual(pv, res['diff'])
+        self.assertLess(abs(pv), 0.05)
+        with self.assertRaises(ValueError):
+            make_snowball().find_ko_barrier(mc, bs, 100, (103, 130))
+
+
+class TestBacktest(unittest.TestCase):
+    product = make_snowball()
+    prices = 3000 * np.exp(np.cumsum(
+        np.random.default_rng(0).normal(0, 0.015, 600)))
+
+    def loop_backtest(self, window):
+        """Backtest one window observation by observation."""
+        p = self.product
+        window = window / window[0] * p.initial_price
+        for k, d in enumerate(p.ob_days_out):
+            if window[d] >= p.ko_barriers[k]:
+                return d, p.ko_rebate[k]
+        n_days = p.ob_days_out[-1]
+        final = window[n_days:n_days + 1]
+        if any(window[d] <= b for d, b in zip(p.ob_days_in, p.ki_barriers)):
+            return n_days, p.ki_payoff(final)[0]
+        return n_days, p.nk_payoff(final)[0]
+
+    def test_windows(self):
+        res = self.product.backtest_windows(self.prices)
+        n_days = self.product.ob_days_out[-1]
+        expected = [self.loop_backtest(self.prices[i:i + n_days + 1])
+                    for i in range(len(self.prices) - n_days)]
+        np.testing.assert_array_equal(res['holding_days'],
+                                      [e[0] for e in expected])
+        np.testing.assert_allclose(res['payout'], [e[1] for e in expected])
+        self.assertTrue(res['knocked_out'].any())
+        self.assertTrue(res['knocked_in'].any())
+        self.assertFalse(np.any(res['knocked_out'] & res['knocked_in']))
+
+    def test_single(self):
+        end_date, payout = self.product.backtest(self.prices[100:])
+        res = self.product.backtest_windows(self.prices)
+        self.assertAlmostEqual(payout, res['payout'][100])
+        self.assertIn(end_date, list(dates))
+        with self.assertRaises(ValueError):
+            self.product.backtest_windows(self.prices[:100])
+
+    def structure_values(self, structure, spot=None):
+        """Values of *structure* on the windows of prices with unit discount
+        factors, i.e., the sums of its cash flows."""
+        t = structure.sim_t_array
+        windows = np.stack([self.prices[i:i + t[-1] + 1]
+                            for i in range(len(self.prices) - t[-1])])
+        spot = windows[:, :1] if spot is None else spot
+        log_paths = np.log(windows[:, t[1:]] / spot)
+        df = np.ones(len(t) - 1)
+        return np.array([structure.pv_log_paths(p[None], df)
+                         for p in log_paths])
+
+    def test_phoenix(self):
+        product = make_phoenix()
+        res = product.backtest_windows(self.prices)
+        np.testing.assert_allclose(
+            res['payout'],
+            self.structure_values(product.to_structure(start, 100, False))
+        )
+        self.assertEqual(res['cash_flows'].shape[1], len(res['payment_days']))
+
+    def test_barrier_products(self):
+        from pyoptmc.products import products
+        for product_cls, barrier in ((products.UpOut, 3200),
+                                     (products.DownOut, 2800),
+                                     (products.UpIn, 3200),
+                                     (products.DownIn, 2800)):
+            product = product_cls(start, barrier, 1.0, dates,
+                                  Payoff(plain_vanilla, 3000), calendar)
+            res = product.backtest_windows(self.prices)
+            np.testing.assert_allclose(
+                res['payout'],
+                self.structure_values(product.to_structure(start, 3000), 3000)
+            )
+            # mid-life structures observe the remaining days, today's
+            # included
+            structure = product.to_structure(dates[1], 3000)
+            self.assertEqual(list(structure.sim_t_array[1:]),
+                             calendar.to_scalar(dates[1:], dates[1]))
+
+    def test_worst_of(self):
+        product = WorstOfSnowballProd(
+            [3000, 3000], start_date=start, initial_price=100,
+            ko_barriers=103, ko_ob_dates=dates, ki_barriers=80,
+            ki_ob_dates="daily", ki_payoff=-Payoff(plain_vanilla, 100, "put"),
+            ko_coupon_rate=0.15, maturity_coupon_rate=0.15, calendar=calendar
+        )
+        higher = self.prices * 1.01 ** np.arange(len(self.prices))
+        res = product.backtest_windows(np.stack([self.prices, higher], axis=1))
+        np.testing.assert_allclose(
+            res['payout'], self.product.backtest_windows(self.prices)['payout']
+        )
+        with self.assertRaises(ValueError):
+            product.backtest_windows(self.prices)
+
+
+class TestBook(unittest.TestCase):
+    days = calendar.trading_days_between(start, dates[-1], endpoints=True)
+    prices = 100 * np.exp(np.cumsum(
+        np.random.default_rng(1).normal(0, 0.015, len(days) - 1)))
+
+    def run_book(self, product):
+        book = Book(start, calendar)
+        book.add('t', product, 'X')
+        paid = 0.0
+        for date, price in zip(self.days[1:], self.prices):
+            paid += book.advance(date, {'X': price}).get('t', 0.0)
+        return book, paid
+
+    def test_lifecycle(self):
+        for product in (make_snowball(), make_phoenix()):
+            book, paid = self.run_book(product)
+            res = product.backtest_windows(np.append(100, self.prices))
+            self.assertAlmostEqual(paid, res['payout'][0])
+            state = book.state('t')
+            self.assertFalse(state['alive'])
+            self.assertAlmostEqual(state['paid'], paid)
+            self.assertEqual(book.live_trades(), {})
+
+    def test_catch_up(self):
+        book = Book(self.days[30], calendar)
+        book.add('t', make_snowball(), 'X', fixings=self.prices[:30])
+        book.advance(self.days[31], {'X': self.prices[30]})
+        expected = Book(start, calendar)
+        expected.add('t', make_snowball(), 'X')
+        for date, price in zip(self.days[1:32], self.prices[:31]):
+            expected.advance(date, {'X': price})
+        self.assertEqual(book.state('t'), expected.state('t'))
+        with self.assertRaises(ValueError):
+            Book(self.days[30], calendar).add('t', make_snowball(), 'X')
+
+    def test_value_after_catch_up(self):
+        book = Book(self.days[30], calendar)
+        book.add('t', make_snowball(), 'X', fixings=self.prices[:30])
+        self.assertEqual(book.spots, {'X': self.prices[29]})
+        expected = Book(start, calendar)
+        expected.add('t', make_snowball(), 'X')
+        for date, price in zip(self.days[1:31], self.prices[:30]):
+            expected.advance(date, {'X': price})
+        self.assertEqual(book.value(mc, {'X': bs}, entropy=entropy),
+                         expected.value(mc, {'X': bs}, entropy=entropy))
+
+    def test_value(self):
+        book = Book(start, calendar)
+        book.add('sb', make_snowball(), 'X')
+        book.add('ph', make_phoenix(), 'X')
+        pvs = book.value(mc, {'X': bs}, spots={'X': 100}, entropy=entropy)
+        self.assertAlmostEqual(pvs['sb'], make_snowball().value(
+            start, 100, False, mc, bs, entropy=entropy))
+        self.assertAlmostEqual(pvs['ph'], make_phoenix().value(
+            start, 100, False, mc, bs, entropy=entropy))
+
+    def test_errors(self):
+        book = Book(start, calendar)
+        book.add('t', make_snowball(), 'X')
+        with self.assertRaises(ValueError):
+            book.add('t', make_phoenix(), 'X')
+        with self.assertRaises(ValueError):
+            book.advance(self.days[2], {'X': 100})
+        with self.assertRaises(ValueError):
+            book.advance(self.days[1], {'Y': 100})
+        with self.assertRaises(TypeError):
+            book.add('w', WorstOfSnowballProd(
+                [3000, 3000], start_date=start, initial_price=100,
+                ko_barriers=103, ko_ob_dates=dates, ki_barriers=80,
+                ki_ob_dates="daily",
+                ki_payoff=-Payoff(plain_vanilla, 100, "put"),
+                ko_coupon_rate=0.15, maturity_coupon_rate=0.15,
+                calendar=calendar
+            ), 'X')
+
+
+class TestScenarioGrid(unittest.TestCase):
+    def test_grid(self):
+        product = make_snowball(110)
+        days = calendar.trading_days_between(start, dates[-1], endpoints=True)
+        cube = product.scenario_grid(mc, bs, [start, days[10]], [95, 105],
+                                     [0, 0.05], entropy=entropy)
+        self.assertEqual(cube.dims, ('date', 'spot', 'vol_shift'))
+        self.assertEqual(cube.shape, (2, 2, 2))
+        for date in (start, days[10]):
+            pv = product.value(date, 95, False, mc,
+                               BlackScholes(0.03, 0, 0.3, 252), entropy=entropy)
+            self.assertAlmostEqual(
+                cube.sel(date=date, spot=95, vol_shift=0.05), pv)
+        self.assertEqual(cube.sel(spot=105).dims, ('date', 'vol_shift'))
+        with self.assertRaises(KeyError):
+            cube.sel(spot=100)
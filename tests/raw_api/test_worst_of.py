@@ -0,0 +1,92 @@
+import datetime
+import numpy as np
+import unittest
+from pyoptmc import *
+from pyoptmc.products import WorstOfSnowballProd, WorstOfPhoenixProd
+from pyoptmc.tools.helper import worst_of
+from tests.raw_api import serial_caller
+
+
+mc = MonteCarlo(2000, 10, caller=serial_caller)
+corr = [[1, 0.5, 0.4], [0.5, 1, 0.6], [0.4, 0.6, 1]]
+mbs = MultiAssetBlackScholes(0.03, 0, [0.2, 0.25, 0.3], corr)
+sparse_d_arr = list(range(21, 253, 21))
+dense_d_arr = list(range(1, 253))
+
+
+def snowball(performances=None):
+    return WorstOfUpOutDownIn(
+        100, 103, sparse_d_arr, np.linspace(15 / 12, 15, 12), 70, dense_d_arr,
+        -Payoff(plain_vanilla, strike=100, option_type="put"),
+        Payoff(constant_payoff, amount=15), performances=performances
+    )
+
+
+class TestWorstOfStructures(unittest.TestCase):
+    def test_fused_reduction(self):
+        option = snowball([1.02, 0.95, 1.1])
+        coordinator = mbs.coordinator(option, mbs)
+        eps = coordinator.generate_eps(0, 1000)
+        reduced = coordinator.paths_given_eps(eps)
+        coordinator._reduction = None
+        full = coordinator.paths_given_eps(eps)
+        self.assertEqual(full.shape, (1000, 3, len(option.sim_t_array) - 1))
+        self.assertTrue(np.allclose(reduced, worst_of(full)))
+        self.assertTrue(np.isclose(option.pv_log_paths(reduced, coordinator.df),
+                                   option.pv_log_paths(full, coordinator.df)))
+
+    def test_single_asset(self):
+        single = UpOutDownIn(
+            100, 103, sparse_d_arr, np.linspace(15 / 12, 15, 12), 70,
+            dense_d_arr, -Payoff(plain_vanilla, strike=100, option_type="put"),
+            Payoff(constant_payoff, amount=15)
+        )
+        # one asset draws the same normals as Black-Scholes
+        one = MultiAssetBlackScholes(0.03, 0, [0.2], [[1]])
+        self.assertAlmostEqual(
+            mc.calc(snowball(), one, entropy=1),
+            mc.calc(single, BlackScholes(0.03, 0, 0.2), entropy=1)
+        )
+
+    def test_greeks_and_retirement(self):
+        option = snowball()
+        res = mc.calc(option, mbs, request_greeks=True, entropy=2)
+        for value in res.values():
+            self.assertTrue(np.isfinite(value))
+        retired = mc.calc(option, mbs, entropy=2, retire_knocked_out=True)
+        self.assertAlmostEqual(res['PV'], retired, delta=0.3)
+
+
+class TestWorstOfProducts(unittest.TestCase):
+    calendar = Calendar()
+    start = datetime.date(2019, 1, 31)
+    dates = calendar.periodic(start, '1M', 13, "next")[1:]
+
+    def test_snowball(self):
+        option = WorstOfSnowballProd(
+            [3000, 50, 12], start_date=self.start, initial_price=100,
+            ko_barriers=103, ko_ob_dates=self.dates, ki_barriers=70,
+            ki_ob_dates="daily",
+            ki_payoff=-Payoff(plain_vanilla, 100, "put"),
+            ko_coupon_rate=0.15, maturity_coupon_rate=0.15
+        )
+        structure = option.to_structure(self.start, [3300, 50, 11.4], False)
+        self.assertIsInstance(structure, WorstOfUpOutDownIn)
+        self.assertTrue(np.allclose(structure.performances, [1.1, 1, 0.95]))
+        pv = option.value(self.start, [3000, 50, 12], False, mc, mbs, entropy=1)
+        self.assertTrue(np.isfinite(pv))
+        with self.assertRaises(ValueError):
+            option.value(self.start, [3000, 50], False, mc, mbs)
+        res = option.find_coup_rate(mc, mbs, 0, entropy=1)
+        self.assertAlmostEqual(res['diff'], 0, places=6)
+
+    def test_phoenix(self):
+        option = WorstOfPhoenixProd(
+            [3000, 50, 12], start_date=self.start, end_date=self.dates[-1],
+            initial_price=100, settlement_barrier=80,
+            settlement_dates=self.dates, settlement_coupon_rate=0.15,
+            ko_barrier=100, ko_ob_dates=self.dates, ki_barrier=70,
+            ki_ob_dates="daily", calendar=self.calendar
+        )
+        pv = option.value(self.start, [3000, 50, 12], False, mc, mbs, entropy=1)
+        self.assertTrue(np.isfinite(pv))